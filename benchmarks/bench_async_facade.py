@@ -0,0 +1,133 @@
+"""Benchmark de la latence de la boucle d'événements : appels SQLite synchrones vs façade `AsyncEconomy`.
+
+Simule un flux de commandes `/account` (variation, rang dans la guilde, dernières opérations) suivies
+d'un dépôt, pendant qu'une sonde mesure le retard de la boucle d'événements, c.-à-d. le temps pendant
+lequel les autres commandes et le heartbeat Discord seraient bloqués.
+
+Usage : python benchmarks/bench_async_facade.py [--rate 200] [--duration 5] [--history 20000] [--json]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from common.economy import AsyncEconomy, EconomyDBManager, Operation
+
+USERS = 50
+GUILD_MEMBERS = 300
+PROBE_INTERVAL = 0.001
+
+
+def seed(eco: EconomyDBManager, history: int):
+    """Remplit la base avec un historique réaliste pour que les lectures aient un coût."""
+    now = int(time.time())
+    with eco.transaction() as cursor:
+        cursor.executemany('INSERT OR IGNORE INTO economy (user_id, balance) VALUES (?, ?)',
+                           [(uid, 1000 + uid) for uid in range(GUILD_MEMBERS)])
+        Operation.save_many((Operation(user_id=i % USERS, delta=1, description=f"Historique {i}", timestamp=now - i)
+                             for i in range(history)), cursor)
+
+
+async def probe(lags: list[float], stop: asyncio.Event):
+    """Mesure l'écart entre le réveil prévu et le réveil effectif de la boucle."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+def command_sync(eco: EconomyDBManager, guild, uid: int, since: float):
+    account = eco.get_account(SimpleNamespace(id=uid))
+    account.get_variation_since(since)
+    account.get_rank_in_guild(guild)
+    account.get_recent_operations(5)
+    account.deposit(1, "Commande")
+
+
+async def command_async(eco: AsyncEconomy, guild, uid: int, since: float):
+    account = await eco.get_account(SimpleNamespace(id=uid))
+    await asyncio.gather(eco.get_variation_since(account, since), 
+                         eco.get_rank_in_guild(account, guild),
+                         eco.get_recent_operations(account, 5))
+    await eco.deposit(account, 1, "Commande")
+
+
+async def run(mode: str, eco: AsyncEconomy, rate: int, duration: float) -> dict:
+    lags, stop = [], asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    since = time.time() - 86400
+    guild = SimpleNamespace(id=1, members=[SimpleNamespace(id=uid, bot=False) for uid in range(GUILD_MEMBERS)])
+    tasks = []
+    latencies = []
+
+    async def timed(coro):
+        start = time.perf_counter()
+        await coro
+        latencies.append(time.perf_counter() - start)
+
+    async def command(uid: int):
+        if mode == 'sync':
+            command_sync(eco.db_manager, guild, uid, since)
+        else:
+            await command_async(eco, guild, uid, since)
+
+    start = time.perf_counter()
+    for i in range(int(rate * duration)):
+        tasks.append(asyncio.create_task(timed(command(i % USERS))))
+        # Cadence fixe, indépendante du temps de traitement des commandes précédentes
+        await asyncio.sleep(max(0.0, start + (i + 1) / rate - time.perf_counter()))
+    await asyncio.gather(*tasks)
+    stop.set()
+    await probe_task
+
+    lags_ms = sorted(lag * 1000 for lag in lags)
+    lat_ms = sorted(lat * 1000 for lat in latencies)
+    return {
+        'loop_lag_ms': {
+            'p50': statistics.median(lags_ms),
+            'p99': lags_ms[int(len(lags_ms) * 0.99) - 1],
+            'max': lags_ms[-1],
+        },
+        'command_ms': {
+            'p50': statistics.median(lat_ms),
+            'p99': lat_ms[int(len(lat_ms) * 0.99) - 1],
+        },
+        'commands': len(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rate', type=int, default=200, help="Commandes par seconde")
+    parser.add_argument('--duration', type=float, default=5.0, help="Durée de chaque scénario (s)")
+    parser.add_argument('--history', type=int, default=20000, help="Nombre d'opérations pré-existantes")
+    parser.add_argument('--json', action='store_true', help="Sortie au format JSON")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix='robin_bench_'))
+    db = EconomyDBManager(tmp)
+    seed(db, args.history)
+    eco = AsyncEconomy(db)
+
+    results = {mode: asyncio.run(run(mode, eco, args.rate, args.duration)) for mode in ('sync', 'async')}
+    eco.close()
+
+    if args.json:
+        print(json.dumps({'rate': args.rate, 'duration': args.duration, 'results': results}, indent=2))
+    else:
+        for mode, res in results.items():
+            lag, lat = res['loop_lag_ms'], res['command_ms']
+            print(f"{mode:<6} retard boucle p50={lag['p50']:.2f}ms p99={lag['p99']:.2f}ms max={lag['max']:.2f}ms"
+                  f" | commande p50={lat['p50']:.2f}ms p99={lat['p99']:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark des profils de connexion SQLite (`common/connections.py`).
+
+Pour chaque profil, sur une base neuve : latence d'une écriture validée seule (p50/p99, ce que paie
+une commande qui pose un cooldown), débit de validations par seconde, débit d'insertion par lots et
+latence d'une lecture ponctuelle par clé primaire sur une table de `--rows` lignes.
+
+Usage : python benchmarks/bench_connection_profiles.py [--profiles compat durable throughput] [--rows 200000] [--json]
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import closing
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from common import connections
+
+COMMITS = 500
+READS = 20000
+BATCH = 1000
+
+
+def percentile(values: list[float], p: float) -> float:
+    return statistics.quantiles(values, n=100)[int(p) - 1]
+
+
+def run_profile(name: str, folder: Path, rows: int) -> dict[str, float]:
+    path = folder / f'{name}.db'
+    with closing(connections.connect(path, 'bench', profile=name)) as conn:
+        conn.execute('CREATE TABLE kv (id INTEGER PRIMARY KEY, name TEXT NOT NULL, value INTEGER NOT NULL)')
+        conn.commit()
+
+        # Écritures validées une à une
+        latencies = []
+        start = time.perf_counter()
+        for i in range(COMMITS):
+            t = time.perf_counter()
+            conn.execute('INSERT INTO kv (name, value) VALUES (?, ?)', (f'commit_{i}', i))
+            conn.commit()
+            latencies.append((time.perf_counter() - t) * 1000)
+        commit_s = time.perf_counter() - start
+
+        # Insertion par lots
+        start = time.perf_counter()
+        for offset in range(0, rows, BATCH):
+            conn.executemany('INSERT INTO kv (name, value) VALUES (?, ?)',
+                             ((f'row_{i}', i) for i in range(offset, min(offset + BATCH, rows))))
+            conn.commit()
+        bulk_s = time.perf_counter() - start
+
+    # Lectures ponctuelles sur une nouvelle connexion (cache froid, comme au démarrage)
+    with closing(connections.connect(path, 'bench', profile=name)) as conn:
+        total = conn.execute('SELECT MAX(id) FROM kv').fetchone()[0]
+        ids = [random.randint(1, total) for _ in range(READS)]
+        start = time.perf_counter()
+        for row_id in ids:
+            conn.execute('SELECT value FROM kv WHERE id = ?', (row_id,)).fetchone()
+        read_s = time.perf_counter() - start
+
+    return {
+        'commit_p50_ms': percentile(latencies, 50),
+        'commit_p99_ms': percentile(latencies, 99),
+        'commits_per_s': COMMITS / commit_s,
+        'bulk_rows_per_s': rows / bulk_s,
+        'point_read_us': read_s / READS * 10 ** 6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--profiles', nargs='+', default=list(connections.PROFILES), choices=list(connections.PROFILES))
+    parser.add_argument('--rows', type=int, default=200000, help="Nombre de lignes de la table lue")
+    parser.add_argument('--json', action='store_true', help="Sortie au format JSON")
+    args = parser.parse_args()
+
+    random.seed(0)
+    folder = Path(tempfile.mkdtemp(prefix='robin_bench_'))
+    results = {name: run_profile(name, folder, args.rows) for name in args.profiles}
+
+    if args.json:
+        print(json.dumps({'rows': args.rows, 'databases': connections.DATABASE_PROFILES, 'results': results}, indent=2))
+    else:
+        metrics = list(next(iter(results.values())))
+        print(f"{'profil':<12}" + ''.join(f"{m:>18}" for m in metrics))
+        for name, values in results.items():
+            print(f"{name:<12}" + ''.join(f"{values[m]:>18.3f}" for m in metrics))
+
+
+if __name__ == '__main__':
+    main()
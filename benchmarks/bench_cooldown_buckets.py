@@ -0,0 +1,116 @@
+"""Benchmark du cache des buckets de cooldowns (`CooldownManager.get`).
+
+Simule `--users` utilisateurs distincts (objets factices avec un ID et un contenu, à la manière de
+`discord.Member`) et compare le registre borné actuel (LRU sans référence aux entités) à un registre
+non borné retenant chaque entité, comme auparavant : mémoire retenue, entités maintenues en vie,
+latence de `get` et taux de succès sur une charge réaliste (quelques utilisateurs très actifs).
+
+Usage : python benchmarks/bench_cooldown_buckets.py [--users 1000000] [--json]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import weakref
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.chdir(tempfile.mkdtemp(prefix='robin_bench_'))  # cooldowns.db est créé dans le dossier courant
+
+from common.cooldowns import CooldownManager
+
+
+class FakeMember:
+    """Entité factice : un ID et quelques attributs, comme un membre mis en cache par discord.py."""
+    __slots__ = ('id', 'name', 'roles', '__weakref__')
+    
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.name = f'user{user_id}'
+        self.roles = [user_id]
+
+
+class LegacyBucket:
+    """Ancien bucket : clé, gestionnaire et référence forte vers l'entité."""
+    def __init__(self, bucket_key: str, manager, entity):
+        self.bucket_key = bucket_key
+        self.manager = manager
+        self.entity = entity
+
+
+def fill(registry_get, users: int, trace: bool = False) -> tuple[float, float, int]:
+    """Retourne (Mo retenus, ns par appel, entités encore en vie) après `users` appels pour des entités distinctes.
+    
+    La mémoire n'est mesurée qu'avec `trace` (tracemalloc fausse la latence).
+    """
+    alive = []
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    for user_id in range(users):
+        member = FakeMember(user_id)
+        if user_id % 1000 == 0:
+            alive.append(weakref.ref(member))
+        registry_get(member)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    size = 0.0
+    if trace:
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    return size / 2 ** 20, elapsed / users * 10 ** 9, sum(ref() is not None for ref in alive) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=1000000, help="Nombre d'utilisateurs distincts")
+    parser.add_argument('--json', action='store_true', help="Sortie au format JSON")
+    args = parser.parse_args()
+    
+    manager = CooldownManager()
+    results = {}
+    
+    # Registre non borné avec références aux entités (comportement précédent)
+    legacy = {}
+    def legacy_get(entity):
+        key = manager._generate_bucket_key(entity)
+        if key not in legacy:
+            legacy[key] = LegacyBucket(key, manager, entity)
+        return legacy[key]
+    _, results['unbounded_get_ns'], _ = fill(legacy_get, args.users)
+    legacy.clear()
+    results['unbounded_mb'], _, results['unbounded_alive_entities'] = fill(legacy_get, args.users, trace=True)
+    legacy.clear()
+    
+    # Registre LRU borné
+    _, results['lru_get_ns'], _ = fill(manager.get, args.users)
+    manager._buckets.clear()
+    results['lru_mb'], _, results['lru_alive_entities'] = fill(manager.get, args.users, trace=True)
+    
+    # Taux de succès sur une charge réaliste : popularité des utilisateurs en loi de puissance
+    manager._buckets.clear()
+    manager._bucket_hits = manager._bucket_misses = 0
+    random.seed(0)
+    members = {}
+    for _ in range(args.users):
+        user_id = min(int(random.paretovariate(0.8)), args.users)
+        manager.get(members.setdefault(user_id, FakeMember(user_id)))
+    stats = manager.get_bucket_cache_stats()
+    results['lru_capacity'] = stats['capacity']
+    results['lru_hit_rate'] = stats['hit_rate']
+    
+    if args.json:
+        print(json.dumps({'users': args.users, 'results': results}, indent=2))
+    else:
+        for name, value in results.items():
+            print(f"{name:<26} {value:>14.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Benchmark du stockage des cooldowns : ancien schéma (clés et noms en texte) vs clés compactes.
+
+Génère une base à l'ancien format (`--users` utilisateurs, un cooldown par nom de `NAMES`), la migre
+avec `CooldownManager` puis compare : taille du fichier (après un VACUUM manuel), durée de la migration,
+et latence des requêtes typiques (lecture ponctuelle, comptage des actifs d'un nom, chargement complet du cache).
+
+Usage : python benchmarks/bench_cooldown_storage.py [--users 200000] [--json]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import closing
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.chdir(tempfile.mkdtemp(prefix='robin_bench_'))  # cooldowns.db est créé dans le dossier courant
+
+from common.cooldowns import CooldownManager, DB_PATH, parse_bucket_key
+
+NAMES = ['slot', 'roulette', 'travail', 'daily']
+REPEAT = 2000
+# Clés personnalisées proches qui doivent rester distinctes après migration et rechargement
+CUSTOM_KEYS = ['custom_7', 'custom_007', 'custom_1000', 'custom_1e3', 'custom_-5']
+
+
+def build_legacy(path: Path, users: int) -> list[tuple[str, str]]:
+    """Crée une base à l'ancien format et retourne ses clés (bucket_key, cooldown_name)."""
+    now = int(time.time())
+    random.seed(0)
+    rows = [(f'user_{random.getrandbits(60)}', name, now + random.randint(60, 86400), now, None)
+            for _ in range(users) for name in NAMES]
+    rows += [(key, 'daily', now + 3600, now, key) for key in CUSTOM_KEYS]
+    with closing(sqlite3.connect(path)) as conn:
+        conn.execute('''
+            CREATE TABLE cooldowns (
+                bucket_key TEXT NOT NULL,
+                cooldown_name TEXT NOT NULL,
+                expires_at INTEGER NOT NULL,
+                created_at INTEGER NOT NULL,
+                metadata TEXT,
+                PRIMARY KEY (bucket_key, cooldown_name)
+            )
+        ''')
+        conn.execute('CREATE INDEX idx_expires_at ON cooldowns (expires_at)')
+        conn.execute('CREATE INDEX idx_bucket_key ON cooldowns (bucket_key)')
+        conn.executemany('INSERT INTO cooldowns VALUES (?, ?, ?, ?, ?)', rows)
+        conn.commit()
+        conn.execute('VACUUM')
+    return [(row[0], row[1]) for row in rows]
+
+
+def check_distinct_keys(manager: CooldownManager, path: Path):
+    """Vérifie que les IDs textuels et entiers proches restent des clés distinctes en base (ce que relit le cache)."""
+    manager.get('007').set('slot', 3600, metadata='007')
+    manager.get(7).set('slot', 3600, metadata='7')
+    manager.get('007').clear()  # Ne doit pas toucher aux cooldowns de l'ID entier 7
+    manager.flush()
+    with closing(sqlite3.connect(path)) as conn:
+        stored = {(row[0], row[1]): row[2] for row in conn.execute(
+            "SELECT c.entity_type, c.entity_id, group_concat(n.name) FROM cooldowns c "
+            "JOIN cooldown_names n USING (name_id) WHERE c.entity_type = 7 GROUP BY 1, 2")}
+    expected = {parse_bucket_key(key) for key in CUSTOM_KEYS} - {parse_bucket_key('custom_007')}
+    assert set(stored) == expected, f"Clés personnalisées confondues : {stored}"
+    assert stored[(7, 7)] == 'daily,slot' or stored[(7, 7)] == 'slot,daily', stored[(7, 7)]
+    assert stored[(7, '1e3')] == 'daily' and stored[(7, 1000)] == 'daily', stored
+
+
+def timed(conn: sqlite3.Connection, query: str, params_list: list[tuple], fetch: str = 'one') -> float:
+    """Latence moyenne d'une requête, en microsecondes."""
+    start = time.perf_counter()
+    for params in params_list:
+        cursor = conn.execute(query, params)
+        cursor.fetchone() if fetch == 'one' else cursor.fetchall()
+    return (time.perf_counter() - start) / len(params_list) * 10 ** 6
+
+
+def measure(path: Path, keys: list[tuple[str, str]], compact: bool) -> dict[str, float]:
+    now = int(time.time())
+    sample = random.sample(keys, REPEAT)
+    with closing(sqlite3.connect(path)) as conn:
+        if compact:
+            names = dict(conn.execute('SELECT name, name_id FROM cooldown_names'))
+            point = timed(conn, 'SELECT expires_at FROM cooldowns WHERE entity_type = ? AND entity_id = ? AND name_id = ?',
+                          [(*parse_bucket_key(key), names[name]) for key, name in sample])
+            count = timed(conn, 'SELECT COUNT(*) FROM cooldowns WHERE name_id = ? AND expires_at > ?',
+                          [(names['travail'], now)] * 20)
+            load = timed(conn, 'SELECT entity_type, entity_id, name_id, expires_at, created_at, metadata FROM cooldowns', [()], fetch='all')
+        else:
+            point = timed(conn, 'SELECT expires_at FROM cooldowns WHERE bucket_key = ? AND cooldown_name = ?', sample)
+            count = timed(conn, 'SELECT COUNT(*) FROM cooldowns WHERE cooldown_name = ? AND expires_at > ?',
+                          [('travail', now)] * 20)
+            load = timed(conn, 'SELECT bucket_key, cooldown_name, expires_at, created_at, metadata FROM cooldowns', [()], fetch='all')
+    return {
+        'size_mb': path.stat().st_size / 2 ** 20,
+        'point_read_us': point,
+        'count_by_name_ms': count / 1000,
+        'full_load_ms': load / 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200000, help="Nombre d'utilisateurs ayant des cooldowns")
+    parser.add_argument('--json', action='store_true', help="Sortie au format JSON")
+    args = parser.parse_args()
+    
+    DB_PATH.mkdir(parents=True, exist_ok=True)
+    db_file = DB_PATH / 'cooldowns.db'
+    legacy_file = Path('legacy.db')
+    keys = build_legacy(legacy_file, args.users)
+    shutil.copy(legacy_file, db_file)
+    
+    start = time.perf_counter()
+    manager = CooldownManager()  # Migration au chargement
+    migration_s = time.perf_counter() - start
+    manager.flush()
+    check_distinct_keys(manager, db_file)
+    manager.conn.execute('VACUUM')  # Manuel : la migration ne compacte pas le fichier
+    manager.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    
+    results = {
+        'legacy': measure(legacy_file, keys, compact=False),
+        'compact': measure(db_file, keys, compact=True),
+    }
+    results['compact']['migration_and_load_s'] = migration_s
+    
+    if args.json:
+        print(json.dumps({'users': args.users, 'rows': len(keys), 'results': results}, indent=2))
+    else:
+        metrics = list(results['legacy'])
+        print(f"{'':<22}{'legacy':>14}{'compact':>14}")
+        for metric in metrics:
+            print(f"{metric:<22}{results['legacy'][metric]:>14.3f}{results['compact'][metric]:>14.3f}")
+        print(f"{'migration_and_load_s':<22}{'':>14}{migration_s:>14.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Micro-benchmark des identifiants d'opération : ancien schéma (horodatage + hash 16 bits) vs `IdGenerator`.
+
+Mesure le débit de génération et le nombre de collisions lors d'une rafale (toutes les opérations dans
+la même seconde, même utilisateur, même description — ex. mises identiques au casino).
+
+Usage : python benchmarks/bench_ids.py [--count 200000] [--threads 4] [--json]
+"""
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from common.economy import IdGenerator, to_base62
+
+
+def legacy_generate_id(user_id: int, balance: int, description: str, timestamp: int = None) -> str:
+    """Ancien générateur, reproduit pour comparaison."""
+    if timestamp is None:
+        timestamp = int(time.time())
+    data = f"{user_id}-{balance}-{description}".encode()
+    hash_num = int.from_bytes(hashlib.blake2s(data, digest_size=2).digest(), "big")
+    return f"{to_base62(timestamp)}{to_base62(hash_num)}"
+
+
+def bench_legacy(count: int) -> dict:
+    start = time.perf_counter()
+    ids = [legacy_generate_id(1, -10, "Machine à sous - mise") for _ in range(count)]
+    elapsed = time.perf_counter() - start
+    return {'ids_per_s': count / elapsed, 'collisions': count - len(set(ids)), 'length': max(map(len, ids))}
+
+
+def bench_snowflake(count: int) -> dict:
+    gen = IdGenerator()
+    start = time.perf_counter()
+    ids = [gen.next_id() for _ in range(count)]
+    elapsed = time.perf_counter() - start
+    return {'ids_per_s': count / elapsed, 'collisions': count - len(set(ids)), 'length': max(map(len, ids)),
+            'monotonic': ids == sorted(ids)}
+
+
+def bench_snowflake_threads(count: int, threads: int) -> dict:
+    gen = IdGenerator()
+    results = [[] for _ in range(threads)]
+
+    def worker(out: list):
+        for _ in range(count // threads):
+            out.append(gen.next_id())
+
+    workers = [threading.Thread(target=worker, args=(out,)) for out in results]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    ids = [i for out in results for i in out]
+    return {'ids_per_s': len(ids) / elapsed, 'collisions': len(ids) - len(set(ids)),
+            'monotonic': all(out == sorted(out) for out in results)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=200000, help="Nombre d'identifiants par scénario")
+    parser.add_argument('--threads', type=int, default=4, help="Nombre de fils pour le scénario concurrent")
+    parser.add_argument('--json', action='store_true', help="Sortie au format JSON")
+    args = parser.parse_args()
+
+    results = {
+        'legacy_hash': bench_legacy(args.count),
+        'snowflake': bench_snowflake(args.count),
+        'snowflake_threads': bench_snowflake_threads(args.count, args.threads),
+    }
+
+    if args.json:
+        print(json.dumps({'count': args.count, 'threads': args.threads, 'results': results}, indent=2))
+    else:
+        for name, res in results.items():
+            extra = ' '.join(f"{k}={v}" for k, v in res.items() if k != 'ids_per_s')
+            print(f"{name:<18} {res['ids_per_s']:>12.0f} ids/s  {extra}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark des classements : requête SQL (`get_leaderboard`) vs index en mémoire (`LeaderboardIndex`).
+
+Mesure la latence du rang d'un membre (`/account`) et du top 20 (`/ranking`) dans une guilde,
+le coût d'une mise à jour de solde dans l'index, et la mémoire occupée par compte classé.
+
+Usage : python benchmarks/bench_leaderboard.py [--accounts 200000] [--members 20000] [--json]
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from common.economy import EconomyDBManager
+from common.ranking import RankIndex
+
+GUILD_ID = 1
+REPEAT = 200
+
+
+def timed(func, repeat: int = REPEAT) -> float:
+    """Latence moyenne d'un appel, en millisecondes."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def measure_memory(accounts: int) -> float:
+    """Octets par compte d'un `RankIndex` : clés, blocs et dictionnaire (les entiers des IDs, partagés avec l'appelant, ne sont pas comptés)."""
+    rows = [(random.getrandbits(62), random.randint(0, 10 ** 6)) for _ in range(accounts)]
+    tracemalloc.start()
+    index = RankIndex(rows)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(index) == accounts
+    return size / accounts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--accounts', type=int, default=200000, help="Nombre de comptes en base")
+    parser.add_argument('--members', type=int, default=20000, help="Nombre de membres de la guilde")
+    parser.add_argument('--json', action='store_true', help="Sortie au format JSON")
+    args = parser.parse_args()
+
+    random.seed(0)
+    eco = EconomyDBManager(Path(tempfile.mkdtemp(prefix='robin_bench_')))
+    with eco.transaction() as cursor:
+        cursor.executemany('INSERT INTO economy (user_id, balance) VALUES (?, ?)',
+                           [(uid, random.randint(0, 10 ** 6)) for uid in range(args.accounts)])
+    members = random.sample(range(args.accounts), args.members)
+    focus = members[0]
+
+    start = time.perf_counter()
+    eco.get_guild_leaderboard(GUILD_ID, members, limit=0)
+    load_s = time.perf_counter() - start
+
+    results = {
+        'sql_rank_ms': timed(lambda: eco.get_leaderboard(members, limit=0, focus=focus), 20),
+        'sql_top20_ms': timed(lambda: eco.get_leaderboard(members, limit=20, focus=focus), 20),
+        'index_rank_ms': timed(lambda: eco.get_guild_leaderboard(GUILD_ID, limit=0, focus=focus)),
+        'index_top20_ms': timed(lambda: eco.get_guild_leaderboard(GUILD_ID, limit=20, focus=focus)),
+        'index_update_us': timed(lambda: eco.leaderboards.update(random.choice(members), random.randint(0, 10 ** 6)), 10000) * 1000,
+        'index_load_s': load_s,
+        'bytes_per_account': measure_memory(args.accounts),
+    }
+    results['mb_per_million_accounts'] = results['bytes_per_account'] * 10 ** 6 / 2 ** 20
+
+    if args.json:
+        print(json.dumps({'accounts': args.accounts, 'members': args.members, 'results': results}, indent=2))
+    else:
+        for name, value in results.items():
+            print(f"{name:<26} {value:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark du chargement en masse des opérations (exports, audits).
+
+Compare, pour un historique de N opérations :
+- `sqlite_only` : lecture brute en tuples, soit le coût propre à SQLite ;
+- `row_constructor` : `sqlite3.Row` puis constructeur d'`Operation` (ancien chemin) ;
+- `from_rows` : tuples bruts convertis par `Operation.from_rows`, chemin de `EconomyDBManager.get_operations`.
+
+Usage : python benchmarks/bench_operation_load.py [--ops 100000] [--repeat 5] [--json]
+"""
+import argparse
+import json
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from common.economy import EconomyDBManager, Operation, OPERATION_COLUMNS
+
+
+def seed(eco: EconomyDBManager, ops: int):
+    now = int(time.time())
+    with eco.transaction() as cursor:
+        cursor.execute('INSERT OR IGNORE INTO economy (user_id, balance) VALUES (1, 0)')
+        Operation.save_many((Operation(user_id=1, delta=i % 200 - 100, description=f"Opération {i}", timestamp=now - i)
+                             for i in range(ops)), cursor)
+
+
+def timed(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ops', type=int, default=100000, help="Nombre d'opérations chargées")
+    parser.add_argument('--repeat', type=int, default=5, help="Nombre de répétitions (meilleur temps retenu)")
+    parser.add_argument('--json', action='store_true', help="Sortie au format JSON")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix='robin_bench_'))
+    eco = EconomyDBManager(tmp)
+    seed(eco, args.ops)
+    query = f'SELECT {OPERATION_COLUMNS} FROM operations WHERE user_id = 1 ORDER BY timestamp DESC, id DESC'
+
+    def sqlite_only():
+        cursor = eco.conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(query).fetchall()
+
+    def row_constructor():
+        cursor = eco.conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        [Operation(user_id=row['user_id'], delta=row['delta'], description=row['description'],
+                   timestamp=row['timestamp'], id=row['id']) for row in cursor.execute(query)]
+
+    def from_rows():
+        eco.get_operations(user_id=1)
+
+    results = {name: timed(func, args.repeat) for name, func in
+               (('sqlite_only', sqlite_only), ('row_constructor', row_constructor), ('from_rows', from_rows))}
+
+    if args.json:
+        print(json.dumps({'ops': args.ops, 'unit': 's', 'results': results}, indent=2))
+    else:
+        baseline = results['sqlite_only']
+        for name, elapsed in results.items():
+            print(f"{name:<16} {elapsed * 1000:>8.1f} ms  {args.ops / elapsed:>10.0f} ops/s  (x{elapsed / baseline:.2f} SQLite)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark des paiements groupés : boucle `get_account(...).deposit(...)` vs `EconomyDBManager.deposit_many`.
+
+Simule la récompense d'un événement pour N membres (dont une partie sans compte existant).
+
+Usage : python benchmarks/bench_payouts.py [--users 5000] [--json]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from common.economy import EconomyDBManager
+
+
+def bench_loop(eco: EconomyDBManager, user_ids: list[int]) -> float:
+    start = time.perf_counter()
+    for uid in user_ids:
+        eco.get_account(SimpleNamespace(id=uid)).deposit(100, "Événement - récompense")
+    return time.perf_counter() - start
+
+
+def bench_bulk(eco: EconomyDBManager, user_ids: list[int]) -> float:
+    start = time.perf_counter()
+    report = eco.deposit_many((uid, 100, "Événement - récompense") for uid in user_ids)
+    elapsed = time.perf_counter() - start
+    assert not report.failed
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=5000, help="Nombre de membres récompensés")
+    parser.add_argument('--json', action='store_true', help="Sortie au format JSON")
+    args = parser.parse_args()
+
+    eco = EconomyDBManager(Path(tempfile.mkdtemp(prefix='robin_bench_')))
+    results = {}
+    for i, (name, bench) in enumerate((('loop_deposit', bench_loop), ('deposit_many', bench_bulk))):
+        user_ids = list(range(i * args.users, (i + 1) * args.users))  # Membres distincts par scénario
+        # La moitié des membres a déjà un compte
+        eco.deposit_many((uid, 1, "Initialisation") for uid in user_ids[::2])
+        elapsed = bench(eco, user_ids)
+        results[name] = {'seconds': elapsed, 'payouts_per_s': args.users / elapsed}
+
+    if args.json:
+        print(json.dumps({'users': args.users, 'results': results}, indent=2))
+    else:
+        baseline = results['loop_deposit']['seconds']
+        for name, res in results.items():
+            print(f"{name:<14} {res['seconds']:>8.3f}s  {res['payouts_per_s']:>10.0f} paiements/s  (x{baseline / res['seconds']:.1f})")
+
+
+if __name__ == '__main__':
+    main()
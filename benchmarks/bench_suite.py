@@ -0,0 +1,299 @@
+"""Suite de benchmarks de l'économie (`EconomyDBManager`, `BankAccount`) sur bases synthétiques.
+
+Génère (ou réutilise) une base de `--accounts` comptes et `--operations` opérations réparties sur un an,
+puis mesure :
+- débit des dépôts (synchrones, via le pipeline de validations groupées, et groupés par `deposit_many`) ;
+- débit des transferts ;
+- latence des pages d'historique (première page et page profonde) ;
+- latence de la variation sur 24 h et 30 jours ;
+- latence du classement (SQL et index en mémoire) pour une guilde ;
+- coût d'une annulation en bloc (aperçu et écriture).
+
+Les résultats sont écrits en JSON (`--output`) ; avec `--baseline`, ils sont comparés à un fichier précédent
+et le code de sortie vaut 1 si une mesure régresse au-delà de `--tolerance`.
+
+Échelles prédéfinies (`--scale`) : small (10k comptes / 1M opérations), medium (100k / 10M), large (1M / 50M).
+La génération est mise en cache dans `--data-dir` (par défaut dans le dossier temporaire du système, hors du dépôt) :
+une base n'est générée qu'une fois par échelle.
+
+Usage : python benchmarks/bench_suite.py [--scale small] [--output results.json] [--baseline old.json]
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from common.economy import AsyncEconomy, EconomyDBManager, EconomyError, STARTING_BALANCE, DAY_SECONDS
+
+SCALES = {
+    'small': (10_000, 1_000_000),
+    'medium': (100_000, 10_000_000),
+    'large': (1_000_000, 50_000_000),
+}
+DESCRIPTIONS = ("Machine à sous - mise", "Machine à sous - gain", "Roulette - mise", "Roulette - gain",
+                "Travail de cuisinier - Pâtes", "Travail de livreur - Colis", "Transfert vers Robin",
+                "Transfert de Robin", "Achat bannière - Forêt")
+GUILD_MEMBERS = 5000
+SAMPLES = 200
+ROLLBACK_DEPTH = 50  # Opérations annulées par mesure d'annulation
+
+
+# Génération -----------------------------
+
+def generate(path: Path, accounts: int, operations: int):
+    """Crée une base synthétique cohérente (soldes = solde initial + somme des opérations).
+
+    Les index et agrégats journaliers sont ensuite créés par `EconomyDBManager` à l'ouverture.
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path / 'economy.db')
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.executescript(f'''
+        CREATE TABLE economy (user_id INTEGER PRIMARY KEY, balance INTEGER DEFAULT {STARTING_BALANCE});
+        CREATE TABLE operations (
+            id TEXT PRIMARY KEY, user_id INTEGER, delta INTEGER, description TEXT, timestamp INTEGER NOT NULL,
+            FOREIGN KEY(user_id) REFERENCES economy(user_id)
+        );
+    ''')
+    # Opérations générées en SQL : IDs de largeur fixe croissants, horodatages croissants sur un an
+    description = 'CASE abs(random()) % {} {} END'.format(
+        len(DESCRIPTIONS), ' '.join(f"WHEN {i} THEN '{text}'" for i, text in enumerate(DESCRIPTIONS)))
+    start = int(time.time()) - 365 * DAY_SECONDS
+    step = 365 * DAY_SECONDS / operations
+    chunk = 1_000_000
+    for offset in range(0, operations, chunk):
+        end = min(offset + chunk, operations)
+        conn.execute(f'''
+            WITH RECURSIVE n(i) AS (SELECT ? UNION ALL SELECT i + 1 FROM n WHERE i + 1 < ?)
+            INSERT INTO operations (id, user_id, delta, description, timestamp)
+            SELECT printf('%011d', i), abs(random()) % {accounts}, (abs(random()) % 201) - 95, {description},
+                   CAST(? + i * ? AS INTEGER)
+            FROM n
+        ''', (offset, end, start, step))
+        conn.commit()
+        print(f"  {end}/{operations} opérations générées", file=sys.stderr)
+    conn.execute(f'''
+        WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i + 1 < {accounts}),
+        sums AS (SELECT user_id, SUM(delta) AS total FROM operations GROUP BY user_id)
+        INSERT INTO economy (user_id, balance)
+        SELECT i, {STARTING_BALANCE} + COALESCE(sums.total, 0) FROM n LEFT JOIN sums ON sums.user_id = n.i
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def open_database(data_dir: Path, accounts: int, operations: int, fresh: bool) -> tuple[EconomyDBManager, Path]:
+    """Copie la base de référence (générée au besoin) dans un dossier de travail, puis l'ouvre."""
+    reference = data_dir / f'economy_{accounts}_{operations}'
+    if fresh and reference.exists():
+        shutil.rmtree(reference)
+    if not (reference / 'economy.db').exists():
+        print(f"Génération de la base ({accounts} comptes, {operations} opérations)…", file=sys.stderr)
+        generate(reference, accounts, operations)
+        start = time.perf_counter()
+        db = EconomyDBManager(reference)  # Index et agrégats créés une fois pour toutes
+        db.conn.close()
+        db.conn = None
+        EconomyDBManager._instance = None
+        print(f"  index et agrégats : {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    work = data_dir / 'work'
+    if work.exists():
+        shutil.rmtree(work)
+    shutil.copytree(reference, work)  # Les mesures d'écriture ne modifient pas la base de référence
+    return EconomyDBManager(work), work
+
+
+# Mesures -----------------------------
+
+def latency(func, samples: int = SAMPLES) -> dict:
+    """Latences d'une fonction de lecture appelée `samples` fois (ms)."""
+    for i in range(min(10, samples)):
+        func(i)  # Échauffement : caches de pages SQLite et de comptes
+    values = []
+    for i in range(samples):
+        start = time.perf_counter()
+        func(i)
+        values.append((time.perf_counter() - start) * 1000)
+    return percentiles(values)
+
+
+def percentiles(values: list[float]) -> dict:
+    values = sorted(values)
+    return {'p50': statistics.median(values), 'p95': values[math.ceil(len(values) * 0.95) - 1],
+            'p99': values[math.ceil(len(values) * 0.99) - 1]}
+
+
+def throughput(func, count: int) -> float:
+    """Appels par seconde d'une fonction appelée `count` fois."""
+    start = time.perf_counter()
+    for i in range(count):
+        func(i)
+    return count / (time.perf_counter() - start)
+
+
+async def pipeline_throughput(eco: AsyncEconomy, accounts: list, count: int, concurrency: int = 64) -> float:
+    per_worker = count // concurrency
+
+    async def worker(w: int):
+        for i in range(per_worker):
+            await eco.deposit(accounts[(w * per_worker + i) % len(accounts)], 1, "Benchmark - dépôt")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    return per_worker * concurrency / (time.perf_counter() - start)
+
+
+def run(eco: EconomyDBManager, accounts: int, writes: int) -> dict:
+    rng = random.Random(0)
+    # Comptes échantillonnés, distincts et assez riches pour les transferts et annulations
+    users = [row[0] for row in eco.conn.execute('SELECT user_id FROM economy WHERE balance >= ?', (writes,))]
+    users = rng.sample(users, min(SAMPLES, len(users)))
+    account = lambda i: eco.get_account(SimpleNamespace(id=users[i % len(users)]))
+    now = time.time()
+    results = {}
+
+    def record(name: str, value, unit: str, better: str):
+        results[name] = {'value': value, 'unit': unit, 'better': better}
+        shown = ' '.join(f"{k}={v:.3f}" for k, v in value.items()) if isinstance(value, dict) else f"{value:.1f}"
+        print(f"  {name:<28} {shown} {unit}", file=sys.stderr)
+
+    # Lectures
+    record('history_first_page', latency(lambda i: account(i).iter_operations(page_size=5).get_page(0)), 'ms', 'lower')
+    record('history_deep_page', latency(lambda i: account(i).iter_operations(page_size=5).get_page(20)), 'ms', 'lower')
+    record('history_count', latency(lambda i: account(i).iter_operations().count), 'ms', 'lower')
+    record('variation_24h', latency(lambda i: account(i).get_variation_since(now - DAY_SECONDS)), 'ms', 'lower')
+    record('variation_30d', latency(lambda i: account(i).get_variation_since(now - 30 * DAY_SECONDS)), 'ms', 'lower')
+
+    members = rng.sample(range(accounts), min(GUILD_MEMBERS, accounts))
+    guild_id = 1
+    record('ranking_sql', latency(lambda i: eco.get_leaderboard(members, limit=20, focus=members[i % len(members)]), 50), 'ms', 'lower')
+    eco.get_guild_leaderboard(guild_id, members, limit=0)  # Chargement de l'index
+    record('ranking_index', latency(lambda i: eco.get_guild_leaderboard(guild_id, limit=20, focus=members[i % len(members)])), 'ms', 'lower')
+
+    # Écritures
+    record('deposit_sync', throughput(lambda i: account(i).deposit(1, "Benchmark - dépôt"), writes), 'ops/s', 'higher')
+    record('transfer_sync', throughput(lambda i: eco.transfer(users[i % len(users)], users[(i + 1) % len(users)], 1,
+                                                                ("Transfert vers Bench", "Transfert de Bench")), writes), 'ops/s', 'higher')
+    async_eco = AsyncEconomy(eco)
+    targets = [account(i) for i in range(len(users))]
+    record('deposit_pipeline', asyncio.run(pipeline_throughput(async_eco, targets, writes)), 'ops/s', 'higher')
+    start = time.perf_counter()
+    eco.deposit_many((users[i % len(users)], 1, "Benchmark - dépôt groupé") for i in range(writes * 10))
+    record('deposit_many', writes * 10 / (time.perf_counter() - start), 'ops/s', 'higher')
+
+    # Annulations : les ROLLBACK_DEPTH dernières opérations de comptes choisis à l'avance, chacun annulé une seule fois
+    # (une seconde annulation porterait sur les opérations compensatoires), sans échauffement par des écritures
+    targets, skipped = [], 0
+    for user_id in users:
+        target = eco.get_operations(user_id=user_id, limit=1, offset=ROLLBACK_DEPTH - 1)
+        if target and eco.rollback(user_id, target[0].id, dry_run=True).new_balance >= 0:
+            targets.append((user_id, target[0].id))
+        else:
+            skipped += 1  # Moins de ROLLBACK_DEPTH opérations, ou solde négatif après annulation
+    if not targets:
+        raise SystemExit(f"Aucun compte échantillonné n'a {ROLLBACK_DEPTH} opérations annulables : augmenter --operations.")
+    if skipped:
+        print(f"  annulations : {skipped}/{len(users)} comptes écartés (historique trop court ou solde insuffisant)", file=sys.stderr)
+
+    def timed_rollbacks(dry_run: bool) -> tuple[list[float], int]:
+        values, failed = [], 0
+        for user_id, target_id in targets:
+            start = time.perf_counter()
+            try:
+                result = eco.rollback(user_id, target_id, dry_run=dry_run)
+            except EconomyError as e:
+                failed += 1
+                print(f"  annulation de {user_id} jusqu'à {target_id} en échec : {e}", file=sys.stderr)
+                continue
+            values.append((time.perf_counter() - start) * 1000)
+            assert len(result) == ROLLBACK_DEPTH, f"{len(result)} opérations annulées au lieu de {ROLLBACK_DEPTH}"
+        return values, failed
+
+    for name, dry_run in ((f'rollback_preview_{ROLLBACK_DEPTH}', True), (f'rollback_{ROLLBACK_DEPTH}', False)):
+        values, failed = timed_rollbacks(dry_run)
+        if not values:
+            raise SystemExit(f"Toutes les annulations ont échoué ({failed}).")
+        record(name, percentiles(values), 'ms', 'lower')
+        results[name].update(samples=len(values), skipped=skipped, failed=failed)
+    async_eco.close()
+    return results
+
+
+# Comparaison -----------------------------
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """Affiche la comparaison avec une exécution de référence ; retourne False en cas de régression."""
+    ok = True
+    print(f"{'mesure':<28} {'référence':>12} {'actuel':>12} {'ratio':>8}")
+    for name, current in results.items():
+        if name not in baseline:
+            continue
+        before, after = _scalar(baseline[name]['value']), _scalar(current['value'])
+        ratio = after / before if before else float('inf')
+        worse = ratio < 1 - tolerance if current['better'] == 'higher' else ratio > 1 + tolerance
+        ok &= not worse
+        print(f"{name:<28} {before:>12.3f} {after:>12.3f} {ratio:>7.2f}x{'  RÉGRESSION' if worse else ''}")
+    return ok
+
+
+def _scalar(value) -> float:
+    return value['p50'] if isinstance(value, dict) else value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=SCALES, default='small', help="Échelle prédéfinie")
+    parser.add_argument('--accounts', type=int, help="Nombre de comptes (remplace l'échelle)")
+    parser.add_argument('--operations', type=int, help="Nombre d'opérations (remplace l'échelle)")
+    parser.add_argument('--writes', type=int, default=2000, help="Nombre d'écritures par mesure de débit")
+    parser.add_argument('--data-dir', type=Path, default=Path(tempfile.gettempdir()) / 'robin_bench_suite', help="Dossier des bases générées")
+    parser.add_argument('--fresh', action='store_true', help="Régénère la base de référence")
+    parser.add_argument('--output', type=Path, help="Fichier JSON de résultats")
+    parser.add_argument('--baseline', type=Path, help="Fichier JSON de référence à comparer")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Écart toléré avant de signaler une régression")
+    args = parser.parse_args()
+
+    accounts, operations = SCALES[args.scale]
+    accounts, operations = args.accounts or accounts, args.operations or operations
+    eco, work = open_database(args.data_dir, accounts, operations, args.fresh)
+    print(f"Mesures ({accounts} comptes, {operations} opérations)…", file=sys.stderr)
+    results = run(eco, accounts, args.writes)
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    report = {
+        'meta': {'accounts': accounts, 'operations': operations, 'writes': args.writes, 'commit': commit,
+                 'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version, 'date': int(time.time())},
+        'results': results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline['meta']['accounts'] != accounts or baseline['meta']['operations'] != operations:
+            print("Attention : la référence a été mesurée à une autre échelle.", file=sys.stderr)
+        if not compare(results, baseline['results'], args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
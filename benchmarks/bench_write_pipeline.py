@@ -0,0 +1,91 @@
+"""Benchmark du débit de dépôts : ancien schéma à deux validations vs transaction unique vs group commit.
+
+Usage : python benchmarks/bench_write_pipeline.py [--ops 2000] [--concurrency 64] [--json]
+"""
+import argparse
+import asyncio
+import json
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from common.economy import EconomyDBManager, Operation, STARTING_BALANCE
+
+
+def bench_legacy(db_path: Path, ops: int) -> float:
+    """Reproduit l'ancien chemin d'écriture : une validation pour l'opération, une pour le solde."""
+    conn = sqlite3.connect(db_path)
+    conn.execute(f'CREATE TABLE economy (user_id INTEGER PRIMARY KEY, balance INTEGER DEFAULT {STARTING_BALANCE})')
+    conn.execute('CREATE TABLE operations (id TEXT PRIMARY KEY, user_id INTEGER, delta INTEGER, description TEXT, timestamp INTEGER NOT NULL)')
+    conn.execute('INSERT INTO economy (user_id, balance) VALUES (1, ?)', (STARTING_BALANCE,))
+    conn.commit()
+
+    balance = STARTING_BALANCE
+    start = time.perf_counter()
+    for i in range(ops):
+        op = Operation(user_id=1, delta=1, description=f"Dépôt {i}")
+        conn.execute('INSERT INTO operations (id, user_id, delta, description, timestamp) VALUES (?, ?, ?, ?, ?)',
+                     (op.id, op.user_id, op.delta, op.description, op.timestamp))
+        conn.commit()
+        balance += 1
+        conn.execute('UPDATE economy SET balance = ? WHERE user_id = 1', (balance,))
+        conn.commit()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return ops / elapsed
+
+
+def bench_transaction(eco: EconomyDBManager, ops: int) -> float:
+    """Chemin synchrone actuel : une transaction (une validation) par dépôt."""
+    account = eco.get_account(SimpleNamespace(id=2))
+    start = time.perf_counter()
+    for i in range(ops):
+        account.deposit(1, f"Dépôt {i}")
+    return ops / (time.perf_counter() - start)
+
+
+async def bench_pipeline(eco: EconomyDBManager, ops: int, concurrency: int) -> float:
+    """Dépôts concurrents via le CommitPipeline (validations groupées)."""
+    accounts = [eco.get_account(SimpleNamespace(id=1000 + i)) for i in range(concurrency)]
+    per_worker = ops // concurrency
+
+    async def worker(account):
+        for i in range(per_worker):
+            await eco.pipeline.submit(account.deposit, 1, f"Dépôt {i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(account) for account in accounts))
+    return (per_worker * concurrency) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ops', type=int, default=2000, help="Nombre de dépôts par scénario")
+    parser.add_argument('--concurrency', type=int, default=64, help="Nombre de coroutines concurrentes (group commit)")
+    parser.add_argument('--json', action='store_true', help="Sortie au format JSON")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix='robin_bench_'))
+    eco = EconomyDBManager(tmp)
+
+    results = {
+        'legacy_two_commits': bench_legacy(tmp / 'legacy.db', args.ops),
+        'single_transaction': bench_transaction(eco, args.ops),
+        'group_commit': asyncio.run(bench_pipeline(eco, args.ops, args.concurrency)),
+    }
+
+    if args.json:
+        print(json.dumps({'unit': 'deposits/s', 'ops': args.ops, 'concurrency': args.concurrency, 'results': results}, indent=2))
+    else:
+        baseline = results['legacy_two_commits']
+        for name, rate in results.items():
+            print(f"{name:<22} {rate:>10.0f} dépôts/s  (x{rate / baseline:.1f})")
+
+
+if __name__ == '__main__':
+    main()
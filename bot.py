@@ -12,6 +12,8 @@ from discord import app_commands
 from discord.ext import commands
 from dotenv import dotenv_values
 
+from common.economy import set_worker_id
+
 logging.basicConfig(
     level=logging.INFO,
     format="[%(asctime)s] %(levelname)s (%(name)s %(module)s) %(message)s",
@@ -56,6 +58,9 @@ async def main():
     if "TOKEN" not in bot.config: # type: ignore
         logger.error("Missing TOKEN in .env")
         return
+    if "WORKER_ID" in bot.config: # type: ignore
+        # Identifiants d'opérations : un worker distinct par processus écrivant dans la même base
+        set_worker_id(int(bot.config["WORKER_ID"])) # type: ignore
 
     async with bot:
         logger.info("Loading cogs...")
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import yaml
 from datetime import datetime, timedelta
@@ -5,10 +6,10 @@ from typing import Any, Optional
 
 import discord
 from discord import app_commands, ui
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 from common import dataio
-from common.economy import EconomyDBManager, BankAccount, Operation, MONEY_SYMBOL
+from common.economy import AsyncEconomy, BankAccount, Operation, OperationCursor, Leaderboard, InsufficientFundsError, OperationError, MONEY_SYMBOL
 
 from cogs.banners.banners import Banners, BannerData
 from common.cooldowns import get_all_cooldowns, update_cooldown_expiration
@@ -27,7 +28,9 @@ ICONS = {
 # UI -------------------------------------------
 
 class BankAccountView(ui.LayoutView):
-    def __init__(self, account: BankAccount, user: discord.User, guild: discord.Guild | None = None, banner: BannerData | None = None):
+    def __init__(self, account: BankAccount, user: discord.User, *, 
+                 variation: int, operations: list[Operation], rank: int | None = None, 
+                 guild: discord.Guild | None = None, banner: BannerData | None = None):
         super().__init__(timeout=300)  # 5 minutes timeout
         self.account = account
         self.user = user
@@ -41,11 +44,8 @@ class BankAccountView(ui.LayoutView):
         
         self.balance = ui.TextDisplay(f"{ICONS['coins']} **Solde** · ***{account.balance}{MONEY_SYMBOL}***")
         
-        var_time = (datetime.now() - timedelta(days=1)).timestamp()
-        var_since = account.get_variation_since(var_time)
-        self.variance = ui.TextDisplay(f"{ICONS['chart']} **Variation sur 24h** · *{var_since:+d}{MONEY_SYMBOL}*")
+        self.variance = ui.TextDisplay(f"{ICONS['chart']} **Variation sur 24h** · *{variation:+d}{MONEY_SYMBOL}*")
         
-        rank = account.get_rank_in_guild(guild) if guild else None
         if rank:
             self.rank = ui.TextDisplay(f"{ICONS['ranking']} **Rang sur *{guild.name}*** · *#{rank}*")
         
@@ -61,7 +61,6 @@ class BankAccountView(ui.LayoutView):
         self.trs_title = ui.TextDisplay("### Dernières opérations")
         container.add_item(self.trs_title)
         
-        operations = account.get_recent_operations(limit=5)
         if not operations:
             self.trs = ui.TextDisplay("Aucune opération récente.")
         else:
@@ -96,34 +95,37 @@ class NavigationButtons(ui.ActionRow['OperationHistoryView']):
         super().__init__()
         
     def update_buttons(self):
-        if not self.view or not hasattr(self.view, 'pages'):
+        if not self.view or not hasattr(self.view, 'cursor'):
             return
             
-        total_pages = len(self.view.pages)
+        total_pages = self.view.cursor.known_page_count  # None tant que l'historique n'a pas été compté
         current = self.view.current_page
+        has_next = self.view.cursor.has_next(current)
         
         self.first_page.disabled = (current == 0) or self.view.is_finished()
         self.previous_page.disabled = (current == 0) or self.view.is_finished()
-        self.next_page.disabled = (current >= total_pages - 1) or self.view.is_finished()
-        self.last_page.disabled = (current >= total_pages - 1) or self.view.is_finished()
-        
-        self.page_info.label = f"Page {current + 1}/{total_pages}" if total_pages > 0 else "Page 1/1"
+        self.next_page.disabled = not has_next or self.view.is_finished()
+        self.last_page.disabled = not has_next or self.view.is_finished()
+        
+        self.page_info.label = f"Page {current + 1}/{total_pages or '…'}"
+        
+    async def go_to(self, interaction: discord.Interaction, page: int):
+        await AsyncEconomy().get_page(self.view.cursor, page)  # Chargée hors de la boucle, puis servie par le cache
+        self.view.current_page = page
+        self.view.update_display()
+        self.update_buttons()
+        await interaction.response.edit_message(view=self.view, allowed_mentions=discord.AllowedMentions.none())
+        self.view.schedule_prefetch()
     
     @ui.button(label='<<', style=discord.ButtonStyle.secondary)
     async def first_page(self, interaction: discord.Interaction, button: ui.Button):
         if self.view and not self.view.is_finished():
-            self.view.current_page = 0
-            self.view.update_display()
-            self.update_buttons()
-            await interaction.response.edit_message(view=self.view, allowed_mentions=discord.AllowedMentions.none())
+            await self.go_to(interaction, 0)
     
     @ui.button(label='<', style=discord.ButtonStyle.secondary)
     async def previous_page(self, interaction: discord.Interaction, button: ui.Button):
         if self.view and not self.view.is_finished() and self.view.current_page > 0:
-            self.view.current_page -= 1
-            self.view.update_display()
-            self.update_buttons()
-            await interaction.response.edit_message(view=self.view, allowed_mentions=discord.AllowedMentions.none())
+            await self.go_to(interaction, self.view.current_page - 1)
     
     @ui.button(label='Page 1/1', style=discord.ButtonStyle.primary, disabled=True)
     async def page_info(self, interaction: discord.Interaction, button: ui.Button):
@@ -131,27 +133,20 @@ class NavigationButtons(ui.ActionRow['OperationHistoryView']):
     
     @ui.button(label='>', style=discord.ButtonStyle.secondary)
     async def next_page(self, interaction: discord.Interaction, button: ui.Button):
-        if self.view and not self.view.is_finished() and self.view.current_page < len(self.view.pages) - 1:
-            self.view.current_page += 1
-            self.view.update_display()
-            self.update_buttons()
-            await interaction.response.edit_message(view=self.view, allowed_mentions=discord.AllowedMentions.none())
+        if self.view and not self.view.is_finished() and self.view.cursor.has_next(self.view.current_page):
+            await self.go_to(interaction, self.view.current_page + 1)
     
     @ui.button(label='>>', style=discord.ButtonStyle.secondary)
     async def last_page(self, interaction: discord.Interaction, button: ui.Button):
         if self.view and not self.view.is_finished():
-            self.view.current_page = len(self.view.pages) - 1
-            self.view.update_display()
-            self.update_buttons()
-            await interaction.response.edit_message(view=self.view, allowed_mentions=discord.AllowedMentions.none())
+            # Seul cas où l'historique est compté en entier
+            await self.go_to(interaction, await AsyncEconomy().get_page_count(self.view.cursor) - 1)
 
 class RankingView(ui.LayoutView):
     """Vue pour afficher le classement des utilisateurs par solde."""
-    def __init__(self, sorted_accounts: list, user_account: BankAccount, user_rank: int, guild: discord.Guild, user: discord.User):
+    def __init__(self, leaderboard: Leaderboard, guild: discord.Guild, user: discord.User):
         super().__init__(timeout=300)
-        self.sorted_accounts = sorted_accounts
-        self.user_account = user_account
-        self.user_rank = user_rank
+        self.leaderboard = leaderboard
         self.guild = guild
         self.user = user
         
@@ -178,48 +173,48 @@ class RankingView(ui.LayoutView):
         
         # Top 20
         ranking_text = "**Top 20 des plus riches :**\n"
-        for i, account in enumerate(self.sorted_accounts[:20], start=1):
+        for entry in self.leaderboard.entries:
             # Emoji pour les podium
-            if i == 1:
+            if entry.rank == 1:
                 emoji = "🥇"
-            elif i == 2:
+            elif entry.rank == 2:
                 emoji = "🥈" 
-            elif i == 3:
+            elif entry.rank == 3:
                 emoji = "🥉"
             else:
-                emoji = f"**{i}.**"
+                emoji = f"**{entry.rank}.**"
             
-            ranking_text += f"{emoji} {account.user.mention} · ***{account.balance}{MONEY_SYMBOL}***\n"
+            ranking_text += f"{emoji} <@{entry.user_id}> · ***{entry.balance}{MONEY_SYMBOL}***\n"
         
         ranking_display = ui.TextDisplay(ranking_text)
         container.add_item(ranking_display)
         
-        
-        container.add_item(ui.Separator())
-        user_section_text = f"**Votre position :**\n**{self.user_rank}.** {self.user_account.user.mention} · ***{self.user_account.balance}{MONEY_SYMBOL}***"
-        user_section = ui.TextDisplay(user_section_text)
-        container.add_item(user_section)
+        focus = self.leaderboard.focus
+        if focus:
+            container.add_item(ui.Separator())
+            user_section_text = f"**Votre position :**\n**{focus.rank}.** <@{focus.user_id}> · ***{focus.balance}{MONEY_SYMBOL}***"
+            user_section = ui.TextDisplay(user_section_text)
+            container.add_item(user_section)
         
         # Footer
         container.add_item(ui.Separator())
-        footer_text = f"*Total de {len(self.sorted_accounts)} comptes sur ce serveur*"
+        footer_text = f"*Total de {self.leaderboard.total} comptes sur ce serveur*"
         footer = ui.TextDisplay(footer_text)
         container.add_item(footer)
         
         self.add_item(container)
 
 class OperationHistoryView(ui.LayoutView):
-    def __init__(self, account: BankAccount, user: discord.User):
+    def __init__(self, account: BankAccount, user: discord.User, cursor: OperationCursor):
         super().__init__(timeout=120)
         self.account = account
         self.user = user
         self.message = None  # Pour stocker la référence au message
         
-        operations = account.get_recent_operations(limit=200)
-        self.pages = [operations[i:i + 5] for i in range(0, len(operations), 5)]
-        if not self.pages:
-            self.pages = [[]]
+        # Les pages sont chargées à la demande (pagination par jeu de clés), la première doit être déjà chargée
+        self.cursor = cursor
         self.current_page = 0
+        self._prefetch_task: asyncio.Task | None = None
         
         self.build_interface()
     
@@ -243,7 +238,7 @@ class OperationHistoryView(ui.LayoutView):
         container.add_item(ui.Separator(spacing=discord.SeparatorSpacing.large))
         
         # Ajouter les sections d'opérations
-        page_ops = self.pages[self.current_page] if self.current_page < len(self.pages) else []
+        page_ops = self.cursor.get_page(self.current_page)
         
         if not page_ops:
             no_ops = ui.TextDisplay("Aucune opération trouvée.")
@@ -289,7 +284,7 @@ class OperationHistoryView(ui.LayoutView):
         
         self.add_item(container)
         
-        if len(self.pages) > 1:
+        if self.current_page > 0 or self.cursor.has_next(self.current_page):
             navigation = NavigationButtons()
             self.add_item(navigation)
             navigation.update_buttons()
@@ -302,6 +297,21 @@ class OperationHistoryView(ui.LayoutView):
                         if isinstance(child, ui.Button):
                             child.disabled = True
     
+    def schedule_prefetch(self):
+        """Précharge la page suivante en arrière-plan, une fois la réponse envoyée."""
+        next_page = self.current_page + 1
+        if not self.cursor.has_next(self.current_page) or self.cursor.is_cached(next_page):
+            return
+        if self._prefetch_task and not self._prefetch_task.done():
+            return
+        self._prefetch_task = asyncio.create_task(self._prefetch(next_page))
+    
+    async def _prefetch(self, page: int):
+        try:
+            await AsyncEconomy().get_page(self.cursor, page)
+        except Exception as e:
+            logger.warning(f"Préchargement de la page {page} impossible : {e}")
+    
     def update_display(self):
         """Met à jour l'affichage sans recréer complètement la vue."""
         # Sauvegarder l'état d'expiration actuel
@@ -388,8 +398,32 @@ class Bank(commands.Cog):
     """Module de gestion de la banque et des transactions économiques."""
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.eco = EconomyDBManager()
-        
+        self.eco = AsyncEconomy()
+        
+    async def cog_load(self):
+        self.archive_ledger.start()
+        self.reconcile_ledger.start()
+        
+    async def cog_unload(self):
+        self.archive_ledger.cancel()
+        self.reconcile_ledger.cancel()
+        
+    @tasks.loop(hours=24)
+    async def archive_ledger(self):
+        """Déplace quotidiennement les anciennes opérations dans les archives mensuelles."""
+        try:
+            await self.eco.archive_operations()
+        except Exception as e:
+            logger.error(f"Erreur lors de l'archivage des opérations : {e}")
+            
+    @tasks.loop(hours=6)
+    async def reconcile_ledger(self):
+        """Vérifie régulièrement les soldes et pose de nouveaux points de contrôle (les écarts sont seulement signalés)."""
+        try:
+            await self.eco.reconcile_balances()
+        except Exception as e:
+            logger.error(f"Erreur lors du rapprochement des soldes : {e}")
+            
     # Bannières de profil --------------------------------
     
     def get_user_banner(self, user: discord.User | discord.Member) -> Optional[BannerData]:
@@ -409,14 +443,23 @@ class Bank(commands.Cog):
         :param user: Autre utilisateur à afficher
         """
         user = user or interaction.user
-        account = self.eco.get_account(user)
+        account = await self.eco.get_account(user)
         
         if not account:
-            return interaction.response.send_message(f"Aucun compte trouvé pour {user.name}.", ephemeral=True)
+            return await interaction.response.send_message(f"Aucun compte trouvé pour {user.name}.", ephemeral=True)
         
         banner = self.get_user_banner(user)
         
-        view = BankAccountView(account, interaction.user, guild=interaction.guild, banner=banner)
+        # Lectures exécutées en parallèle dans le pool de lecteurs
+        var_time = (datetime.now() - timedelta(days=1)).timestamp()
+        variation, operations, rank = await asyncio.gather(
+            self.eco.get_variation_since(account, var_time),
+            self.eco.get_recent_operations(account, limit=5),
+            self.eco.get_rank_in_guild(account, interaction.guild) if interaction.guild else asyncio.sleep(0)
+        )
+        
+        view = BankAccountView(account, interaction.user, variation=variation, operations=operations, rank=rank,
+                               guild=interaction.guild, banner=banner)
         await interaction.response.send_message(
             view=view,
             allowed_mentions=discord.AllowedMentions.none()
@@ -424,22 +467,25 @@ class Bank(commands.Cog):
         
     @app_commands.command(name='history')
     @app_commands.rename(user='utilisateur', limit='limite')
-    async def cmd_history(self, interaction: discord.Interaction, user: Optional[discord.User] = None, limit: app_commands.Range[int, 1, 100] = 10):
+    async def cmd_history(self, interaction: discord.Interaction, user: Optional[discord.User] = None, limit: Optional[app_commands.Range[int, 1]] = None):
         """Affiche l'historique des opérations d'un utilisateur.
         
         :param user: Utilisateur dont afficher l'historique (par défaut l'utilisateur de la commande)
-        :param limit: Nombre d'opérations à afficher (par défaut 10, maximum 100)
+        :param limit: Nombre maximal d'opérations à parcourir (par défaut tout l'historique)
         """
         user = user or interaction.user
-        account = self.eco.get_account(user)
+        account = await self.eco.get_account(user)
         if not account:
             return await interaction.response.send_message(f"Aucun compte trouvé pour {user.name}.", ephemeral=True)
         
-        view = OperationHistoryView(account, interaction.user)
+        cursor = account.iter_operations(page_size=5, limit=limit)
+        await self.eco.get_page(cursor, 0)
+        view = OperationHistoryView(account, interaction.user, cursor)
         await interaction.response.send_message(
             view=view,
             allowed_mentions=discord.AllowedMentions.none()
         )
+        view.schedule_prefetch()
         
         # Stocker la référence au message pour pouvoir le modifier lors de l'expiration
         view.message = await interaction.original_response()
@@ -449,24 +495,14 @@ class Bank(commands.Cog):
     async def cmd_ranking(self, interaction: discord.Interaction):
         """Affiche le classement des utilisateurs par solde."""
         guild = interaction.guild
-        members = [m for m in guild.members if not m.bot]
-        accounts = self.eco.get_accounts(members)
         
-        # Trier les comptes par solde
-        sorted_accounts = sorted(accounts, key=lambda acc: acc.balance, reverse=True)
-        if not sorted_accounts:
+        # Classement et rang de l'utilisateur depuis l'index en mémoire
+        leaderboard = await self.eco.get_guild_leaderboard(guild, limit=20, focus=interaction.user.id)
+        if not leaderboard.entries:
             return await interaction.response.send_message("Aucun compte trouvé dans ce serveur.", ephemeral=True)
         
-        # Trouver le rang de l'utilisateur qui a lancé la commande
-        user_account = self.eco.get_account(interaction.user)
-        user_rank = None
-        for i, account in enumerate(sorted_accounts, start=1):
-            if account.user.id == interaction.user.id:
-                user_rank = i
-                break
-        
         # Créer la vue LayoutView
-        view = RankingView(sorted_accounts, user_account, user_rank, guild, interaction.user)
+        view = RankingView(leaderboard, guild, interaction.user)
         await interaction.response.send_message(view=view, allowed_mentions=discord.AllowedMentions.none())
         
     @app_commands.command(name='transfer')
@@ -483,16 +519,19 @@ class Bank(commands.Cog):
         if user.id == interaction.user.id:
             return await interaction.response.send_message("**IMPOSSIBLE** × Vous ne pouvez pas vous transférer de l'argent à vous-même.", ephemeral=True)
         
-        sender = self.eco.get_account(interaction.user)
-        recipient = self.eco.get_account(user)
+        sender = await self.eco.get_account(interaction.user)
+        recipient = await self.eco.get_account(user)
         
         if not sender or not recipient:
             return await interaction.response.send_message("**ERREUR** × Un des comptes n'existe pas.", ephemeral=True)
-        if sender.balance < amount:
-            return await interaction.response.send_message("**ERREUR** × Vous n'avez pas assez d'argent pour ce transfert.", ephemeral=True)
         
-        sop = sender.withdraw(amount, f"Transfert vers {user.name}" + (f" ({reason})" if reason else ""))
-        rop = recipient.deposit(amount, f"Transfert de {interaction.user.name}" + (f" ({reason})" if reason else ""))
+        try:
+            sop, rop = await self.eco.transfer(sender, recipient, amount, (
+                f"Transfert vers {user.name}" + (f" ({reason})" if reason else ""),
+                f"Transfert de {interaction.user.name}" + (f" ({reason})" if reason else "")
+            ))
+        except InsufficientFundsError:
+            return await interaction.response.send_message("**ERREUR** × Vous n'avez pas assez d'argent pour ce transfert.", ephemeral=True)
         view = TransfertView(sender, sop, recipient, rop, amount, interaction.user, reason)
         await interaction.response.send_message(
             view=view,
@@ -512,16 +551,16 @@ class Bank(commands.Cog):
         :param amount: Montant à ajouter (positif) ou retirer (négatif)
         :param reason: Raison de la modification (optionnel)
         """
-        account = self.eco.get_account(user)
+        account = await self.eco.get_account(user)
         if not account:
             return await interaction.response.send_message(f"Aucun compte trouvé pour {user.name}.", ephemeral=True)
         if amount == 0:
             return await interaction.response.send_message("**ERREUR** × Le montant doit être différent de zéro.", ephemeral=True)
         if amount > 0:
-            op = account.deposit(amount, f"Modif. par {interaction.user.name}" + (f" ({reason})" if reason else ""))
+            op = await self.eco.deposit(account, amount, f"Modif. par {interaction.user.name}" + (f" ({reason})" if reason else ""))
             result = f"**AJOUTÉ** · +{amount}{MONEY_SYMBOL} à {user.mention}."
         else:
-            op = account.withdraw(-amount, f"Modif. par {interaction.user.name}" + (f" ({reason})" if reason else ""))
+            op = await self.eco.withdraw(account, -amount, f"Modif. par {interaction.user.name}" + (f" ({reason})" if reason else ""))
             result = f"**RETIRÉ** · -{-amount}{MONEY_SYMBOL} de {user.mention}."
         await interaction.response.send_message(
             f"{result}\n**Nouveau solde** · *{account.balance}{MONEY_SYMBOL}*\n-# Opération #{op.id}",
@@ -531,31 +570,47 @@ class Bank(commands.Cog):
         logger.info(f"i --- {interaction.user.name} a modifié le compte de {user.name}: {amount}{MONEY_SYMBOL} ({reason or 'Aucune raison'})")
         
     @admin_group.command(name='rollback')
-    @app_commands.rename(user='utilisateur', operation_id='opération')
-    async def cmd_rollback(self, interaction: discord.Interaction, user: discord.User, operation_id: str):
+    @app_commands.rename(user='utilisateur', operation_id='opération', dry_run='simulation')
+    async def cmd_rollback(self, interaction: discord.Interaction, user: discord.User, operation_id: str, dry_run: bool = False):
         """Annule toutes les opérations jusqu'à une opération spécifique
         
         :param user: Utilisateur dont annuler les opérations
         :param operation_id: ID de l'opération jusqu'à laquelle annuler (incluse)
+        :param dry_run: Affiche seulement l'effet de l'annulation, sans rien modifier
         """
         if '#' in operation_id:
             operation_id = operation_id.replace('#', '')
         
-        account = self.eco.get_account(user)
+        account = await self.eco.get_account(user)
         if not account:
             return await interaction.response.send_message(f"Aucun compte trouvé pour {user.name}.", ephemeral=True)
         
-        opes = account.rollback(operation_id)
-        if not opes:
+        try:
+            result = await self.eco.rollback(account, operation_id, dry_run=dry_run)
+        except OperationError:
             return await interaction.response.send_message(f"Aucune opération trouvée avec l'ID `{operation_id}` pour {user.name}.", ephemeral=True)
+        except InsufficientFundsError:
+            return await interaction.response.send_message(f"**IMPOSSIBLE** × Le solde de {user.name} deviendrait négatif après l'annulation.", ephemeral=True)
+        
+        if result.dry_run:
+            if result.new_balance < 0:
+                return await interaction.response.send_message(
+                    f"**SIMULATION** · **IMPOSSIBLE** × Le solde de {user.name} deviendrait négatif après l'annulation ({result.new_balance}{MONEY_SYMBOL}).",
+                    ephemeral=True
+                )
+            return await interaction.response.send_message(
+                f"**SIMULATION** · {len(result)} opérations seraient annulées pour {user.mention} ({result.net_delta:+d}{MONEY_SYMBOL}).\n**Solde après annulation** · *{result.new_balance}{MONEY_SYMBOL}*",
+                allowed_mentions=discord.AllowedMentions.none(),
+                ephemeral=True
+            )
         
         await interaction.response.send_message(
-            f"**ANNULATION EFFECTUÉE** · {len(opes)} opérations annulées pour {user.mention}.\n**Nouveau solde** · *{account.balance}{MONEY_SYMBOL}*",
+            f"**ANNULATION EFFECTUÉE** · {len(result)} opérations annulées pour {user.mention} ({result.net_delta:+d}{MONEY_SYMBOL}).\n**Nouveau solde** · *{account.balance}{MONEY_SYMBOL}*",
             allowed_mentions=discord.AllowedMentions(users=[user])
         )
         
         # Log l'opération
-        logger.info(f"i --- {interaction.user.name} a annulé {len(opes)} opérations du compte de {user.name} jusqu'à l'opération #{operation_id}")
+        logger.info(f"i --- {interaction.user.name} a annulé {len(result)} opérations du compte de {user.name} jusqu'à l'opération #{operation_id}")
         
     @admin_group.command(name='clearcd')
     @app_commands.rename(user='utilisateur')
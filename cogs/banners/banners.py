@@ -9,7 +9,7 @@ from typing import Optional
 from dataclasses import dataclass
 
 from common import dataio
-from common.economy import EconomyDBManager, MONEY_SYMBOL
+from common.economy import AsyncEconomy, BankAccount, MONEY_SYMBOL
 
 logger = logging.getLogger(f'ROBIN.{__name__}')
 
@@ -40,10 +40,11 @@ class UserBanner:
 
 class BannersShopView(ui.LayoutView):
     """Vue pour la boutique de bannières."""
-    def __init__(self, banners_cog: 'Banners', user: discord.User):
+    def __init__(self, banners_cog: 'Banners', user: discord.User, account: BankAccount):
         super().__init__(timeout=300)  # 5 minutes
         self.banners_cog = banners_cog
         self.user = user
+        self.account = account  # Résolu en amont : l'état est partagé, le solde reste à jour
         
         # Récupérer toutes les bannières disponibles
         self.available_banners = [banner for banner in banners_cog.banners_data.values() if banner.available]
@@ -106,8 +107,7 @@ class BannersShopView(ui.LayoutView):
             owned_banner_ids = [b.banner_id for b in user_banners]
             
             # Récupérer le solde de l'utilisateur
-            account = self.banners_cog.eco.get_account(self.user)
-            user_balance = account.balance
+            user_balance = self.account.balance
             
             for i, banner in enumerate(page_banners):
                 # Titre avec nom et description (sans emoji)
@@ -313,7 +313,8 @@ class BannerBuyButton(ui.Button['BannersShopView']):
     
     async def callback(self, interaction: discord.Interaction):
         """Lance l'achat de la bannière."""
-        account = self.view.banners_cog.eco.get_account(interaction.user)
+        eco = AsyncEconomy()
+        account = await eco.get_account(interaction.user)
         
         # Vérifier si déjà possédée (sécurité supplémentaire)
         user_banners = self.view.banners_cog.get_user_banners(interaction.user)
@@ -329,7 +330,7 @@ class BannerBuyButton(ui.Button['BannersShopView']):
         
         try:
             # Effectuer l'achat
-            account.withdraw(self.price, f"Achat bannière - {self.banner_name}")
+            await eco.withdraw(account, self.price, f"Achat bannière - {self.banner_name}")
             
             # Ajouter la bannière à l'inventaire
             self.view.banners_cog.add_user_banner(interaction.user, self.banner_id)
@@ -392,8 +393,9 @@ class BannerSellButton(ui.Button):
                 )
             
             # Effectuer la vente
-            account = self.view.banners_cog.eco.get_account(interaction.user)
-            account.deposit(self.sell_price, f"Vente bannière - {self.banner_name}")
+            eco = AsyncEconomy()
+            account = await eco.get_account(interaction.user)
+            await eco.deposit(account, self.sell_price, f"Vente bannière - {self.banner_name}")
             
             # Retirer la bannière de l'inventaire
             self.view.banners_cog.remove_user_banner(interaction.user, self.banner_id)
@@ -547,7 +549,7 @@ class Banners(commands.Cog):
         self._load_banners_data()
         
         # Économie
-        self.eco = EconomyDBManager()
+        self.eco = AsyncEconomy()
     
     async def cog_unload(self):
         self.data.close_all()
@@ -651,7 +653,8 @@ class Banners(commands.Cog):
     @banners_group.command(name="shop")
     async def cmd_banners_shop(self, interaction: discord.Interaction):
         """Parcourir, acheter et vendre des bannières dans la boutique."""
-        view = BannersShopView(self, interaction.user)
+        account = await self.eco.get_account(interaction.user)
+        view = BannersShopView(self, interaction.user, account)
         await interaction.response.send_message(view=view, allowed_mentions=discord.AllowedMentions.none())
         
         # Stocker la référence au message pour pouvoir le modifier lors de l'expiration
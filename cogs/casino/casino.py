@@ -5,7 +5,7 @@ import discord
 from discord import app_commands, ui
 from discord.ext import commands
 
-from common.economy import EconomyDBManager, BankAccount, MONEY_SYMBOL
+from common.economy import AsyncEconomy, BankAccount, MONEY_SYMBOL
 from common.cooldowns import command_cooldown
 
 logger = logging.getLogger('ROBIN.Casino')
@@ -85,7 +85,7 @@ class SlotMachineView(ui.LayoutView):
     async def play_slot(self, interaction: discord.Interaction):
         """Lance la machine à sous."""
         # Déduire la mise
-        self.account.withdraw(self.bet, "Machine à sous - mise")
+        await AsyncEconomy().withdraw(self.account, self.bet, "Machine à sous - mise")
         
         # Générer les colonnes
         cola = self._generate_column()
@@ -120,7 +120,7 @@ class SlotMachineView(ui.LayoutView):
         
         # Déposer les gains si il y en a
         if self.winnings > 0:
-            self.account.deposit(self.winnings, f"Machine à sous - {win_type}")
+            await AsyncEconomy().deposit(self.account, self.winnings, f"Machine à sous - {win_type}")
         
         # Afficher le résultat
         await self._show_result(interaction, columns, win_type)
@@ -261,7 +261,7 @@ class RouletteView(ui.LayoutView):
     async def spin_roulette(self, interaction: discord.Interaction):
         """Lance la roulette."""
         # Déduire la mise
-        self.account.withdraw(self.bet, "Roulette - mise")
+        await AsyncEconomy().withdraw(self.account, self.bet, "Roulette - mise")
         
         # Générer le numéro gagnant (0-36)
         self.result_number = random.randint(0, 36)
@@ -308,7 +308,7 @@ class RouletteView(ui.LayoutView):
         # Calculer les gains (remboursement + gains)
         if multiplier > 0:
             self.winnings = self.bet + (self.bet * multiplier)
-            self.account.deposit(self.winnings, f"Roulette - {win_type}")
+            await AsyncEconomy().deposit(self.account, self.winnings, f"Roulette - {win_type}")
         else:
             self.winnings = 0
         
@@ -376,7 +376,7 @@ class RouletteSpinButton(ui.Button['RouletteView']):
 class Casino(commands.GroupCog, group_name="casino", description="Mini-jeux d'argent divers et variés"):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.eco = EconomyDBManager()
+        self.eco = AsyncEconomy()
         self.roulette = {}
     
     async def bet_value_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
@@ -438,7 +438,7 @@ class Casino(commands.GroupCog, group_name="casino", description="Mini-jeux d'ar
 
         :param bet: Montant mis en jeu (compris entre 10 et 100)
         """
-        account = self.eco.get_account(interaction.user)
+        account = await self.eco.get_account(interaction.user)
         
         # Vérifier le solde
         if account.balance < bet:
@@ -458,7 +458,7 @@ class Casino(commands.GroupCog, group_name="casino", description="Mini-jeux d'ar
         :param bet: Montant mis en jeu (compris entre 20 et 200)
         :param bet_value: Valeur du pari (rouge/noir, pair/impair, douzaine1-3, numéros 0-36)
         """
-        account = self.eco.get_account(interaction.user)
+        account = await self.eco.get_account(interaction.user)
         
         # Vérifier le solde
         if account.balance < bet:
@@ -10,7 +10,10 @@ import discord
 from discord import app_commands, ui
 from discord.ext import commands
 
+from common import connections
 from common.cooldowns import get_all_cooldowns, reset_cooldowns, Cooldown
+from common.members import MemberIndex
+from common.economy import AsyncEconomy, ARCHIVE_AFTER_DAYS, MONEY_SYMBOL
 
 logger = logging.getLogger(f'ROBIN.{__name__.split(".")[-1]}')
 
@@ -109,6 +112,31 @@ class Core(commands.Cog):
         self.bot = bot
         
         self._last_result: Optional[Any] = None
+        self.members = MemberIndex()
+
+    # Index des membres ------------------------------
+    
+    @commands.Cog.listener()
+    async def on_ready(self):
+        for guild in self.bot.guilds:
+            self.members.seed_guild(guild)
+        logger.info(f"Index des membres amorcé ({len(self.members)} guildes)")
+        
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        self.members.seed_guild(guild)
+        
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.members.drop_guild(guild.id)
+        
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        self.members.add_member(member)
+        
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        self.members.remove_member(member.guild.id, member.id)
 
     # Gestion des commandes et modules ------------------------------
 
@@ -254,6 +282,61 @@ class Core(commands.Cog):
         count = reset_cooldowns()
         await ctx.send(f"**`SUCCÈS`** · Réinitialisé {count} cooldowns.")
         
+    @commands.command(name="rebuildledger", hidden=True)
+    @commands.is_owner()
+    async def rebuild_ledger(self, ctx: commands.Context):
+        """Recalcule les agrégats journaliers de l'économie à partir de l'historique (commande propriétaire)"""
+        count = await AsyncEconomy().rebuild_ledger_rollups()
+        await ctx.send(f"**`SUCCÈS`** · Agrégats journaliers recalculés ({count} lignes).")
+        
+    @commands.command(name="archiveledger", hidden=True)
+    @commands.is_owner()
+    async def archive_ledger(self, ctx: commands.Context, days: int = ARCHIVE_AFTER_DAYS):
+        """Déplace les opérations de plus de `days` jours dans les archives mensuelles et compacte la base (commande propriétaire)"""
+        count = await AsyncEconomy().archive_operations(days, vacuum=True)
+        await ctx.send(f"**`SUCCÈS`** · {count} opérations archivées.")
+        
+    @commands.command(name="ecostats", hidden=True)
+    @commands.is_owner()
+    async def ecostats(self, ctx: commands.Context, days: int = 30):
+        """Affiche les indicateurs de la masse monétaire et les flux par catégorie sur une période (commande propriétaire)"""
+        stats = await AsyncEconomy().get_analytics(days)
+        percentiles = ' · '.join(f"p{p} {v:.0f}" for p, v in stats.percentiles.items())
+        lines = [
+            f"**Comptes** · {stats.accounts} · **Masse monétaire** · {stats.supply}{MONEY_SYMBOL} (moy. {stats.mean:.0f}{MONEY_SYMBOL})",
+            f"**Gini** · {stats.gini:.3f} · **Centiles** · {percentiles}",
+            f"**{days} derniers jours** · volume {stats.volume}{MONEY_SYMBOL} · création nette {stats.net:+}{MONEY_SYMBOL} · vélocité {stats.velocity:.2f}",
+        ]
+        table = [f"{name[:24]:<24} {count:>7} {inflow:>10} {outflow:>10} {inflow - outflow:>+10}"
+                 for name, (count, inflow, outflow) in stats.flows.items()]
+        header = f"{'Catégorie':<24} {'Opér.':>7} {'Entrées':>10} {'Sorties':>10} {'Net':>10}"
+        text = '\n'.join(lines) + f"\n```\n{header}\n" + '\n'.join(table[:30]) + "\n```"
+        await ctx.send(text)
+        
+    @commands.command(name="reconcile", hidden=True)
+    @commands.is_owner()
+    async def reconcile(self, ctx: commands.Context, repair: bool = False):
+        """Vérifie les soldes par rapport au journal des opérations et corrige les écarts si demandé (commande propriétaire)"""
+        report = await AsyncEconomy().reconcile_balances(repair)
+        text = f"**`{'CORRECTION' if repair else 'VÉRIFICATION'}`** · {report.checked} comptes, {report.operations} opérations vérifiées depuis les derniers points de contrôle."
+        if report.drifts:
+            lines = [f"- <@{check.user_id}> · {check.balance} enregistré, {check.expected} attendu" for check in report.drifts[:20]]
+            text += f"\n{len(report.drifts)} écart(s) détecté(s), {len(report.repaired)} corrigé(s) :\n" + '\n'.join(lines)
+        else:
+            text += "\nAucun écart détecté."
+        await ctx.send(text)
+        
+    @commands.command(name="dbprofiles", hidden=True)
+    @commands.is_owner()
+    async def dbprofiles(self, ctx: commands.Context):
+        """Affiche le profil de connexion SQLite de chaque base ouverte (commande propriétaire)"""
+        lines = []
+        for database, name in sorted(connections.get_database_profiles().items()):
+            profile = connections.PROFILES[name]
+            lines.append(f"{database:<10} {name:<11} {profile.journal_mode:<7} {profile.synchronous:<7} "
+                         f"cache_size={profile.cache_size} mmap={profile.mmap_size // 2**20}Mio")
+        await ctx.send("```\n" + ('\n'.join(lines) or "Aucune base ouverte.") + "\n```")
+        
         
 async def setup(bot):
     await bot.add_cog(Core(bot))
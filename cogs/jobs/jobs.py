@@ -9,8 +9,9 @@ from discord import app_commands, ui
 from discord.ext import commands
 
 from common import dataio
-from common.economy import EconomyDBManager, BankAccount, Operation, MONEY_SYMBOL
-from common.cooldowns import check_cooldown_state, set_cooldown
+from common.economy import AsyncEconomy, BankAccount, Operation, InsufficientFundsError, MONEY_SYMBOL
+from common.cooldowns import CooldownActiveError, get_bucket
+from common.members import MemberIndex
 
 logger = logging.getLogger(f'ROBIN.{__name__.split(".")[-1]}')
 
@@ -30,6 +31,13 @@ COOLDOWNS = {
     'hacker': 3600 * 1        # 1h - Gains élevés mais difficile
 }
 
+WORK_COOLDOWNS = {  # Choix de /work -> cooldown
+    'livreur': 'delivery',
+    'cuisinier': 'cooking',
+    'pickpocket': 'pickpocket',
+    'hacker': 'hacker'
+}
+
 # Fonctions utilitaires ==========================================
 
 def normalize_string(text: str) -> str:
@@ -422,7 +430,7 @@ class IngredientButton(ui.Button['CookGameView']):
         tip = int(self.view.calculate_tip(self.category))
         
         # Effectuer le dépôt
-        self.view.account.deposit(tip, f"Travail de cuisinier - {self.view.plat}")
+        await AsyncEconomy().deposit(self.view.account, tip, f"Travail de cuisinier - {self.view.plat}")
         
         # Modifier la LayoutView pour afficher le résultat
         await self.view.show_result(interaction, tip, self.ingredient)
@@ -495,7 +503,7 @@ class DeliveryGameView(ui.LayoutView):
     async def show_result(self, interaction: discord.Interaction):
         """Affiche le résultat de la livraison."""
         # Effectuer le dépôt
-        self.account.deposit(self.tip, f"Travail de livreur - {self.event['label']}")
+        await AsyncEconomy().deposit(self.account, self.tip, f"Travail de livreur - {self.event['label']}")
         
         # Vider le contenu actuel
         self.clear_items()
@@ -537,10 +545,10 @@ class DeliveryButton(ui.Button['DeliveryGameView']):
 # Pickpocket Game View ---------------------------
 class PickpocketGameView(ui.LayoutView):
     """Vue pour le mini-jeu de pickpocket."""
-    def __init__(self, account: BankAccount, guild_members: list, user: discord.User):
+    def __init__(self, account: BankAccount, guild: discord.Guild, user: discord.User):
         super().__init__(timeout=30)
         self.account = account
-        self.guild_members = guild_members
+        self.guild = guild
         self.user = user
         self.event = random.choice(PICKPOCKET_EVENTS)
         self.amount = random.randint(self.event["amount_range"][0], self.event["amount_range"][1])
@@ -603,28 +611,38 @@ class PickpocketGameView(ui.LayoutView):
     async def show_result(self, interaction: discord.Interaction):
         """Affiche le résultat du pickpocket."""
         # Sélectionner une cible aléatoire (excluant le joueur lui-même)
-        available_targets = [member for member in self.guild_members if member.id != self.account.user.id]
+        self.target = MemberIndex().random_member(self.guild, exclude=(self.account.user.id,))
         
-        if not available_targets:
+        if self.target is None:
             # Aucune cible disponible
             await self._show_no_target_result(interaction)
             return
         
-        self.target = random.choice(available_targets)
-        target_account = self.account.db_manager.get_account(self.target)
+        eco = AsyncEconomy()
+        target_account = await eco.get_account(self.target)
         
         # Vérifier si la cible a assez d'argent
         if target_account.balance >= self.amount:
-            # Vol réussi
-            target_account.withdraw(self.amount, f"Volé par {self.account.user.display_name}")
-            self.account.deposit(self.amount, f"Pickpocket sur {self.target.display_name}")
+            # Vol réussi (débit conditionnel : échoue si la cible a dépensé entre-temps)
+            try:
+                await eco.transfer(target_account, self.account, self.amount, (
+                    f"Volé par {self.account.user.display_name}",
+                    f"Pickpocket sur {self.target.display_name}"
+                ))
+            except InsufficientFundsError:
+                return await self._show_failure_result(interaction)
             await self._show_success_result(interaction)
         else:
             # Cible trop pauvre, vol partiel ou échec
             available_amount = target_account.balance
             if available_amount > 0:
-                target_account.withdraw(available_amount, f"Volé par {self.account.user.display_name}")
-                self.account.deposit(available_amount, f"Pickpocket partiel sur {self.target.display_name}")
+                try:
+                    await eco.transfer(target_account, self.account, available_amount, (
+                        f"Volé par {self.account.user.display_name}",
+                        f"Pickpocket partiel sur {self.target.display_name}"
+                    ))
+                except InsufficientFundsError:
+                    return await self._show_failure_result(interaction)
                 await self._show_partial_result(interaction, available_amount)
             else:
                 # Échec total
@@ -840,7 +858,7 @@ class HackerGameView(ui.LayoutView):
             
             # Récompense (divisée par 2 si seconde chance)
             reward = self.sequence_data["reward"] // 2 if self.second_chance else self.sequence_data["reward"]
-            self.account.deposit(reward, f"Hacking réussi - {self.sequence_data['code']}")
+            await AsyncEconomy().deposit(self.account, reward, f"Hacking réussi - {self.sequence_data['code']}")
             
             container.add_item(ui.Separator())
             success_text_reward = "Mission accomplie" + (" à la 2ème chance" if self.second_chance else "") + " !"
@@ -963,7 +981,7 @@ class Jobs(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.data = dataio.get_instance(self)
-        self.eco = EconomyDBManager()
+        self.eco = AsyncEconomy()
         self.job_cooldowns = {}  # Dictionnaire pour stocker les cooldowns des utilisateurs
     
     @app_commands.command(name="work")
@@ -975,69 +993,60 @@ class Jobs(commands.Cog):
             app_commands.Choice(name="Pickpocket (Vol)", value="pickpocket"),
             app_commands.Choice(name="Hacker (Déchiffrage)", value="hacker")
         ])
-    @check_cooldown_state('travail', active=False)
     async def cmd_job(self, interaction: discord.Interaction, work_type: str):
         """Effectuer une tâche pour gagner de l'argent
         
         :param work_type: Travail à effectuer"""
-        
-        if work_type.lower() == "livreur":
-            account = self.eco.get_account(interaction.user)
-            view = DeliveryGameView(account, interaction.user)
-            await interaction.response.send_message(view=view, allowed_mentions=discord.AllowedMentions.none())
-            # Stocker la référence du message pour les timeouts
-            view.message = await interaction.original_response()
-            set_cooldown(interaction.user, 'travail', COOLDOWNS['delivery'])
-            
-        elif work_type.lower() == "cuisinier":
-            account = self.eco.get_account(interaction.user)
-        
-            # Choisir un plat aléatoirement
-            plat = random.choice(list(PLATS.keys()))
-            
-            # Choisir 3 ingrédients aléatoirement (un de chaque catégorie)
-            plat_compat = COMPAT_PLATS[plat]
-            ingredients = {}
-            
-            for category in ["idéal", "alternatif", "risqué"]:
-                ingredient = random.choice(plat_compat[category])
-                ingredients[ingredient] = category
-            
-            # Créer la vue du mini-jeu
-            view = CookGameView(account, plat, ingredients, interaction.user)
-            await interaction.response.send_message(view=view, allowed_mentions=discord.AllowedMentions.none())
-            # Stocker la référence du message pour les timeouts
-            view.message = await interaction.original_response()
-            set_cooldown(interaction.user, 'travail', COOLDOWNS['cooking'])
-            
-        elif work_type.lower() == "pickpocket":
-            account = self.eco.get_account(interaction.user)
-            
-            # Récupérer les membres du serveur (excluant les bots)
-            guild_members = [member for member in interaction.guild.members if not member.bot]
-            
-            # Créer la vue du mini-jeu
-            view = PickpocketGameView(account, guild_members, interaction.user)
-            await interaction.response.send_message(view=view, allowed_mentions=discord.AllowedMentions.none())
-            # Stocker la référence du message pour les timeouts
-            view.message = await interaction.original_response()
-            set_cooldown(interaction.user, 'travail', COOLDOWNS['pickpocket'])
-            
-        elif work_type.lower() == "hacker":
-            account = self.eco.get_account(interaction.user)
-            
-            # Créer la vue du mini-jeu de hacking
-            view = HackerGameView(account, interaction.user)
-            await interaction.response.send_message(view=view, allowed_mentions=discord.AllowedMentions.none())
-            # Stocker la référence du message pour les timeouts
-            view.message = await interaction.original_response()
-            set_cooldown(interaction.user, 'travail', COOLDOWNS['hacker'])
-            
-        else:
-            await interaction.response.send_message(
+        work_type = work_type.lower()
+        if work_type not in WORK_COOLDOWNS:
+            return await interaction.response.send_message(
                 "**ERREUR** · Ce type de travail n'est pas encore implémenté.",
                 ephemeral=True
             )
         
+        # Réserve le cooldown avant de lancer le mini-jeu (deux invocations rapprochées ne passent pas toutes les deux)
+        bucket = get_bucket(interaction.user)
+        try:
+            reservation = bucket.acquire('travail', COOLDOWNS[WORK_COOLDOWNS[work_type]])
+        except CooldownActiveError:
+            cooldown = bucket.get('travail')
+            msg = cooldown.format_cooldown_message() if cooldown else "**COOLDOWN** · Vous avez déjà travaillé récemment."
+            return await interaction.response.send_message(msg, ephemeral=True)
+        
+        try:
+            account = await self.eco.get_account(interaction.user)
+            if work_type == "livreur":
+                view = DeliveryGameView(account, interaction.user)
+                
+            elif work_type == "cuisinier":
+                # Choisir un plat aléatoirement
+                plat = random.choice(list(PLATS.keys()))
+                
+                # Choisir 3 ingrédients aléatoirement (un de chaque catégorie)
+                plat_compat = COMPAT_PLATS[plat]
+                ingredients = {}
+                
+                for category in ["idéal", "alternatif", "risqué"]:
+                    ingredient = random.choice(plat_compat[category])
+                    ingredients[ingredient] = category
+                
+                # Créer la vue du mini-jeu
+                view = CookGameView(account, plat, ingredients, interaction.user)
+                
+            elif work_type == "pickpocket":
+                # Créer la vue du mini-jeu (cible tirée dans l'index des membres humains du serveur)
+                view = PickpocketGameView(account, interaction.guild, interaction.user)
+                
+            else:
+                # Créer la vue du mini-jeu de hacking
+                view = HackerGameView(account, interaction.user)
+                
+            await interaction.response.send_message(view=view, allowed_mentions=discord.AllowedMentions.none())
+        except Exception:
+            bucket.release(reservation)  # Le mini-jeu n'a pas pu être lancé : cooldown remboursé
+            raise
+        # Stocker la référence du message pour les timeouts
+        view.message = await interaction.original_response()
+        
 async def setup(bot):
     await bot.add_cog(Jobs(bot))
@@ -0,0 +1,94 @@
+import logging
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger('Connections')
+
+# Profils ================================================
+
+@dataclass(frozen=True)
+class ConnectionProfile:
+    """Réglages SQLite appliqués à chaque connexion ouverte avec ce profil.
+
+    `cache_size` suit la convention de SQLite (négatif : en Kio), `busy_timeout` est en millisecondes.
+    """
+    name: str
+    journal_mode: str = 'WAL'
+    synchronous: str = 'FULL'
+    cache_size: int = -2000
+    mmap_size: int = 0
+    busy_timeout: int = 5000
+    temp_store: str = 'DEFAULT'
+
+    def pragmas(self, readonly: bool = False) -> list[str]:
+        """Retourne les PRAGMA du profil, dans l'ordre d'application."""
+        pragmas = [f'PRAGMA busy_timeout={self.busy_timeout}']
+        if not readonly:  # Le mode de journalisation est persistant : inutile (et impossible) en lecture seule
+            pragmas.append(f'PRAGMA journal_mode={self.journal_mode}')
+        pragmas += [
+            f'PRAGMA synchronous={self.synchronous}',
+            f'PRAGMA cache_size={self.cache_size}',
+            f'PRAGMA mmap_size={self.mmap_size}',
+            f'PRAGMA temp_store={self.temp_store}',
+        ]
+        if readonly:
+            pragmas.append('PRAGMA query_only=ON')
+        return pragmas
+
+
+PROFILES: dict[str, ConnectionProfile] = {
+    # Réglages par défaut de SQLite, conservés pour comparaison
+    'compat': ConnectionProfile('compat', journal_mode='DELETE', synchronous='FULL', cache_size=-2000, busy_timeout=0),
+    # Aucune validation perdue, même en cas de coupure de courant : une synchronisation disque par validation
+    'durable': ConnectionProfile('durable', journal_mode='WAL', synchronous='FULL', cache_size=-16384,
+                                 mmap_size=64 * 2**20),
+    # Base jamais corrompue, mais les dernières validations peuvent être perdues en cas de coupure de courant
+    'throughput': ConnectionProfile('throughput', journal_mode='WAL', synchronous='NORMAL', cache_size=-65536,
+                                    mmap_size=256 * 2**20, temp_store='MEMORY'),
+}
+
+# Profil utilisé par chaque base (nom logique passé à `connect`)
+DATABASE_PROFILES: dict[str, str] = {
+    'economy': 'durable',
+    'cooldowns': 'throughput',
+    'members': 'throughput',
+    'cogdata': 'durable',
+}
+DEFAULT_PROFILE = 'durable'
+
+_opened: dict[str, str] = {}  # Base -> profil effectivement appliqué
+
+# Fabrique ================================================
+
+def get_profile(database: str) -> ConnectionProfile:
+    """Retourne le profil configuré pour une base."""
+    return PROFILES[DATABASE_PROFILES.get(database, DEFAULT_PROFILE)]
+
+
+def set_profile(database: str, profile: str):
+    """Change le profil d'une base (pour les connexions ouvertes ensuite)."""
+    if profile not in PROFILES:
+        raise ValueError(f"Profil de connexion inconnu : {profile}")
+    DATABASE_PROFILES[database] = profile
+
+
+def get_database_profiles() -> dict[str, str]:
+    """Retourne le profil appliqué à chaque base ouverte depuis le démarrage."""
+    return dict(_opened)
+
+
+def connect(path: Path | str, database: str, *, readonly: bool = False, profile: str = None, **kwargs) -> sqlite3.Connection:
+    """Ouvre une connexion SQLite réglée selon le profil de la base `database`.
+
+    `profile` force un profil précis ; les autres arguments sont transmis à `sqlite3.connect`.
+    """
+    settings = PROFILES[profile] if profile else get_profile(database)
+    kwargs.setdefault('timeout', settings.busy_timeout / 1000)
+    conn = sqlite3.connect(path, **kwargs)
+    for pragma in settings.pragmas(readonly):
+        conn.execute(pragma)
+    if _opened.get(database) != settings.name:
+        _opened[database] = settings.name
+        logger.info(f"Base '{database}' ouverte avec le profil '{settings.name}'")
+    return conn
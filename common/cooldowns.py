@@ -1,8 +1,15 @@
+import asyncio
+import atexit
+import heapq
+import itertools
 import logging
+import queue
 import sqlite3
+import threading
 import time
 import hashlib
 import string
+from collections import OrderedDict
 from contextlib import closing
 from pathlib import Path
 from datetime import datetime
@@ -12,9 +19,49 @@ import functools
 import discord
 from discord.ext import commands
 
+from common import connections
+
 logger = logging.getLogger('Cooldowns')
 
 DB_PATH = Path('common/global/')
+BUCKET_CACHE_SIZE = 10000  # Nombre maximal de buckets gardés en mémoire (les plus récemment utilisés)
+
+# Clés de buckets : (code du type d'entité, ID), ex. (1, 123456789012345678) pour 'user_123456789012345678'
+ENTITY_TYPES = {
+    'user': 1,
+    'guild': 2,
+    'channel': 3,
+    'role': 4,
+    'thread': 5,
+    'generic': 6,
+    'custom': 7
+}
+ENTITY_TYPE_NAMES = {code: name for name, code in ENTITY_TYPES.items()}
+
+BucketKey = tuple[int, int | str]  # L'ID n'est une chaîne que pour les clés personnalisées non numériques
+
+def format_bucket_key(key: BucketKey) -> str:
+    """Retourne la forme textuelle d'une clé de bucket (ex. 'user_123')."""
+    return f"{ENTITY_TYPE_NAMES.get(key[0], 'unknown')}_{key[1]}"
+
+def parse_bucket_key(text: str) -> BucketKey:
+    """Convertit une clé de bucket textuelle (ancien format de stockage) en clé compacte."""
+    entity_type, _, entity_id = text.partition('_')
+    if entity_type not in ENTITY_TYPES or not entity_id:
+        return ENTITY_TYPES['custom'], text
+    return ENTITY_TYPES[entity_type], _compact_id(entity_id)
+
+def _compact_id(entity_id: int | str) -> int | str:
+    """Retourne l'ID sous forme d'entier 64 bits signé lorsque c'est possible.
+    
+    Seule l'écriture canonique d'un entier est convertie ('-5' mais pas '007' ni '+5'), pour que deux
+    clés textuelles distinctes ne tombent jamais sur le même ID.
+    """
+    if isinstance(entity_id, str) and entity_id.removeprefix('-').isdecimal():
+        value = int(entity_id)
+        if -2 ** 63 <= value < 2 ** 63 and str(value) == entity_id:
+            return value
+    return entity_id
 
 # Exceptions ================================================
 
@@ -34,8 +81,225 @@ class CooldownNotFoundError(CooldownError):
 
 # Classes ================================================
 
+class CooldownWriter:
+    """Fil d'écriture des cooldowns : persiste en arrière-plan les modifications du cache en mémoire.
+    
+    Les requêtes sont exécutées dans l'ordre de soumission et validées par lots, au plus tard `window`
+    secondes après la première requête du lot, hors de la boucle d'événements.
+    """
+    def __init__(self, conn: sqlite3.Connection, window: float = 0.05):
+        self.conn = conn
+        self.window = window
+        
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='cooldowns-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        
+    def __repr__(self):
+        return f"CooldownWriter(window={self.window}, pending={self._queue.qsize()})"
+    
+    def submit(self, query: str, params: tuple = ()):
+        """Ajoute une requête d'écriture à la file."""
+        self._queue.put((query, params))
+        
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Attend la validation de toutes les requêtes soumises jusqu'ici."""
+        if not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+    
+    def close(self, timeout: float = 5.0):
+        """Vide la file d'attente, valide le dernier lot et arrête le fil d'écriture."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+    
+    def _run(self):
+        stopping = False
+        while not stopping:
+            job = self._queue.get()
+            if job is None:
+                break
+            
+            waiters = []
+            deadline = time.monotonic() + self.window
+            while True:
+                if isinstance(job, threading.Event):  # Demande de vidage : validation immédiate
+                    waiters.append(job)
+                    break
+                self._execute(*job)
+                try:
+                    job = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+            self._commit()
+            for waiter in waiters:
+                waiter.set()
+    
+    def _execute(self, query: str, params: tuple):
+        try:
+            self.conn.execute(query, params)
+        except sqlite3.Error as e:
+            logger.error(f"Échec de l'écriture d'un cooldown ({query.split()[0]}) : {e}")
+    
+    def _commit(self):
+        try:
+            self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Échec de la validation des cooldowns : {e}")
+            self.conn.rollback()
+
+
+class ExpiryScheduler:
+    """Planificateur d'expiration des cooldowns (tas binaire des échéances, fil dédié).
+    
+    Le fil se réveille à la prochaine échéance (au plus une fois toutes les `interval` secondes, pour
+    regrouper les suppressions) : il retire du cache du gestionnaire les cooldowns expirés, les supprime
+    de la base en une seule requête et appelle les fonctions de rappel enregistrées avec `add_callback`.
+    Les lectures n'écrivent donc jamais : un cooldown expiré est simplement ignoré jusqu'au passage du fil.
+    
+    Le tas peut contenir des échéances périmées (cooldown modifié ou supprimé) : elles sont ignorées
+    lors de leur dépilage, et le tas est reconstruit lorsqu'il en contient trop.
+    """
+    def __init__(self, manager: 'CooldownManager', interval: float = 1.0):
+        self.manager = manager
+        self.interval = interval
+        
+        self._heap: list[tuple[int, int, BucketKey, str]] = []  # (expires_at, n° d'ordre, clé, cooldown_name)
+        self._sequence = itertools.count()  # Départage les échéances égales sans comparer les clés
+        self._compact_at = 1024
+        self._callbacks: list[tuple[str | None, Callable, asyncio.AbstractEventLoop | None]] = []
+        self._cond = threading.Condition()
+        self._last_run = 0.0
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='cooldowns-expiry', daemon=True)
+        
+    def __repr__(self):
+        return f"ExpiryScheduler(interval={self.interval}, scheduled={len(self._heap)})"
+    
+    def start(self):
+        self._thread.start()
+        atexit.register(self.stop)
+        
+    def stop(self, timeout: float = 5.0):
+        """Arrête le fil d'expiration."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+    
+    def schedule(self, key: BucketKey, cooldown_name: str, expires_at: int):
+        """Programme l'expiration d'un cooldown (appelé sous le verrou du gestionnaire)."""
+        with self._cond:
+            heapq.heappush(self._heap, (expires_at, next(self._sequence), key, cooldown_name))
+            if self._heap[0][0] == expires_at:  # Nouvelle échéance la plus proche : réveille le fil
+                self._cond.notify()
+    
+    def load(self, deadlines: Iterable[tuple[int, BucketKey, str]]):
+        """Remplace toutes les échéances programmées par `deadlines` : (expires_at, clé, cooldown_name)."""
+        with self._cond:
+            self._heap = [(expires_at, next(self._sequence), key, name) for expires_at, key, name in deadlines]
+            heapq.heapify(self._heap)
+            self._compact_at = max(1024, 2 * len(self._heap))
+            self._cond.notify()
+    
+    def clear(self):
+        with self._cond:
+            self._heap.clear()
+            
+    def add_callback(self, callback: Callable[['Cooldown'], Any], cooldown_name: str = None):
+        """Enregistre une fonction appelée à l'expiration de chaque cooldown (ou de ceux nommés `cooldown_name`).
+        
+        Les fonctions classiques sont appelées depuis le fil d'expiration. Les coroutines sont exécutées
+        sur la boucle d'événements courante : elles doivent être enregistrées depuis cette boucle.
+        """
+        loop = asyncio.get_running_loop() if asyncio.iscoroutinefunction(callback) else None
+        self._callbacks.append((cooldown_name, callback, loop))
+        
+    def remove_callback(self, callback: Callable[['Cooldown'], Any]):
+        """Retire une fonction de rappel."""
+        self._callbacks = [entry for entry in self._callbacks if entry[1] is not callback]
+    
+    def _delay(self) -> float | None:
+        if not self._heap:
+            return None
+        now = time.time()
+        return max(self._heap[0][0] - now, self._last_run + self.interval - now, 0.0)
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                delay = self._delay()
+                while not self._stopped and (delay is None or delay > 0):
+                    self._cond.wait(delay)
+                    delay = self._delay()
+                if self._stopped:
+                    return
+            self._last_run = time.time()
+            try:
+                self.run_pending(int(self._last_run))
+            except Exception as e:
+                logger.exception(f"Erreur lors de l'expiration des cooldowns : {e}")
+    
+    def run_pending(self, now: int = None) -> list['Cooldown']:
+        """Fait expirer les cooldowns échus à `now` (par défaut : maintenant) et retourne ceux retirés."""
+        now = int(time.time()) if now is None else now
+        manager = self.manager
+        expired = []
+        with manager._lock:
+            with self._cond:
+                heap, cache = self._heap, manager._cache
+                while heap and heap[0][0] <= now:
+                    expires_at, _, key, name = heapq.heappop(heap)
+                    entries = cache.get(key)
+                    entry = entries.get(name) if entries else None
+                    if entry is None or entry[0] != expires_at:
+                        continue  # Échéance périmée : cooldown modifié ou supprimé depuis
+                    del entries[name]
+                    if not entries:
+                        del cache[key]
+                    expired.append(Cooldown(key, name, *entry))
+                if len(heap) > self._compact_at:
+                    self._heap = [(entry[0], next(self._sequence), key, name) for key, entries in cache.items() for name, entry in entries.items()]
+                    heapq.heapify(self._heap)
+                    self._compact_at = max(1024, 2 * len(self._heap))
+            if expired:
+                manager._writer.submit('DELETE FROM cooldowns WHERE expires_at <= ?', (now,))
+        
+        if expired:
+            logger.debug(f"{len(expired)} cooldowns expirés retirés")
+            self._notify(expired)
+        return expired
+    
+    def _notify(self, expired: list['Cooldown']):
+        for cooldown_name, callback, loop in self._callbacks:
+            for cooldown in expired:
+                if cooldown_name is not None and cooldown.cooldown_name != cooldown_name:
+                    continue
+                try:
+                    if loop is not None:
+                        asyncio.run_coroutine_threadsafe(callback(cooldown), loop)
+                    else:
+                        callback(cooldown)
+                except Exception as e:
+                    logger.exception(f"Erreur dans un rappel d'expiration de cooldown : {e}")
+
+
 class CooldownManager:
-    """Gestionnaire centralisé des cooldowns avec système de buckets."""
+    """Gestionnaire centralisé des cooldowns avec système de buckets.
+    
+    Les cooldowns sont chargés en mémoire au démarrage (cache indexé par bucket puis par nom) : toutes les
+    lectures sont servies depuis le cache, et les modifications y sont appliquées immédiatement puis
+    écrites dans `cooldowns.db` en arrière-plan par un `CooldownWriter`. Les cooldowns expirés sont
+    retirés du cache et de la base par un `ExpiryScheduler`.
+    """
     _instance = None
     
     def __new__(cls):
@@ -53,96 +317,347 @@ class CooldownManager:
         
         self.conn = self._connect()
         self._initialize()
-        self._initialized = True
         
-        # Cache des buckets
-        self._buckets: dict[str, 'CooldownBucket'] = {}
+        # Cache des cooldowns : clé du bucket -> {cooldown_name: (expires_at, created_at, metadata)}
+        self._lock = threading.RLock()
+        self._cache: dict[BucketKey, dict[str, tuple[int, int, str | None]]] = {}
+        self._name_ids: dict[str, int] = {}  # Noms de cooldowns -> codes (table `cooldown_names`)
+        self._next_name_id = 1
+        self._writer = CooldownWriter(self.conn)
+        self.expiry = ExpiryScheduler(self)
+        self._load_cache()
+        self.expiry.start()
+        
+        # Cache LRU des buckets, indexé par clé (aucune référence aux entités Discord n'est conservée)
+        self._buckets: OrderedDict[BucketKey, 'CooldownBucket'] = OrderedDict()
+        self._buckets_capacity = BUCKET_CACHE_SIZE
+        self._bucket_hits = 0
+        self._bucket_misses = 0
+        self._initialized = True
 
     def __del__(self):
+        if hasattr(self, 'expiry'):
+            self.expiry.stop()
+        if hasattr(self, '_writer'):
+            self._writer.close()
         if hasattr(self, 'conn') and self.conn:
             self.conn.close()
         
     def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path)
+        # La connexion est utilisée par le fil d'écriture une fois le cache chargé
+        conn = connections.connect(self.db_path, 'cooldowns', check_same_thread=False)
         conn.row_factory = sqlite3.Row
         return conn
     
     def _initialize(self):
         with closing(self.conn.cursor()) as cursor:
+            # Noms de cooldowns, stockés une seule fois
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cooldown_names (
+                    name_id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE
+                )
+            ''')
+            self._migrate_text_keys(cursor)
+            self._drop_entity_id_affinity(cursor)
+            # Clé compacte : (type d'entité, ID, nom). `entity_id` n'a pas de type déclaré (aucune affinité) : les IDs
+            # entiers sont stockés en entiers 64 bits, les IDs textuels ('007', '1e3'...) restent du texte et ne
+            # peuvent pas être confondus avec un entier
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS cooldowns (
-                    bucket_key TEXT NOT NULL,
-                    cooldown_name TEXT NOT NULL,
+                    entity_type INTEGER NOT NULL,
+                    entity_id NOT NULL,
+                    name_id INTEGER NOT NULL,
                     expires_at INTEGER NOT NULL,
                     created_at INTEGER NOT NULL,
                     metadata TEXT,
-                    PRIMARY KEY (bucket_key, cooldown_name)
-                )
+                    PRIMARY KEY (entity_type, entity_id, name_id)
+                ) WITHOUT ROWID
+            ''')
+            # Index couvrant des recherches par nom (inclut la clé primaire), et index des expirations
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_cooldowns_name_expires
+                ON cooldowns (name_id, expires_at)
             ''')
-            # Index pour améliorer les performances
             cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_expires_at 
+                CREATE INDEX IF NOT EXISTS idx_cooldowns_expires
                 ON cooldowns (expires_at)
             ''')
+            self.conn.commit()
+    
+    def _migrate_text_keys(self, cursor: sqlite3.Cursor):
+        """Convertit l'ancien schéma (clés et noms en texte) vers les clés compactes, en une transaction.
+        
+        Cette migration n'est pas faite en ligne : elle s'exécute une seule fois au premier démarrage, avant le
+        chargement du cache, et garde le verrou d'écriture de la base (BEGIN IMMEDIATE) pendant toute la réécriture
+        de la table. Compter quelques secondes par million de lignes, pendant lesquelles le démarrage est bloqué.
+        Les cooldowns déjà expirés ne sont pas repris. L'ancienne table reste lisible jusqu'à la validation.
+        Deux clés textuelles distinctes donnent toujours deux clés compactes distinctes (cf. `_compact_id`) :
+        une collision ferait échouer (et annuler) la migration au lieu d'écraser un cooldown.
+        
+        Aucun VACUUM n'est lancé (il réécrirait tout le fichier) : les pages libérées sont réutilisées par les
+        écritures suivantes, et l'espace peut être rendu au système plus tard avec un VACUUM manuel.
+        """
+        columns = [row['name'] for row in cursor.execute('PRAGMA table_info(cooldowns)')]
+        if 'bucket_key' not in columns:
+            return
+        
+        start = time.perf_counter()
+        self.conn.create_function('bucket_entity_type', 1, lambda text: parse_bucket_key(text)[0], deterministic=True)
+        self.conn.create_function('bucket_entity_id', 1, lambda text: parse_bucket_key(text)[1], deterministic=True)
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
             cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_bucket_key 
-                ON cooldowns (bucket_key)
+                CREATE TABLE cooldowns_compact (
+                    entity_type INTEGER NOT NULL,
+                    entity_id NOT NULL,
+                    name_id INTEGER NOT NULL,
+                    expires_at INTEGER NOT NULL,
+                    created_at INTEGER NOT NULL,
+                    metadata TEXT,
+                    PRIMARY KEY (entity_type, entity_id, name_id)
+                ) WITHOUT ROWID
             ''')
+            cursor.execute('INSERT OR IGNORE INTO cooldown_names (name) SELECT DISTINCT cooldown_name FROM cooldowns')
+            cursor.execute('''
+                INSERT INTO cooldowns_compact (entity_type, entity_id, name_id, expires_at, created_at, metadata)
+                SELECT bucket_entity_type(c.bucket_key), bucket_entity_id(c.bucket_key), n.name_id, c.expires_at, c.created_at, c.metadata
+                FROM cooldowns c JOIN cooldown_names n ON n.name = c.cooldown_name
+                WHERE c.expires_at > ?
+                ORDER BY 1, 2, 3
+            ''', (int(time.time()),))
+            migrated = cursor.rowcount
+            cursor.execute('DROP TABLE cooldowns')
+            cursor.execute('ALTER TABLE cooldowns_compact RENAME TO cooldowns')
             self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        logger.info(f"cooldowns.db migrée vers les clés compactes ({migrated} cooldowns actifs) en {time.perf_counter() - start:.2f}s "
+                    "(sans VACUUM : lancer un VACUUM manuel pour réduire la taille du fichier)")
     
-    def _generate_bucket_key(self, entity: Any) -> str:
-        """Génère une clé unique pour un bucket d'entité."""
+    def _drop_entity_id_affinity(self, cursor: sqlite3.Cursor):
+        """Retire l'affinité INTEGER de `entity_id` sur les bases créées avec la première version des clés compactes.
+        
+        Avec cette affinité, SQLite convertissait les IDs textuels numériques ('007', '1e3') en entiers. Les lignes
+        déjà converties ne peuvent pas être distinguées : seule la table est recréée, pour les écritures suivantes.
+        """
+        columns = {row['name']: row['type'] for row in cursor.execute('PRAGMA table_info(cooldowns)')}
+        if columns.get('entity_id', '').upper() != 'INTEGER':
+            return
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute('''
+                CREATE TABLE cooldowns_untyped (
+                    entity_type INTEGER NOT NULL,
+                    entity_id NOT NULL,
+                    name_id INTEGER NOT NULL,
+                    expires_at INTEGER NOT NULL,
+                    created_at INTEGER NOT NULL,
+                    metadata TEXT,
+                    PRIMARY KEY (entity_type, entity_id, name_id)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('INSERT INTO cooldowns_untyped SELECT entity_type, entity_id, name_id, expires_at, created_at, metadata FROM cooldowns')
+            cursor.execute('DROP TABLE cooldowns')
+            cursor.execute('ALTER TABLE cooldowns_untyped RENAME TO cooldowns')
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        logger.info("cooldowns.db : affinité INTEGER retirée de entity_id")
+    
+    def _load_cache(self):
+        with closing(self.conn.cursor()) as cursor:
+            cursor.execute('SELECT name_id, name FROM cooldown_names')
+            self._name_ids = {row['name']: row['name_id'] for row in cursor}
+            self._next_name_id = max(self._name_ids.values(), default=0) + 1
+            names = {name_id: name for name, name_id in self._name_ids.items()}
+            deadlines = []
+            cursor.execute('SELECT entity_type, entity_id, name_id, expires_at, created_at, metadata FROM cooldowns')
+            for entity_type, entity_id, name_id, expires_at, created_at, metadata in cursor:
+                key, name = (entity_type, entity_id), names[name_id]
+                self._cache.setdefault(key, {})[name] = (expires_at, created_at, metadata)
+                deadlines.append((expires_at, key, name))
+        self.expiry.load(deadlines)
+        logger.info(f"Cache des cooldowns chargé ({sum(len(entries) for entries in self._cache.values())} cooldowns)")
+    
+    def _generate_bucket_key(self, entity: Any) -> BucketKey:
+        """Génère une clé unique (type d'entité, ID) pour un bucket d'entité."""
         if isinstance(entity, (discord.User, discord.Member)):
-            return f"user_{entity.id}"
+            return ENTITY_TYPES['user'], entity.id
         elif isinstance(entity, discord.Guild):
-            return f"guild_{entity.id}"
+            return ENTITY_TYPES['guild'], entity.id
         elif isinstance(entity, (discord.TextChannel, discord.VoiceChannel, discord.CategoryChannel)):
-            return f"channel_{entity.id}"
+            return ENTITY_TYPES['channel'], entity.id
         elif isinstance(entity, discord.Role):
-            return f"role_{entity.id}"
+            return ENTITY_TYPES['role'], entity.id
         elif isinstance(entity, discord.Thread):
-            return f"thread_{entity.id}"
+            return ENTITY_TYPES['thread'], entity.id
         elif hasattr(entity, 'id'):
-            return f"generic_{entity.id}"
+            return ENTITY_TYPES['generic'], _compact_id(entity.id)
         elif isinstance(entity, (int, str)):
-            return f"custom_{entity}"
+            return ENTITY_TYPES['custom'], _compact_id(entity)
         else:
             raise ValueError(f"Type d'entité non supporté: {type(entity)}")
     
     def get(self, entity: Any) -> 'CooldownBucket':
         """Retourne le bucket de cooldowns pour une entité."""
-        bucket_key = self._generate_bucket_key(entity)
+        key = self._generate_bucket_key(entity)
+        
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            self._bucket_hits += 1
+            self._buckets.move_to_end(key)
+            return bucket
         
-        if bucket_key not in self._buckets:
-            self._buckets[bucket_key] = CooldownBucket(bucket_key, self, entity)
+        self._bucket_misses += 1
+        bucket = self._buckets[key] = CooldownBucket(key, self)
+        if len(self._buckets) > self._buckets_capacity:
+            self._buckets.popitem(last=False)
+        return bucket
+    
+    def get_bucket_cache_stats(self) -> dict:
+        """Retourne la taille, la capacité et le taux de succès du cache des buckets."""
+        lookups = self._bucket_hits + self._bucket_misses
+        return {
+            'size': len(self._buckets),
+            'capacity': self._buckets_capacity,
+            'hits': self._bucket_hits,
+            'misses': self._bucket_misses,
+            'hit_rate': self._bucket_hits / lookups if lookups else 0.0
+        }
+    
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Attend que toutes les modifications du cache soient écrites sur disque."""
+        return self._writer.flush(timeout)
+    
+    # Cache -----------------------------
+    
+    def _name_id(self, cooldown_name: str) -> int:
+        """Retourne le code d'un nom de cooldown, en l'enregistrant au besoin (appelé sous le verrou)."""
+        name_id = self._name_ids.get(cooldown_name)
+        if name_id is None:
+            name_id = self._name_ids[cooldown_name] = self._next_name_id
+            self._next_name_id += 1
+            self._writer.submit('INSERT OR IGNORE INTO cooldown_names (name_id, name) VALUES (?, ?)', (name_id, cooldown_name))
+        return name_id
+    
+    def _lookup(self, key: BucketKey, cooldown_name: str) -> Optional['Cooldown']:
+        """Retourne un cooldown du cache (expiré ou non), sans accès à la base."""
+        entries = self._cache.get(key)
+        entry = entries.get(cooldown_name) if entries else None
+        return Cooldown(key, cooldown_name, *entry) if entry else None
+    
+    def _entries(self, cooldown_name: str = None) -> list['Cooldown']:
+        """Retourne les cooldowns du cache (expirés ou non), éventuellement filtrés par nom."""
+        with self._lock:
+            return [Cooldown(key, name, *entry)
+                    for key, entries in self._cache.items()
+                    for name, entry in entries.items()
+                    if cooldown_name is None or name == cooldown_name]
+    
+    def _store(self, cooldown: 'Cooldown'):
+        """Enregistre un cooldown dans le cache puis en base (en arrière-plan)."""
+        with self._lock:
+            self._cache.setdefault(cooldown.key, {})[cooldown.cooldown_name] = (cooldown.expires_at, cooldown.created_at, cooldown.metadata)
+            self.expiry.schedule(cooldown.key, cooldown.cooldown_name, cooldown.expires_at)
+            self._writer.submit('''
+                INSERT OR REPLACE INTO cooldowns 
+                (entity_type, entity_id, name_id, expires_at, created_at, metadata) 
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (*cooldown.key, self._name_id(cooldown.cooldown_name), cooldown.expires_at, cooldown.created_at, cooldown.metadata))
+    
+    def _acquire(self, key: BucketKey, cooldown_name: str, duration: Union[int, float], metadata: str = None) -> 'Cooldown':
+        """Vérifie et pose un cooldown sous le verrou du cache (cf. `CooldownBucket.acquire`)."""
+        if duration <= 0:
+            raise ValueError("La durée du cooldown doit être positive")
+        current_time = int(time.time())
+        with self._lock:
+            entries = self._cache.get(key)
+            entry = entries.get(cooldown_name) if entries else None
+            if entry is not None and entry[0] > current_time:
+                raise CooldownActiveError(f"Cooldown '{cooldown_name}' actif pour '{format_bucket_key(key)}'", entry[0] - time.time())
             
-        return self._buckets[bucket_key]
+            cooldown = Cooldown(key, cooldown_name, current_time + int(duration), current_time, metadata)
+            self._cache.setdefault(key, {})[cooldown_name] = (cooldown.expires_at, cooldown.created_at, metadata)
+            self.expiry.schedule(key, cooldown_name, cooldown.expires_at)
+            # Écriture conditionnelle : une ligne encore active en base n'est jamais écrasée
+            self._writer.submit('''
+                INSERT INTO cooldowns (entity_type, entity_id, name_id, expires_at, created_at, metadata)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (entity_type, entity_id, name_id) DO UPDATE SET
+                    expires_at = excluded.expires_at, created_at = excluded.created_at, metadata = excluded.metadata
+                WHERE cooldowns.expires_at <= excluded.created_at
+            ''', (*key, self._name_id(cooldown_name), cooldown.expires_at, current_time, metadata))
+        return cooldown
+    
+    def _release(self, reservation: 'Cooldown') -> bool:
+        """Supprime un cooldown s'il correspond toujours à la réservation donnée."""
+        with self._lock:
+            entries = self._cache.get(reservation.key)
+            entry = entries.get(reservation.cooldown_name) if entries else None
+            if entry != (reservation.expires_at, reservation.created_at, reservation.metadata):
+                return False
+            return self._discard(reservation.key, reservation.cooldown_name) > 0
+    
+    def _set_expiration(self, key: BucketKey, cooldown_name: str, expires_at: int) -> bool:
+        """Modifie l'expiration d'un cooldown du cache puis en base. Retourne False s'il n'existe pas."""
+        with self._lock:
+            entries = self._cache.get(key)
+            entry = entries.get(cooldown_name) if entries else None
+            if entry is None:
+                return False
+            entries[cooldown_name] = (expires_at, *entry[1:])
+            self.expiry.schedule(key, cooldown_name, expires_at)
+            self._writer.submit('UPDATE cooldowns SET expires_at = ? WHERE entity_type = ? AND entity_id = ? AND name_id = ?',
+                                (expires_at, *key, self._name_id(cooldown_name)))
+            return True
+    
+    def _discard(self, key: BucketKey, cooldown_name: str = None) -> int:
+        """Supprime un cooldown (ou tous ceux du bucket si `cooldown_name` est None) du cache puis de la base."""
+        with self._lock:
+            entries = self._cache.get(key)
+            if not entries:
+                return 0
+            if cooldown_name is None:
+                del self._cache[key]
+                self._writer.submit('DELETE FROM cooldowns WHERE entity_type = ? AND entity_id = ?', key)
+                return len(entries)
+            if entries.pop(cooldown_name, None) is None:
+                return 0
+            if not entries:
+                del self._cache[key]
+            self._writer.submit('DELETE FROM cooldowns WHERE entity_type = ? AND entity_id = ? AND name_id = ?',
+                                (*key, self._name_id(cooldown_name)))
+            return 1
+    
+    # Maintenance -----------------------------
     
     def cleanup_expired(self) -> int:
-        """Nettoie tous les cooldowns expirés."""
-        current_time = int(time.time())
-        with closing(self.conn.cursor()) as cursor:
-            cursor.execute('DELETE FROM cooldowns WHERE expires_at <= ?', (current_time,))
-            deleted_count = cursor.rowcount
-            self.conn.commit()
+        """Nettoie immédiatement tous les cooldowns expirés (sans attendre le planificateur d'expiration)."""
+        deleted_count = len(self.expiry.run_pending())
         logger.debug(f"Nettoyé {deleted_count} cooldowns expirés")
         return deleted_count
     
     def delete_all(self) -> int:
         """Supprime tous les cooldowns de la base de données."""
-        with closing(self.conn.cursor()) as cursor:
-            cursor.execute('DELETE FROM cooldowns')
-            deleted_count = cursor.rowcount
-            self.conn.commit()
+        with self._lock:
+            deleted_count = sum(len(entries) for entries in self._cache.values())
+            self._cache.clear()
+            self.expiry.clear()
+            self._writer.submit('DELETE FROM cooldowns')
         logger.debug(f"Supprimé tous les cooldowns ({deleted_count} supprimés)")
         return deleted_count
     
+    # Statistiques -----------------------------
+    
     def get_all_active_buckets(self) -> list[str]:
         """Retourne toutes les clés de buckets ayant des cooldowns actifs."""
         current_time = int(time.time())
-        with closing(self.conn.cursor()) as cursor:
-            cursor.execute('SELECT DISTINCT bucket_key FROM cooldowns WHERE expires_at > ?', (current_time,))
-            return [row['bucket_key'] for row in cursor.fetchall()]
+        with self._lock:
+            return [format_bucket_key(key) for key, entries in self._cache.items()
+                    if any(entry[0] > current_time for entry in entries.values())]
     
     def get_entities_with_cooldown(self, cooldown_name: str) -> list[dict]:
         """
@@ -153,35 +668,19 @@ class CooldownManager:
             
         Returns:
             list[dict]: Liste de dictionnaires contenant les informations des entités
-                       Format: {'bucket_key': str, 'entity_type': str, 'entity_id': str, 'cooldown': Cooldown}
+                       Format: {'bucket_key': str, 'entity_type': str, 'entity_id': int | str, 'cooldown': Cooldown}
         """
         current_time = int(time.time())
         entities = []
         
-        with closing(self.conn.cursor()) as cursor:
-            cursor.execute(
-                'SELECT * FROM cooldowns WHERE cooldown_name = ? AND expires_at > ? ORDER BY expires_at ASC',
-                (cooldown_name, current_time)
-            )
-            rows = cursor.fetchall()
-            
-            for row in rows:
-                cooldown = Cooldown.from_row(row)
-                bucket_key = row['bucket_key']
-                
-                # Parse le bucket_key pour extraire le type et l'ID
-                if '_' in bucket_key:
-                    entity_type, entity_id = bucket_key.split('_', 1)
-                else:
-                    entity_type = 'unknown'
-                    entity_id = bucket_key
-                
-                entities.append({
-                    'bucket_key': bucket_key,
-                    'entity_type': entity_type,
-                    'entity_id': entity_id,
-                    'cooldown': cooldown
-                })
+        cooldowns = [cd for cd in self._entries(cooldown_name) if cd.expires_at > current_time]
+        for cooldown in sorted(cooldowns, key=lambda cd: cd.expires_at):
+            entities.append({
+                'bucket_key': cooldown.bucket_key,
+                'entity_type': cooldown.entity_type,
+                'entity_id': cooldown.entity_id,
+                'cooldown': cooldown
+            })
         
         return entities
     
@@ -196,36 +695,17 @@ class CooldownManager:
             dict: Statistiques du cooldown
         """
         current_time = int(time.time())
+        cooldowns = self._entries(cooldown_name)
         
-        with closing(self.conn.cursor()) as cursor:
-            # Cooldowns actifs
-            cursor.execute(
-                'SELECT COUNT(*) as active_count FROM cooldowns WHERE cooldown_name = ? AND expires_at > ?',
-                (cooldown_name, current_time)
-            )
-            active_count = cursor.fetchone()['active_count']
-            
-            # Cooldowns expirés (historique)
-            cursor.execute(
-                'SELECT COUNT(*) as expired_count FROM cooldowns WHERE cooldown_name = ? AND expires_at <= ?',
-                (cooldown_name, current_time)
-            )
-            expired_count = cursor.fetchone()['expired_count']
-            
-            # Types d'entités avec ce cooldown
-            cursor.execute(
-                'SELECT DISTINCT bucket_key FROM cooldowns WHERE cooldown_name = ? AND expires_at > ?',
-                (cooldown_name, current_time)
-            )
-            bucket_keys = [row['bucket_key'] for row in cursor.fetchall()]
-            
-            entity_types = {}
-            for key in bucket_keys:
-                if '_' in key:
-                    entity_type = key.split('_', 1)[0]
-                    entity_types[entity_type] = entity_types.get(entity_type, 0) + 1
-                else:
-                    entity_types['unknown'] = entity_types.get('unknown', 0) + 1
+        # Cooldowns actifs et expirés (historique)
+        active = [cd for cd in cooldowns if cd.expires_at > current_time]
+        active_count = len(active)
+        expired_count = len(cooldowns) - active_count
+        
+        # Types d'entités avec ce cooldown
+        entity_types = {}
+        for cooldown in active:
+            entity_types[cooldown.entity_type] = entity_types.get(cooldown.entity_type, 0) + 1
         
         return {
             'cooldown_name': cooldown_name,
@@ -237,16 +717,42 @@ class CooldownManager:
 
 
 class CooldownBucket:
-    """Bucket de cooldowns pour une entité spécifique."""
+    """Bucket de cooldowns pour une entité spécifique.
+    
+    Simple vue sur le cache du gestionnaire : un bucket ne contient que sa clé, et peut être
+    recréé à tout moment (cf. `CooldownManager.get`).
+    """
+    __slots__ = ('key', 'manager')
     
-    def __init__(self, bucket_key: str, manager: CooldownManager, entity: Any = None):
-        self.bucket_key = bucket_key
+    def __init__(self, key: BucketKey, manager: CooldownManager):
+        self.key = key
         self.manager = manager
-        self.entity = entity  # Référence optionnelle vers l'entité
     
     def __repr__(self):
         return f"CooldownBucket(key='{self.bucket_key}')"
     
+    @property
+    def bucket_key(self) -> str:
+        """Clé du bucket sous forme textuelle (ex. 'user_123')."""
+        return format_bucket_key(self.key)
+    
+    def acquire(self, cooldown_name: str, duration: Union[int, float], metadata: str = None) -> 'Cooldown':
+        """Vérifie et réserve un cooldown en une seule étape.
+        
+        Lève `CooldownActiveError` si le cooldown est actif, sinon le pose immédiatement : deux invocations
+        rapprochées ne peuvent pas passer toutes les deux. La réservation retournée peut être annulée avec `release`.
+        """
+        cooldown = self.manager._acquire(self.key, cooldown_name, duration, metadata)
+        logger.debug(f"Cooldown '{cooldown_name}' réservé pour bucket '{self.bucket_key}' (expire dans {duration}s)")
+        return cooldown
+    
+    def release(self, reservation: 'Cooldown') -> bool:
+        """Annule (rembourse) une réservation obtenue avec `acquire`, si elle n'a pas été remplacée depuis."""
+        released = self.manager._release(reservation)
+        if released:
+            logger.debug(f"Cooldown '{reservation.cooldown_name}' libéré pour bucket '{self.bucket_key}'")
+        return released
+    
     def set(self, cooldown_name: str, duration: Union[int, float], metadata: str = None) -> 'Cooldown':
         """Définit un cooldown dans ce bucket."""
         if duration <= 0:
@@ -256,7 +762,7 @@ class CooldownBucket:
         expires_at = current_time + int(duration)
         
         cooldown = Cooldown(
-            bucket_key=self.bucket_key,
+            key=self.key,
             cooldown_name=cooldown_name,
             expires_at=expires_at,
             created_at=current_time,
@@ -269,21 +775,10 @@ class CooldownBucket:
     
     def get(self, cooldown_name: str) -> Optional['Cooldown']:
         """Récupère un cooldown spécifique de ce bucket."""
-        with closing(self.manager.conn.cursor()) as cursor:
-            cursor.execute(
-                'SELECT * FROM cooldowns WHERE bucket_key = ? AND cooldown_name = ?',
-                (self.bucket_key, cooldown_name)
-            )
-            row = cursor.fetchone()
-            
-            if row:
-                cooldown = Cooldown.from_row(row)
-                if cooldown.is_expired():
-                    # Supprime automatiquement le cooldown expiré
-                    self.remove(cooldown_name)
-                    return None
-                return cooldown
-            return None
+        cooldown = self.manager._lookup(self.key, cooldown_name)
+        if cooldown and cooldown.is_expired():
+            return None  # Pas encore retiré par le planificateur d'expiration
+        return cooldown
     
     def has(self, cooldown_name: str) -> bool:
         """Vérifie si un cooldown est actif dans ce bucket."""
@@ -340,13 +835,7 @@ class CooldownBucket:
             current_time = int(time.time())
             expires_at = current_time + int(new_duration)
         
-        with closing(self.manager.conn.cursor()) as cursor:
-            cursor.execute(
-                'UPDATE cooldowns SET expires_at = ? WHERE bucket_key = ? AND cooldown_name = ?',
-                (expires_at, self.bucket_key, cooldown_name)
-            )
-            updated = cursor.rowcount > 0
-            self.manager.conn.commit()
+        updated = self.manager._set_expiration(self.key, cooldown_name, expires_at)
         
         if updated:
             logger.debug(f"Cooldown '{cooldown_name}' du bucket '{self.bucket_key}' mis à jour (nouvelle expiration: {expires_at})")
@@ -354,13 +843,7 @@ class CooldownBucket:
     
     def remove(self, cooldown_name: str) -> bool:
         """Supprime un cooldown spécifique de ce bucket."""
-        with closing(self.manager.conn.cursor()) as cursor:
-            cursor.execute(
-                'DELETE FROM cooldowns WHERE bucket_key = ? AND cooldown_name = ?',
-                (self.bucket_key, cooldown_name)
-            )
-            deleted = cursor.rowcount > 0
-            self.manager.conn.commit()
+        deleted = self.manager._discard(self.key, cooldown_name) > 0
             
         if deleted:
             logger.debug(f"Cooldown '{cooldown_name}' supprimé du bucket '{self.bucket_key}'")
@@ -368,48 +851,28 @@ class CooldownBucket:
     
     def clear(self) -> int:
         """Supprime tous les cooldowns de ce bucket."""
-        with closing(self.manager.conn.cursor()) as cursor:
-            cursor.execute(
-                'DELETE FROM cooldowns WHERE bucket_key = ?',
-                (self.bucket_key,)
-            )
-            deleted_count = cursor.rowcount
-            self.manager.conn.commit()
+        deleted_count = self.manager._discard(self.key)
             
         logger.debug(f"Supprimé {deleted_count} cooldowns du bucket '{self.bucket_key}'")
         return deleted_count
     
     def get_all(self) -> list['Cooldown']:
         """Retourne tous les cooldowns actifs de ce bucket."""
-        with closing(self.manager.conn.cursor()) as cursor:
-            cursor.execute(
-                'SELECT * FROM cooldowns WHERE bucket_key = ? ORDER BY expires_at ASC',
-                (self.bucket_key,)
-            )
-            rows = cursor.fetchall()
-            
-            active_cooldowns = []
-            for row in rows:
-                cooldown = Cooldown.from_row(row)
-                if not cooldown.is_expired():
-                    active_cooldowns.append(cooldown)
-                else:
-                    # Nettoie les cooldowns expirés au passage
-                    self.remove(cooldown.cooldown_name)
-            
-            return active_cooldowns
+        entries = self.manager._cache.get(self.key, {})
+        cooldowns = (Cooldown(self.key, name, *entry) for name, entry in list(entries.items()))
+        return sorted((cd for cd in cooldowns if not cd.is_expired()), key=lambda cd: cd.expires_at)
 
 
 class Cooldown:
     """Représente un cooldown individuel."""
     
     def __init__(self,
-                 bucket_key: str,
+                 key: BucketKey,
                  cooldown_name: str,
                  expires_at: int,
                  created_at: int,
                  metadata: str = None):
-        self.bucket_key = bucket_key
+        self.key = key
         self.cooldown_name = cooldown_name
         self.expires_at = expires_at
         self.created_at = created_at
@@ -418,6 +881,21 @@ class Cooldown:
     def __repr__(self):
         return f"Cooldown(bucket='{self.bucket_key}', name='{self.cooldown_name}', expires_at={self.expires_at})"
     
+    @property
+    def bucket_key(self) -> str:
+        """Clé du bucket sous forme textuelle (ex. 'user_123')."""
+        return format_bucket_key(self.key)
+    
+    @property
+    def entity_type(self) -> str:
+        """Type de l'entité du bucket ('user', 'guild', 'channel'...)."""
+        return ENTITY_TYPE_NAMES.get(self.key[0], 'unknown')
+    
+    @property
+    def entity_id(self) -> int | str:
+        """ID de l'entité du bucket."""
+        return self.key[1]
+    
     @property
     def duration(self) -> int:
         """Retourne la durée totale du cooldown en secondes."""
@@ -493,9 +971,9 @@ class Cooldown:
     
     @classmethod
     def from_row(cls, row: sqlite3.Row) -> 'Cooldown':
-        """Crée une instance de Cooldown à partir d'une ligne de base de données."""
+        """Crée une instance de Cooldown à partir d'une ligne de base de données (jointe à `cooldown_names`)."""
         return cls(
-            bucket_key=row['bucket_key'],
+            key=(row['entity_type'], row['entity_id']),
             cooldown_name=row['cooldown_name'],
             expires_at=row['expires_at'],
             created_at=row['created_at'],
@@ -503,17 +981,8 @@ class Cooldown:
         )
     
     def save(self, manager: CooldownManager):
-        """Sauvegarde le cooldown dans la base de données."""
-        with closing(manager.conn.cursor()) as cursor:
-            cursor.execute('''
-                INSERT OR REPLACE INTO cooldowns 
-                (bucket_key, cooldown_name, expires_at, created_at, metadata) 
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
-                self.bucket_key, self.cooldown_name, 
-                self.expires_at, self.created_at, self.metadata
-            ))
-            manager.conn.commit()
+        """Sauvegarde le cooldown (cache du gestionnaire, puis base de données en arrière-plan)."""
+        manager._store(self)
 
 
 # Décorateurs ================================================
@@ -521,16 +990,20 @@ class Cooldown:
 def command_cooldown(duration: Union[int, float], 
              cooldown_name: str = None,
              per: type = None,
-             error_message: str = None):
+             error_message: str = None,
+             refund_on_error: bool = True):
     """
     Décorateur pour ajouter un cooldown à une commande Discord.
     
+    Le cooldown est réservé (`CooldownBucket.acquire`) avant l'exécution de la commande.
+    
     Args:
         duration: Durée du cooldown en secondes
         cooldown_name: Nom du cooldown (optionnel, utilise le nom de la fonction par défaut)
         per: Type d'entité pour le cooldown (discord.User, discord.Guild, discord.TextChannel, etc.)
              Par défaut: discord.User
         error_message: Message d'erreur personnalisé
+        refund_on_error: Annule la réservation si la commande lève une exception
     
     Examples:
         @cooldown(3600)  # 1h par utilisateur
@@ -586,9 +1059,9 @@ def command_cooldown(duration: Union[int, float],
             manager = CooldownManager()
             bucket = manager.get(entity)
             
-            # Vérifie le cooldown
+            # Vérifie et réserve le cooldown
             try:
-                bucket.check(cd_name)
+                reservation = bucket.acquire(cd_name, duration)
             except CooldownActiveError as e:
                 # Récupère le cooldown pour utiliser la méthode de formatage
                 cooldown = bucket.get(cd_name)
@@ -612,12 +1085,12 @@ def command_cooldown(duration: Union[int, float],
                 return
             
             # Exécute la fonction
-            result = await func(*args, **kwargs)
-            
-            # Applique le cooldown après succès
-            bucket.set(cd_name, duration)
-            
-            return result
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                if refund_on_error:
+                    bucket.release(reservation)
+                raise
         
         return wrapper
     return decorator
@@ -744,11 +1217,21 @@ def get_bucket(entity: Any) -> CooldownBucket:
     manager = CooldownManager()
     return manager.get(entity)
 
+def get_bucket_cache_stats() -> dict:
+    """Fonction utilitaire pour obtenir les statistiques du cache des buckets."""
+    manager = CooldownManager()
+    return manager.get_bucket_cache_stats()
+
 def cleanup_expired_cooldowns() -> int:
     """Fonction utilitaire pour nettoyer les cooldowns expirés."""
     manager = CooldownManager()
     return manager.cleanup_expired()
 
+def on_cooldown_expired(callback: Callable[[Cooldown], Any], cooldown_name: str = None):
+    """Enregistre une fonction (ou coroutine) appelée à l'expiration des cooldowns (cf. `ExpiryScheduler.add_callback`)."""
+    manager = CooldownManager()
+    manager.expiry.add_callback(callback, cooldown_name)
+
 def get_all_cooldowns(entity: Any) -> list[Cooldown]:
     """Récupère tous les cooldowns actifs d'une entité."""
     bucket = get_bucket(entity)
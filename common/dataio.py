@@ -8,6 +8,8 @@ from typing import Any, Iterable, Sequence
 import discord
 from discord.ext import commands
 
+from common import connections
+
 COMMON_RESOURCES_PATH = Path('common/resources')
 __COGDATA_INSTANCES : dict[str, 'CogData'] = {}
 
@@ -118,16 +120,15 @@ class CogData:
             self.__managers[model].close()
             del self.__managers[model]
         db_name = self.__model_db_name(model)
-        db_path = self.cog_folder / f'{db_name}.db'
-        if db_path.exists():
-            db_path.unlink()
+        for suffix in ('.db', '.db-wal', '.db-shm'):  # Base et fichiers annexes du journal WAL
+            (self.cog_folder / f'{db_name}{suffix}').unlink(missing_ok=True)
             
     def delete_all(self) -> None:
         """Supprime toutes les bases de données du module."""
         for manager in self.__managers.values():
             manager.close()
         self.__managers.clear()
-        for db_path in self.cog_folder.glob('*.db'):
+        for db_path in self.cog_folder.glob('*.db*'):
             db_path.unlink()
     
     # --- Définitions ---
@@ -176,7 +177,7 @@ class ModelDataManager:
     # --- Connexions ---
     
     def __get_connection(self, path: Path) -> sqlite3.Connection:
-        conn = sqlite3.connect(path)
+        conn = connections.connect(path, 'cogdata')
         conn.row_factory = sqlite3.Row
         
         # Initialisation des tables (défaults)
@@ -1,14 +1,30 @@
+import asyncio
+import atexit
+import json
 import logging
+import math
+import os
+import queue
 import sqlite3
+import threading
 import time
-import hashlib
+import weakref
 import string
-from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+from datetime import datetime, timezone
+from functools import partial
+from operator import itemgetter
 from pathlib import Path
-from datetime import datetime
-from typing import Iterable, Callable, Union
+from typing import Iterable, Iterator, Callable, Union
 
 import discord
+import numpy as np
+
+from common import connections
+from common.members import MemberIndex
+from common.ranking import LeaderboardIndex
 
 logger = logging.getLogger('Economy')
 
@@ -16,6 +32,11 @@ DB_PATH = Path('common/global/')
 
 STARTING_BALANCE = 250  # Solde initial pour les nouveaux comptes
 MONEY_SYMBOL = 'g' # Symbole de la monnaie utilisée dans les opérations
+ACCOUNT_CACHE_SIZE = 1024  # Nombre de comptes conservés en mémoire (LRU)
+OPERATION_COLUMNS = 'id, user_id, delta, description, timestamp'  # Ordre des champs d'`Operation`
+DAY_SECONDS = 86400  # Granularité des agrégats journaliers (jours UTC)
+ARCHIVE_AFTER_DAYS = 90  # Âge (en jours) au-delà duquel les opérations sont déplacées dans les archives mensuelles
+CHECKPOINT_BATCH_SIZE = 5000  # Points de contrôle écrits par transaction (le verrou d'écriture est relâché entre deux lots)
 
 # Exceptions ================================
 
@@ -53,24 +74,96 @@ def to_base62(num: int) -> str:
         chars.append(IDG_ALPHA[rem])
     return ''.join(reversed(chars))
 
-def generate_id(user_id: int, balance: int, description: str, timestamp: int = None) -> str:
-    if timestamp is None:
-        timestamp = int(time.time())
-    if isinstance(timestamp, datetime):
-        timestamp = int(timestamp.timestamp())
-    if not isinstance(user_id, int) or not isinstance(balance, int):
-        raise TypeError("user_id and balance must be integers.")
+def to_base62_padded(num: int, width: int) -> str:
+    """Encode en base62 sur une largeur fixe : l'ordre des chaînes suit alors l'ordre des nombres."""
+    return to_base62(num).rjust(width, IDG_ALPHA[0])
+
+IDG_EPOCH = 1735689600000  # 2025-01-01 00:00:00 UTC, en millisecondes
+IDG_WORKER_BITS = 10
+IDG_SEQUENCE_BITS = 12
+IDG_WIDTH = 11  # 62^11 > 2^63 : tout identifiant 63 bits tient sur 11 caractères
+IDG_WORKER_ENV = 'ROBIN_WORKER_ID'  # Variable d'environnement donnant le worker du processus (0 par défaut)
+
+class IdGenerator:
+    """Générateur d'identifiants façon Snowflake : 41 bits de temps (ms) | 10 bits de worker | 12 bits de séquence.
+    
+    Les identifiants sont strictement croissants pour un même générateur (y compris si l'horloge recule),
+    sans collision quel que soit le débit : au-delà de 4096 identifiants dans la même milliseconde,
+    la génération emprunte la milliseconde suivante au lieu d'attendre.
+    
+    Cette garantie ne vaut qu'au sein d'un processus : deux processus écrivant dans la même base (le bot et
+    un script de maintenance ou un benchmark, par exemple) doivent utiliser des `worker_id` différents, sinon
+    ils peuvent produire le même identifiant dans la même milliseconde (cf. `set_worker_id`, IDG_WORKER_ENV).
+    """
+    def __init__(self, worker_id: int = 0):
+        if not 0 <= worker_id < (1 << IDG_WORKER_BITS):
+            raise ValueError(f"worker_id doit être compris entre 0 et {(1 << IDG_WORKER_BITS) - 1}.")
+        self.worker_id = worker_id
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+        
+    def __repr__(self):
+        return f"IdGenerator(worker_id={self.worker_id})"
+        
+    def next_int(self) -> int:
+        """Retourne le prochain identifiant sous forme d'entier."""
+        with self._lock:
+            now = time.time_ns() // 1_000_000 - IDG_EPOCH
+            if now > self._last_ms:
+                self._last_ms = now
+                self._sequence = 0
+            else:
+                self._sequence += 1
+                if self._sequence >> IDG_SEQUENCE_BITS:
+                    self._last_ms += 1
+                    self._sequence = 0
+            return (self._last_ms << (IDG_WORKER_BITS + IDG_SEQUENCE_BITS)) | (self.worker_id << IDG_SEQUENCE_BITS) | self._sequence
     
-    # Encodage de l'horodatage en base62
-    ts_part = to_base62(timestamp)
+    def next_id(self) -> str:
+        """Retourne le prochain identifiant encodé en base62 (11 caractères, triables)."""
+        return to_base62_padded(self.next_int(), IDG_WIDTH)
+    
+_id_generator = IdGenerator(int(os.environ.get(IDG_WORKER_ENV, 0)))
+
+def set_worker_id(worker_id: int):
+    """Change le worker des identifiants générés par ce processus (à appeler au démarrage, avant toute écriture)."""
+    global _id_generator
+    generator = IdGenerator(worker_id)
+    generator._last_ms = _id_generator._last_ms  # Les identifiants restent croissants après le changement
+    _id_generator = generator
+
+def generate_id() -> str:
+    """Retourne un nouvel identifiant d'opération unique et croissant."""
+    return _id_generator.next_id()
 
-    # Petit hash pour différencier en cas de collisions
-    data = f"{user_id}-{balance}-{description}".encode()
-    h = hashlib.blake2s(data, digest_size=2).digest()  # 16 bits
-    hash_num = int.from_bytes(h, "big")
-    hash_part = to_base62(hash_num)
+# Catégories d'opérations ================================
 
-    return f"{ts_part}{hash_part}"
+# Descriptions sans séparateur « - », reconnues par leur début
+CATEGORY_PREFIXES = {
+    'Transfert vers': 'Transfert',
+    'Transfert de': 'Transfert',
+    'Volé par': 'Pickpocket',
+    'Pickpocket': 'Pickpocket',
+    'Modif. par': 'Ajustement',
+    "Annulation de l'opération": 'Annulation',
+}
+DEFAULT_CATEGORY = 'Autre'
+
+def operation_category(description: str | None) -> str:
+    """Retourne la catégorie (source) d'une opération à partir de sa description.
+    
+    Les préfixes connus sont prioritaires (ex. « Transfert vers X »), puis les descriptions
+    de la forme « Source - détail » donnent « Source » (ex. « Machine à sous - mise »).
+    """
+    if not description:
+        return DEFAULT_CATEGORY
+    for prefix, category in CATEGORY_PREFIXES.items():
+        if description.startswith(prefix):
+            return category
+    if ' - ' in description:
+        return description.split(' - ', 1)[0].strip()
+    return DEFAULT_CATEGORY
 
 # Classes =================================
 
@@ -91,19 +184,60 @@ class EconomyDBManager:
         self.db_path = db_path
         self.db_path.mkdir(parents=True, exist_ok=True)
         
+        # Connexion principale (écritures), partagée entre fils et protégée par un verrou
         self.conn = self._connect()
+        self._lock = threading.RLock()
+        self._local = threading.local()  # Connexions de lecture des fils du pool
+        
+        # Archives mensuelles des anciennes opérations (une base SQLite par mois)
+        self.archive_path = self.db_path / 'archives'
+        self._partitions: list[LedgerPartition] = []
+        
         self._initialize(self.conn)
+        self._partitions = self._load_partitions()
+        
+        # Carte d'identité des comptes : un seul état (solde) par utilisateur, partagé par tous les `BankAccount`
+        self._states: OrderedDict[int, AccountState] = OrderedDict()  # LRU borné à ACCOUNT_CACHE_SIZE
+        self._live_states: weakref.WeakValueDictionary[int, AccountState] = weakref.WeakValueDictionary()  # États encore référencés
+        
+        # Classements en mémoire, chargés au premier classement de guilde demandé
+        self.leaderboards = LeaderboardIndex(STARTING_BALANCE)
+        
+        # Transactions et validations groupées
+        self._tx_depth = 0
+        self._deferred = False
+        self.pipeline = CommitPipeline(self)
+        
         self._initialized = True
 
     def __del__(self):
         if self.conn:
+            if self.conn.in_transaction:
+                self.conn.commit()  # Valide un éventuel lot en attente
             self.conn.close()
         
-    def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path / 'economy.db')
+    def _connect(self, readonly: bool = False) -> sqlite3.Connection:
+        # Profil 'durable' (WAL) : les lectures du pool ne sont pas bloquées par le fil d'écriture
+        conn = connections.connect(self.db_path / 'economy.db', 'economy', readonly=readonly, check_same_thread=False)
         conn.row_factory = sqlite3.Row
+        conn.create_function('ledger_category', 1, operation_category, deterministic=True)
         return conn
     
+    def _open_reader(self):
+        """Ouvre la connexion de lecture du fil courant (initialisation du pool de lecteurs)."""
+        self._local.conn = self._connect(readonly=True)
+        
+    @contextmanager
+    def _reading(self) -> Iterator[sqlite3.Cursor]:
+        """Retourne un curseur de lecture : connexion propre au fil s'il appartient au pool, sinon connexion principale."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            with closing(conn.cursor()) as cursor:
+                yield cursor
+        else:
+            with self._lock, closing(self.conn.cursor()) as cursor:
+                yield cursor
+    
     def _initialize(self, connection: sqlite3.Connection):
         with closing(connection.cursor()) as cursor:
             cursor.execute(f'''
@@ -122,7 +256,89 @@ class EconomyDBManager:
                     FOREIGN KEY(user_id) REFERENCES economy(user_id)
                 )
             ''')
-            self.conn.commit()
+            # Index composite pour les historiques (pagination par (timestamp, id)) et statistiques
+            cursor.execute('DROP INDEX IF EXISTS idx_operations_user_timestamp')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_operations_user_timestamp_id
+                ON operations (user_id, timestamp DESC, id DESC)
+            ''')
+            # Index sur l'horodatage seul, pour déplacer les anciennes opérations vers les archives
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_operations_timestamp ON operations (timestamp)')
+            # Partitions d'archive : opérations de [start_ts, end_ts) déplacées dans archives/<path>
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ledger_partitions (
+                    month TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    start_ts INTEGER NOT NULL,
+                    end_ts INTEGER NOT NULL,
+                    count INTEGER NOT NULL
+                )
+            ''')
+            # Points de contrôle : solde de chaque compte à une position (timestamp, id) du journal
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ledger_checkpoints (
+                    user_id INTEGER PRIMARY KEY,
+                    balance INTEGER NOT NULL,
+                    op_timestamp INTEGER NOT NULL,
+                    op_id TEXT NOT NULL,
+                    created_at INTEGER NOT NULL
+                ) WITHOUT ROWID
+            ''')
+            # Agrégats journaliers par utilisateur et catégorie, tenus à jour à chaque opération
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ledger_daily'")
+            rollups_exist = cursor.fetchone() is not None
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ledger_daily (
+                    user_id INTEGER NOT NULL,
+                    day INTEGER NOT NULL,
+                    category TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    total INTEGER NOT NULL,
+                    inflow INTEGER NOT NULL,
+                    outflow INTEGER NOT NULL,
+                    min_delta INTEGER NOT NULL,
+                    max_delta INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, day, category)
+                ) WITHOUT ROWID
+            ''')
+            if not rollups_exist:
+                count = self._rebuild_rollups(cursor)
+                logger.info(f"Agrégats journaliers initialisés à partir de l'historique ({count} lignes)")
+            connection.commit()
+            
+    # Transactions -----------------------------
+    
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Exécute un bloc d'écritures dans une transaction unique.
+        
+        Les transactions sont imbricables (points de sauvegarde) : seul le bloc le plus externe valide,
+        en une seule fois. En cas d'erreur, seules les écritures du bloc sont annulées. Lorsqu'elle est
+        lancée depuis le `CommitPipeline`, la validation est différée au prochain lot.
+        Le verrou de la connexion principale est conservé pendant tout le bloc.
+        """
+        with self._lock:
+            depth = self._tx_depth
+            if not self.conn.in_transaction:
+                self.conn.execute('BEGIN')
+            savepoint = f'sp_{depth}'
+            self.conn.execute(f'SAVEPOINT {savepoint}')
+            self._tx_depth += 1
+            try:
+                with closing(self.conn.cursor()) as cursor:
+                    yield cursor
+            except BaseException:
+                self.conn.execute(f'ROLLBACK TO {savepoint}')
+                self.conn.execute(f'RELEASE {savepoint}')
+                if depth == 0 and not self._deferred:
+                    self.conn.commit()  # Ferme la transaction (et valide d'éventuelles écritures en attente)
+                raise
+            else:
+                self.conn.execute(f'RELEASE {savepoint}')
+                if depth == 0 and not self._deferred:
+                    self.conn.commit()
+            finally:
+                self._tx_depth -= 1
             
     # Comptes -----------------------------
     
@@ -130,77 +346,815 @@ class EconomyDBManager:
         """Retourne le compte bancaire d'un utilisateur."""
         return BankAccount(user, self)
     
+    def _get_state(self, user_id: int) -> 'AccountState':
+        """Retourne l'état partagé d'un compte, chargé (ou créé) en base uniquement s'il n'est pas déjà en mémoire.
+        
+        Le solde est lu sous le verrou, sur la connexion principale : il inclut les écritures du fil
+        d'écriture pas encore validées (lot en attente), invisibles des connexions de lecture.
+        """
+        with self._lock:
+            state = self._cached_state(user_id)
+            if state is None:
+                state = AccountState(user_id, self._fetch_balance(user_id))
+                self._live_states[user_id] = state
+                self._cache_state(state)
+            return state
+    
+    def _cached_state(self, user_id: int) -> 'AccountState | None':
+        state = self._states.get(user_id)
+        if state is not None:
+            self._states.move_to_end(user_id)
+            return state
+        # Évincé du LRU mais toujours utilisé par un compte : on le réintègre
+        state = self._live_states.get(user_id)
+        if state is not None:
+            self._cache_state(state)
+        return state
+    
+    def _cache_state(self, state: 'AccountState'):
+        self._states[state.user_id] = state
+        while len(self._states) > ACCOUNT_CACHE_SIZE:
+            self._states.popitem(last=False)
+    
+    def _set_balance(self, user_id: int, balance: int):
+        """Met à jour le solde d'un compte en mémoire, s'il y est chargé."""
+        state = self._states.get(user_id) or self._live_states.get(user_id)
+        if state is not None:
+            state.balance = balance
+        self.leaderboards.update(user_id, balance)
+    
+    def _refresh_states(self):
+        """Recharge depuis la base le solde de tous les comptes en mémoire (ex. après l'échec d'une validation)."""
+        with self._lock, closing(self.conn.cursor()) as cursor:
+            for state in list(self._live_states.values()) + list(self._states.values()):
+                cursor.execute('SELECT balance FROM economy WHERE user_id = ?', (state.user_id,))
+                row = cursor.fetchone()
+                state.balance = row['balance'] if row else STARTING_BALANCE
+            if self.leaderboards.loaded:
+                self._load_leaderboards()
+    
+    def _fetch_balance(self, user_id: int) -> int:
+        """Lit (ou crée) le solde d'un compte sur la connexion principale. Appelé sous `_lock`."""
+        with closing(self.conn.cursor()) as cursor:
+            cursor.execute('SELECT balance FROM economy WHERE user_id = ?', (user_id,))
+            row = cursor.fetchone()
+        if row:
+            return row['balance']
+        # Création du compte
+        with self.transaction() as cursor:
+            cursor.execute('INSERT OR IGNORE INTO economy (user_id, balance) VALUES (?, ?)', 
+                           (user_id, STARTING_BALANCE))
+            cursor.execute('SELECT balance FROM economy WHERE user_id = ?', (user_id,))
+            return cursor.fetchone()['balance']
+    
     def get_accounts(self, users: Iterable[discord.User | discord.Member]) -> Iterable['BankAccount']:
         """Retourne les comptes bancaires pour une liste d'utilisateurs."""
         return (self.get_account(user) for user in users)
     
+    # Transferts -----------------------------
+    
+    def transfer(self, from_id: int, to_id: int, amount: int, descriptions: tuple[str, str]) -> tuple['Operation', 'Operation']:
+        """Transfère un montant d'un compte à un autre de manière atomique.
+        
+        Le débit est conditionnel (solde suffisant), puis le crédit et les deux opérations sont écrits
+        dans la même transaction. `descriptions` contient la description côté émetteur puis côté bénéficiaire.
+        Retourne les opérations (débit, crédit).
+        """
+        amount = int(amount)
+        if amount <= 0:
+            raise InvalidAmountError("Le montant doit être supérieur à zéro pour le transfert.")
+        if from_id == to_id:
+            raise OperationError("Impossible de transférer des fonds vers le même compte.")
+        
+        with self._lock:  # Les soldes en mémoire sont mis à jour avant toute autre écriture
+            with self.transaction() as cursor:
+                cursor.executemany('INSERT OR IGNORE INTO economy (user_id, balance) VALUES (?, ?)',
+                                   [(from_id, STARTING_BALANCE), (to_id, STARTING_BALANCE)])
+                cursor.execute('UPDATE economy SET balance = balance - ? WHERE user_id = ? AND balance >= ? RETURNING balance',
+                               (amount, from_id, amount))
+                rows = cursor.fetchall()
+                if not rows:
+                    raise InsufficientFundsError("Fonds insuffisants pour le transfert.")
+                sender_balance = rows[0]['balance']
+                cursor.execute('UPDATE economy SET balance = balance + ? WHERE user_id = ? RETURNING balance',
+                               (amount, to_id))
+                recipient_balance = cursor.fetchall()[0]['balance']
+                
+                debit = Operation(user_id=int(from_id), delta=-amount, description=descriptions[0])
+                credit = Operation(user_id=int(to_id), delta=amount, description=descriptions[1])
+                debit.save(self, cursor)
+                credit.save(self, cursor)
+            self._set_balance(from_id, sender_balance)
+            self._set_balance(to_id, recipient_balance)
+        return debit, credit
+    
+    # Paiements groupés -----------------------------
+    
+    def deposit_many(self, payouts: Iterable[tuple[int, int, str]]) -> 'PayoutReport':
+        """Crédite plusieurs comptes en une seule transaction (événements, distributions, intérêts…).
+        
+        `payouts` contient des tuples (user_id, montant, description). Les comptes manquants sont créés,
+        puis tous les soldes et toutes les opérations sont écrits par `executemany`. Les lignes invalides
+        sont ignorées et signalées dans le rapport, ligne par ligne.
+        """
+        return self._apply_many(payouts, 1)
+    
+    def withdraw_many(self, withdrawals: Iterable[tuple[int, int, str]]) -> 'PayoutReport':
+        """Débite plusieurs comptes en une seule transaction (cf. `deposit_many`).
+        
+        Les lignes sont appliquées dans l'ordre : un retrait qui rendrait le solde négatif est refusé
+        (et signalé), les suivants restent possibles.
+        """
+        return self._apply_many(withdrawals, -1)
+    
+    def _apply_many(self, entries: Iterable[tuple[int, int, str]], sign: int) -> 'PayoutReport':
+        lines = []
+        for user_id, amount, description in entries:
+            line = PayoutLine(user_id, amount, description)
+            lines.append(line)
+            if isinstance(user_id, str) and user_id.isascii() and user_id.isdecimal():
+                user_id = line.user_id = int(user_id)
+            if not isinstance(user_id, int) or isinstance(user_id, bool):
+                # Ni booléen (True deviendrait le compte 1) ni flottant (tronqué vers un autre compte)
+                line.error = AccountError(f"Identifiant de compte invalide : {user_id!r}")
+                continue
+            if not isinstance(amount, int) or isinstance(amount, bool) or amount <= 0:
+                line.error = InvalidAmountError("Le montant doit être un entier supérieur à zéro.")
+        user_ids = list(dict.fromkeys(line.user_id for line in lines if not line.error))
+        if not user_ids:
+            return PayoutReport(lines)
+        
+        with self._lock:
+            with self.transaction() as cursor:
+                cursor.executemany('INSERT OR IGNORE INTO economy (user_id, balance) VALUES (?, ?)',
+                                   [(uid, STARTING_BALANCE) for uid in user_ids])
+                cursor.execute('SELECT user_id, balance FROM economy WHERE user_id IN (SELECT value FROM json_each(?))',
+                               (json.dumps(user_ids),))
+                balances = dict(cursor.fetchall())
+                
+                for line in lines:
+                    if line.error:
+                        continue
+                    balance = balances[line.user_id] + sign * line.amount
+                    if balance < 0:
+                        line.error = InsufficientFundsError("Fonds insuffisants pour le retrait.")
+                        continue
+                    balances[line.user_id] = balance
+                    line.operation = Operation(line.user_id, sign * line.amount, line.description)
+                
+                operations = [line.operation for line in lines if line.operation]
+                changed = {op.user_id: balances[op.user_id] for op in operations}
+                cursor.executemany('UPDATE economy SET balance = ? WHERE user_id = ?',
+                                   [(balance, uid) for uid, balance in changed.items()])
+                Operation.save_many(operations, cursor)
+            for uid, balance in changed.items():
+                self._set_balance(uid, balance)
+        return PayoutReport(lines)
+    
+    # Annulations -----------------------------
+    
+    def rollback(self, user_id: int, target_id: str, dry_run: bool = False) -> 'RollbackResult':
+        """Annule en bloc toutes les opérations d'un compte depuis une opération cible (incluse).
+        
+        Les opérations concernées sont lues par une seule requête sur l'index (user_id, timestamp, id), le solde
+        final est vérifié une fois, puis les opérations compensatoires et le nouveau solde sont écrits dans
+        une seule transaction. Avec `dry_run`, rien n'est écrit : le résultat donne seulement l'aperçu.
+        """
+        if dry_run:
+            reverted, balance = self._plan_rollback(user_id, target_id)
+            return RollbackResult(user_id, reverted, [], balance, dry_run=True)
+        
+        with self._lock:
+            with self.transaction() as cursor:
+                reverted, balance = self._plan_rollback(user_id, target_id)
+                result = RollbackResult(user_id, reverted, [
+                    Operation(user_id=user_id, delta=-op.delta, description=f"Annulation de l'opération {op.id}")
+                    for op in reverted if op.delta
+                ], balance)
+                if result.new_balance < 0:
+                    raise InsufficientFundsError("Le solde ne peut pas devenir négatif après l'annulation.")
+                Operation.save_many(result.compensations, cursor)
+                cursor.execute('UPDATE economy SET balance = ? WHERE user_id = ?', (result.new_balance, user_id))
+            self._set_balance(user_id, result.new_balance)
+        return result
+    
+    def _plan_rollback(self, user_id: int, target_id: str) -> tuple[list['Operation'], int]:
+        target = self.get_operation_by_id(target_id)
+        if target.user_id != user_id:
+            raise OperationError(f"Aucune opération trouvée avec l'ID {target_id} pour ce compte.")
+        # Plage lue sur l'index (user_id, timestamp, id), archives comprises si la cible est ancienne
+        reverted = self.get_operations(user_id=user_id, after=target.key) + [target]
+        with self._reading() as cursor:
+            cursor.execute('SELECT balance FROM economy WHERE user_id = ?', (user_id,))
+            row = cursor.fetchone()
+        return reverted, row['balance'] if row else STARTING_BALANCE
+    
     # Opérations -----------------------------
     
     def get_operation_by_id(self, operation_id: str) -> 'Operation':
-        """Retourne une opération par son ID."""
-        with closing(self.conn.cursor()) as cursor:
-            cursor.execute('SELECT * FROM operations WHERE id = ?', (operation_id,))
-            row = cursor.fetchone()
+        """Retourne une opération par son ID (base courante puis archives, des plus récentes aux plus anciennes)."""
+        for source, _, _ in self._sources():
+            with self._reading_source(source) as cursor:
+                cursor.execute(f'SELECT {OPERATION_COLUMNS} FROM operations WHERE id = ?', (operation_id,))
+                row = cursor.fetchone()
             if row:
                 return Operation.from_row(row)
+        raise OperationError(f"Aucune opération trouvée avec l'ID {operation_id}.")
+    
+    def get_operations(self,
+                       func: Callable[['Operation'], bool] = None,
+                       *,
+                       user_id: int = None,
+                       since: int | float = None,
+                       until: int | float = None,
+                       limit: int = None,
+                       offset: int = None,
+                       before: tuple[int, str] = None,
+                       after: tuple[int, str] = None,
+                       order: str = 'DESC') -> list['Operation']:
+        """Retourne les opérations correspondant aux critères, triées par (timestamp, id).
+        
+        Les critères (utilisateur, période, clés de pagination, limite, décalage, ordre) sont appliqués en SQL ;
+        `func` n'est qu'un filtre optionnel appliqué ensuite en Python (le décalage porte alors sur les opérations retenues).
+        Avec un décalage, les sources entièrement sautées sont seulement comptées sur l'index, jamais lues.
+        `before` et `after` sont des clés (timestamp, id) exclusives, cf. `Operation.key`.
+        Les partitions d'archive concernées par la période sont lues à la suite de la base courante,
+        dans l'ordre demandé, jusqu'à atteindre la limite.
+        """
+        order = order.upper()
+        if order not in ('ASC', 'DESC'):
+            raise ValueError("L'ordre doit être 'ASC' ou 'DESC'.")
+        
+        clauses, params = [], []
+        if user_id is not None:
+            clauses.append('user_id = ?')
+            params.append(user_id)
+        if since is not None:
+            clauses.append('timestamp >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('timestamp < ?')
+            params.append(until)
+        if before is not None:
+            clauses.append('(timestamp, id) < (?, ?)')
+            params.extend(before)
+        if after is not None:
+            clauses.append('(timestamp, id) > (?, ?)')
+            params.extend(after)
+        
+        # Bornes d'horodatage, pour ne lire que les partitions utiles
+        lows = [v for v in (since, after[0] if after else None) if v is not None]
+        highs = [v for v in (until, before[0] + 1 if before else None) if v is not None]
+        skip = offset or 0  # Opérations restant à sauter
+        if limit is not None and limit <= 0:
+            return []
+        
+        operations = []
+        for source, start, end in self._sources(max(lows, default=None), min(highs, default=None), order):
+            query, query_params = self._source_query(f'SELECT {OPERATION_COLUMNS} FROM operations',
+                                                     clauses, params, start, end)
+            with self._reading_source(source) as cursor:
+                if skip and not func:
+                    # Comptage sur l'index, borné : une source entièrement sautée n'est pas lue
+                    count_query, count_params = self._source_query('SELECT 1 FROM operations', clauses, params, start, end)
+                    cursor.execute(f'SELECT COUNT(*) FROM ({count_query} LIMIT ?)', count_params + [skip + 1])
+                    available = cursor.fetchone()[0]
+                    if available <= skip:
+                        skip -= available
+                        continue
+                
+                query += f' ORDER BY timestamp {order}, id {order}'
+                if not func and (limit is not None or skip):
+                    query += ' LIMIT ? OFFSET ?'
+                    query_params += [limit - len(operations) if limit is not None else -1, skip]
+                    skip = 0
+                
+                cursor.row_factory = None  # Tuples bruts, convertis en masse par `Operation.from_rows`
+                cursor.execute(query, query_params)
+                if not func:
+                    operations.extend(Operation.from_rows(cursor.fetchall()))
+                else:
+                    # Filtre Python : les `offset` premières correspondances sont sautées, arrêt dès la limite atteinte
+                    for operation in map(partial(tuple.__new__, Operation), cursor):
+                        if not func(operation):
+                            continue
+                        if skip:
+                            skip -= 1
+                            continue
+                        operations.append(operation)
+                        if limit is not None and len(operations) >= limit:
+                            break
+            if limit is not None and len(operations) >= limit:
+                break
+        return operations
+    
+    # Classements -----------------------------
+    
+    def get_leaderboard(self, user_ids: Iterable[int], limit: int = 20, focus: int = None) -> 'Leaderboard':
+        """Retourne le classement par solde d'un ensemble d'utilisateurs en une seule requête.
+        
+        Les utilisateurs sans compte sont classés avec le solde initial, sans que leur compte soit créé.
+        `focus` permet d'obtenir en plus la ligne d'un utilisateur précis (ex. l'auteur de la commande).
+        """
+        with self._reading() as cursor:
+            cursor.execute('''
+                WITH members AS (
+                    SELECT DISTINCT value AS user_id FROM json_each(?)
+                ),
+                ranked AS (
+                    SELECT m.user_id AS user_id,
+                           COALESCE(e.balance, ?) AS balance,
+                           RANK() OVER (ORDER BY COALESCE(e.balance, ?) DESC) AS rank,
+                           ROW_NUMBER() OVER (ORDER BY COALESCE(e.balance, ?) DESC, m.user_id) AS position,
+                           COUNT(*) OVER () AS total
+                    FROM members m
+                    LEFT JOIN economy e ON e.user_id = m.user_id
+                )
+                SELECT user_id, balance, rank, position, total FROM ranked
+                WHERE position <= ? OR user_id = ?
+                ORDER BY position
+            ''', (json.dumps(list(user_ids)), STARTING_BALANCE, STARTING_BALANCE, STARTING_BALANCE, limit, focus))
+            rows = cursor.fetchall()
+        
+        entries = [LeaderboardEntry(row['user_id'], row['balance'], row['rank']) for row in rows if row['position'] <= limit]
+        focus_entry = next((LeaderboardEntry(row['user_id'], row['balance'], row['rank']) for row in rows if row['user_id'] == focus), None)
+        total = rows[0]['total'] if rows else 0
+        return Leaderboard(entries, focus_entry, total)
+    
+    def get_guild_leaderboard(self, guild_id: int, member_ids: Iterable[int] = None, limit: int = 20, focus: int = None) -> 'Leaderboard':
+        """Retourne le classement d'une guilde depuis l'index en mémoire, sans requête SQL.
+        
+        La vue de la guilde est créée au premier appel à partir de `member_ids`, puis tenue à jour par
+        les variations de solde et les arrivées et départs de membres (cf. `LeaderboardIndex`).
+        """
+        if member_ids is not None and not self.leaderboards.loaded:
+            self._load_leaderboards()
+        result = self.leaderboards.leaderboard(guild_id, limit, focus, member_ids)
+        if result is None:
+            raise ValueError("La liste des membres est nécessaire pour suivre une nouvelle guilde.")
+        return Leaderboard.from_index(*result)
+    
+    def _load_leaderboards(self):
+        # Sous le verrou d'écriture : aucune variation de solde ne peut être manquée pendant le chargement
+        with self._lock, closing(self.conn.cursor()) as cursor:
+            cursor.row_factory = None
+            cursor.execute('SELECT user_id, balance FROM economy')
+            self.leaderboards.load(cursor.fetchall())
+        logger.info(f"Index des classements chargé ({len(self.leaderboards)} comptes)")
+    
+    # Statistiques -----------------------------
+    
+    def get_ledger_stats(self, 
+                         user_ids: Iterable[int], 
+                         since: int | float = None, 
+                         until: int | float = None) -> dict[int, 'LedgerStats']:
+        """Retourne les statistiques des opérations de plusieurs utilisateurs sur une période, en une seule requête.
+        
+        `since` est inclusif et `until` exclusif (comme pour `get_operations`). Les jours entiers de la période
+        sont lus dans les agrégats journaliers et seuls les bords (jours partiels) dans `operations` : le coût ne
+        dépend pas de la taille de l'historique. Les utilisateurs sans opération ont des statistiques vides.
+        """
+        user_ids = list(dict.fromkeys(int(uid) for uid in user_ids))
+        stats = {uid: LedgerStats(uid) for uid in user_ids}
+        for stat in self._query_ledger(user_ids, since, until, by_category=False):
+            stats[stat.user_id] = stat
+        return stats
+    
+    def get_ledger_stat(self, user_id: int, since: int | float = None, until: int | float = None) -> 'LedgerStats':
+        """Retourne les statistiques des opérations d'un utilisateur sur une période."""
+        return self.get_ledger_stats([user_id], since, until)[int(user_id)]
+    
+    def get_ledger_breakdown(self, user_id: int, since: int | float = None, until: int | float = None) -> dict[str, 'LedgerStats']:
+        """Retourne les statistiques d'un utilisateur sur une période, par catégorie (source) d'opération."""
+        return {stat.category: stat for stat in self._query_ledger([int(user_id)], since, until, by_category=True)}
+    
+    def _query_ledger(self, user_ids: list[int], since: int | float | None, until: int | float | None, by_category: bool) -> list['LedgerStats']:
+        # Jours entiers [first_day, end_day) lus dans les agrégats, bords partiels lus dans les opérations brutes
+        first_day = math.ceil(since / DAY_SECONDS) if since is not None else None
+        end_day = math.floor(until / DAY_SECONDS) if until is not None else None
+        raw_ranges = []
+        if first_day is not None and end_day is not None and first_day >= end_day:
+            raw_ranges.append((since, until))  # Période de moins d'un jour entier
+            day_range = None
+        else:
+            if since is not None:
+                raw_ranges.append((since, first_day * DAY_SECONDS))
+            if until is not None:
+                raw_ranges.append((end_day * DAY_SECONDS, until))
+            day_range = (first_day if first_day is not None else -1, end_day if end_day is not None else 1 << 62)
+        
+        category = 'ledger_category(description)' if by_category else "''"
+        raw_part = f'''
+            SELECT user_id, {category}, 1, delta, MAX(delta, 0), MAX(-delta, 0), delta, delta
+            FROM operations
+            WHERE user_id IN (SELECT user_id FROM ids) AND timestamp >= ? AND timestamp < ?
+        '''
+        
+        # Base courante : agrégats et bords récents en une requête
+        watermark = self.archived_until
+        parts, params = [], []
+        if day_range:
+            parts.append('''
+                SELECT user_id, category, count, total, inflow, outflow, min_delta, max_delta
+                FROM ledger_daily
+                WHERE user_id IN (SELECT user_id FROM ids) AND day >= ? AND day < ?
+            ''')
+            params.extend(day_range)
+        cold_ranges = []
+        for start, end in raw_ranges:
+            if watermark is not None and start < watermark:
+                cold_ranges.append((start, min(end, watermark)))
+                start = watermark
+            if start < end:
+                parts.append(raw_part)
+                params.extend((start, end))
+        
+        stats = {}
+        if parts:
+            with self._reading() as cursor:
+                cursor.execute(self._ledger_sql(parts, by_category), [json.dumps(user_ids)] + params)
+                for row in cursor.fetchall():
+                    stats[(row['user_id'], row['category'])] = LedgerStats.from_row(row)
+        
+        # Bords anciens : lus dans les archives concernées, puis fusionnés
+        for low, high in cold_ranges:
+            for source, start, end in self._sources(low, high):
+                if source is None:
+                    continue
+                with self._reading_source(source) as cursor:
+                    cursor.execute(self._ledger_sql([raw_part], by_category), 
+                                   [json.dumps(user_ids), max(low, start), min(high, end)])
+                    for row in cursor.fetchall():
+                        stat = LedgerStats.from_row(row)
+                        key = (stat.user_id, row['category'])
+                        stats[key] = stats[key].merge(stat) if key in stats else stat
+        return [stats[key] for key in sorted(stats)]
+    
+    @staticmethod
+    def _ledger_sql(parts: list[str], by_category: bool) -> str:
+        group, category = ('user_id, category', 'category') if by_category else ('user_id', "''")
+        return f'''
+            WITH ids(user_id) AS (SELECT value FROM json_each(?)),
+            parts(user_id, category, count, total, inflow, outflow, min_delta, max_delta) AS (
+                {' UNION ALL '.join(parts)}
+            )
+            SELECT user_id, {category} AS category,
+                   SUM(count) AS count, SUM(total) AS total, SUM(inflow) AS inflow, SUM(outflow) AS outflow,
+                   MIN(min_delta) AS min_delta, MAX(max_delta) AS max_delta
+            FROM parts
+            GROUP BY {group}
+        '''
+    
+    def rebuild_ledger_rollups(self) -> int:
+        """Recalcule tous les agrégats journaliers à partir de l'historique (archives comprises). Retourne le nombre de lignes d'agrégats."""
+        with self._lock, self.transaction() as cursor:
+            return self._rebuild_rollups(cursor)
+    
+    def _rebuild_rollups(self, cursor: sqlite3.Cursor) -> int:
+        aggregate = f'''
+            SELECT user_id, CAST(timestamp / {DAY_SECONDS} AS INTEGER), ledger_category(description),
+                   COUNT(*), SUM(delta), TOTAL(MAX(delta, 0)), TOTAL(MAX(-delta, 0)), MIN(delta), MAX(delta)
+            FROM operations
+        '''
+        cursor.execute('DELETE FROM ledger_daily')
+        for source, start, end in self._sources(order='ASC'):
+            query, params = self._source_query(aggregate, [], [], start, end)
+            query += ' GROUP BY 1, 2, 3'
+            if source is None:
+                cursor.execute(f'''
+                    INSERT INTO ledger_daily (user_id, day, category, count, total, inflow, outflow, min_delta, max_delta)
+                    {query}
+                ''', params)
             else:
-                raise OperationError(f"Aucune opération trouvée avec l'ID {operation_id}.")
+                with self._reading_source(source) as archive:
+                    archive.row_factory = None
+                    archive.execute(query, params)
+                    _merge_rollups(cursor, archive.fetchall())
+        cursor.execute('SELECT COUNT(*) FROM ledger_daily')
+        return cursor.fetchone()[0]
     
-    def get_operations(self, func: Callable[['Operation'], bool] = None) -> Iterable['Operation']:
-        """Retourne toutes les opérations, filtrées si un filtre est fourni."""
-        with closing(self.conn.cursor()) as cursor:
-            cursor.execute('SELECT * FROM operations ORDER BY timestamp DESC')
+    def count_operations(self, user_id: int, limit: int = None) -> int:
+        """Retourne le nombre d'opérations d'un utilisateur, archives comprises (borné à `limit` si fourni)."""
+        count = 0
+        for source, start, end in self._sources():
+            query, params = self._source_query('SELECT 1 FROM operations', ['user_id = ?'], [user_id], start, end)
+            if limit is not None:
+                query += ' LIMIT ?'
+                params.append(limit - count)
+            with self._reading_source(source) as cursor:
+                cursor.execute(f'SELECT COUNT(*) FROM ({query})', params)
+                count += cursor.fetchone()[0]
+            if limit is not None and count >= limit:
+                break
+        return count
+    
+    # Analyses -----------------------------
+    
+    def get_analytics(self, days: int = 30) -> 'EconomyAnalytics':
+        """Calcule les indicateurs de la masse monétaire sur l'ensemble des comptes.
+        
+        Les soldes et les agrégats journaliers de la période (`days` derniers jours, par jours UTC entiers)
+        sont lus en deux requêtes, puis tous les calculs sont vectorisés avec NumPy : masse totale,
+        coefficient de Gini, centiles, vélocité et flux nets par catégorie d'opération.
+        """
+        first_day = (int(time.time()) - days * DAY_SECONDS) // DAY_SECONDS
+        with self._reading() as cursor:
+            cursor.row_factory = None
+            cursor.execute('SELECT balance FROM economy')
+            balances = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1)
+            cursor.execute('SELECT category, count, inflow, outflow FROM ledger_daily WHERE day >= ?', (first_day,))
             rows = cursor.fetchall()
-            operations = [Operation.from_row(row) for row in rows]
-            if func:
-                operations = filter(func, operations)
-            return operations
+        
+        flows = {}
+        volume = net = 0
+        if rows:
+            categories, counts, inflows, outflows = zip(*rows)
+            names, groups = np.unique(np.array(categories, dtype=object), return_inverse=True)
+            counts = np.bincount(groups, weights=np.array(counts, dtype=np.float64))
+            inflows = np.bincount(groups, weights=np.array(inflows, dtype=np.float64))
+            outflows = np.bincount(groups, weights=np.array(outflows, dtype=np.float64))
+            for i in np.argsort(outflows - inflows):  # Des plus créatrices de monnaie aux plus destructrices
+                flows[names[i]] = (int(counts[i]), int(inflows[i]), int(outflows[i]))
+            volume = int(outflows.sum())
+            net = int(inflows.sum() - outflows.sum())
+        return EconomyAnalytics(balances, days, flows, volume, net)
+    
+    # Rapprochement -----------------------------
+    
+    def reconcile_balances(self, repair: bool = False, checkpoint: bool = True) -> 'ReconciliationReport':
+        """Vérifie que le solde de chaque compte est égal à son dernier point de contrôle plus les opérations suivantes.
+        
+        Sans point de contrôle, le solde attendu est STARTING_BALANCE + SUM(delta). Seules les opérations postérieures
+        aux points de contrôle sont lues, en une requête groupée sur un instantané de lecture (connexion dédiée) :
+        les écritures ne sont pas bloquées. Les archives ne sont lues que pour les comptes dont le point de contrôle
+        est antérieur à l'archivage.
+        Les comptes cohérents reçoivent un nouveau point de contrôle (si `checkpoint`), par lots de
+        CHECKPOINT_BATCH_SIZE : le verrou d'écriture n'est tenu que le temps d'un lot, les commandes passent entre deux.
+        Un point de contrôle décrit l'instantané lu (solde à une position du journal) et reste donc valable même si
+        le compte a changé depuis. Les écarts sont corrigés si `repair` (le journal fait foi), après une nouvelle
+        vérification sous verrou.
+        """
+        with closing(self._connect(readonly=True)) as conn:
+            conn.execute('BEGIN')  # Instantané unique pour toutes les lectures
+            try:
+                checks = self._check_balances(conn)
+            finally:
+                conn.rollback()
+        
+        drifts = [check for check in checks if check.drift]
+        for check in drifts:
+            logger.warning(f"Écart de solde pour {check.user_id} : {check.balance} enregistré, {check.expected} attendu")
+        
+        if checkpoint:
+            consistent = [check for check in checks if not check.drift and check.position]
+            for i in range(0, len(consistent), CHECKPOINT_BATCH_SIZE):
+                with self._lock, self.transaction() as cursor:
+                    self._save_checkpoints(cursor, consistent[i:i + CHECKPOINT_BATCH_SIZE])
+        
+        repaired = []
+        if repair and drifts:
+            with self._lock, self.transaction() as cursor:
+                # Nouvelle vérification sur la connexion principale : inclut les écritures en cours
+                for check in self._check_balances(self.conn, [check.user_id for check in drifts]):
+                    if check.drift:
+                        cursor.execute('UPDATE economy SET balance = ? WHERE user_id = ?', (check.expected, check.user_id))
+                        self._set_balance(check.user_id, check.expected)
+                        check.balance = check.expected
+                        repaired.append(check)
+                self._save_checkpoints(cursor, repaired)
+        return ReconciliationReport(len(checks), sum(check.count for check in checks), drifts, repaired)
+    
+    def _check_balances(self, conn: sqlite3.Connection, user_ids: list[int] = None) -> list['BalanceCheck']:
+        sources = self._sources(order='DESC')
+        watermark = sources[0][1] if sources[0][0] is None else None
+        where, params = '', [watermark if watermark is not None else -1]
+        if user_ids is not None:
+            where = 'WHERE e.user_id IN (SELECT value FROM json_each(?))'
+            params.append(json.dumps(user_ids))
+        
+        with closing(conn.cursor()) as cursor:
+            cursor.execute(f'''
+                SELECT e.user_id, e.balance, COALESCE(c.balance, {STARTING_BALANCE}) AS base, c.op_timestamp, c.op_id,
+                       COUNT(o.id) AS count, TOTAL(o.delta) AS total,
+                       (SELECT json_array(timestamp, id) FROM operations
+                        WHERE user_id = e.user_id ORDER BY timestamp DESC, id DESC LIMIT 1) AS position
+                FROM economy e
+                LEFT JOIN ledger_checkpoints c ON c.user_id = e.user_id
+                LEFT JOIN operations o ON o.user_id = e.user_id AND o.timestamp >= ?1
+                     AND (c.op_timestamp IS NULL OR (o.timestamp, o.id) > (c.op_timestamp, c.op_id))
+                {where}
+                GROUP BY e.user_id
+            ''', params)
+            checks = {row['user_id']: BalanceCheck(row['user_id'], row['balance'], row['base'] + int(row['total']), 
+                                                   row['count'], json.loads(row['position']) if row['count'] else None)
+                      for row in cursor}
+            
+            # Comptes dont le point de contrôle (ou son absence) précède l'archivage : suite du journal dans les archives
+            if watermark is not None:
+                cursor.execute(f'''
+                    SELECT e.user_id, c.op_timestamp, c.op_id FROM economy e
+                    LEFT JOIN ledger_checkpoints c ON c.user_id = e.user_id
+                    WHERE (c.op_timestamp IS NULL OR c.op_timestamp < ?1) {where.replace('WHERE', 'AND')}
+                ''', params)
+                pending = json.dumps([tuple(row) for row in cursor])
+        
+        if watermark is not None and pending != '[]':
+            for source, start, end in sources[1:]:
+                with self._reading_source(source) as cursor:
+                    cursor.execute('''
+                        WITH cp(user_id, ts, id) AS (
+                            SELECT value ->> 0, value ->> 1, value ->> 2 FROM json_each(?)
+                        )
+                        SELECT cp.user_id, COUNT(*) AS count, SUM(o.delta) AS total,
+                               (SELECT json_array(timestamp, id) FROM operations
+                                WHERE user_id = cp.user_id AND timestamp >= ?2 AND timestamp < ?3
+                                ORDER BY timestamp DESC, id DESC LIMIT 1) AS position
+                        FROM cp JOIN operations o ON o.user_id = cp.user_id AND o.timestamp >= ?2 AND o.timestamp < ?3
+                             AND (cp.ts IS NULL OR (o.timestamp, o.id) > (cp.ts, cp.id))
+                        GROUP BY cp.user_id
+                    ''', (pending, start, end))
+                    for row in cursor:
+                        check = checks[row['user_id']]
+                        check.expected += row['total']
+                        check.count += row['count']
+                        check.position = check.position or json.loads(row['position'])
+        return list(checks.values())
+    
+    def _save_checkpoints(self, cursor: sqlite3.Cursor, checks: Iterable['BalanceCheck']):
+        now = int(time.time())
+        cursor.executemany('''
+            INSERT INTO ledger_checkpoints (user_id, balance, op_timestamp, op_id, created_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET
+                balance = excluded.balance, op_timestamp = excluded.op_timestamp,
+                op_id = excluded.op_id, created_at = excluded.created_at
+        ''', [(check.user_id, check.balance, *check.position, now) for check in checks if check.position])
+    
+    # Partitions -----------------------------
+    
+    @property
+    def archived_until(self) -> int | None:
+        """Horodatage avant lequel toutes les opérations sont dans les archives (None s'il n'y a pas d'archive)."""
+        partitions = self._partitions
+        return partitions[-1].end_ts if partitions else None
+    
+    def get_partitions(self) -> list['LedgerPartition']:
+        """Retourne les partitions d'archive, de la plus ancienne à la plus récente."""
+        return list(self._partitions)
+    
+    def _load_partitions(self) -> list['LedgerPartition']:
+        with self._lock, closing(self.conn.cursor()) as cursor:
+            cursor.execute('SELECT month, path, start_ts, end_ts, count FROM ledger_partitions ORDER BY start_ts')
+            return [LedgerPartition(*row) for row in cursor.fetchall()]
+    
+    def _sources(self, low: int | float = None, high: int | float = None, order: str = 'DESC') -> list[tuple['LedgerPartition | None', int | None, int | None]]:
+        """Retourne les sources à lire pour des horodatages dans [low, high), avec leurs bornes : (partition, début, fin).
+        
+        La base courante (partition None) ne contient que les opérations postérieures à `archived_until` :
+        une opération en cours de déplacement n'est donc jamais lue deux fois.
+        """
+        partitions = self._partitions  # Liste remplacée (jamais modifiée en place) après un archivage
+        watermark = partitions[-1].end_ts if partitions else None
+        sources = [(p, p.start_ts, p.end_ts) for p in partitions
+                   if (high is None or p.start_ts < high) and (low is None or p.end_ts > low)]
+        if watermark is None or high is None or high > watermark:
+            sources.append((None, watermark, None))
+        return sources[::-1] if order.upper() == 'DESC' else sources
+    
+    @staticmethod
+    def _source_query(select: str, clauses: list[str], params: list, start: int | None, end: int | None) -> tuple[str, list]:
+        clauses, params = list(clauses), list(params)
+        if start is not None:
+            clauses.append('timestamp >= ?')
+            params.append(start)
+        if end is not None:
+            clauses.append('timestamp < ?')
+            params.append(end)
+        if clauses:
+            select += ' WHERE ' + ' AND '.join(clauses)
+        return select, params
+    
+    @contextmanager
+    def _reading_source(self, partition: 'LedgerPartition | None') -> Iterator[sqlite3.Cursor]:
+        """Curseur de lecture sur la base courante (partition None) ou sur une archive, ouverte en lecture seule le temps de la requête."""
+        if partition is None:
+            with self._reading() as cursor:
+                yield cursor
+            return
+        uri = (self.archive_path / partition.path).resolve().as_uri() + '?mode=ro'
+        with closing(connections.connect(uri, 'economy', readonly=True, uri=True, check_same_thread=False)) as conn:
+            conn.row_factory = sqlite3.Row
+            conn.create_function('ledger_category', 1, operation_category, deterministic=True)
+            with closing(conn.cursor()) as cursor:
+                yield cursor
+    
+    def archive_operations(self, older_than_days: int = ARCHIVE_AFTER_DAYS, vacuum: bool = False) -> int:
+        """Déplace les opérations de plus de `older_than_days` jours dans les archives mensuelles. Retourne le nombre d'opérations déplacées.
+        
+        Chaque mois est traité séparément (le verrou d'écriture est relâché entre deux mois) : les opérations
+        sont d'abord copiées dans archives/economy_AAAA_MM.db (via ATTACH), puis supprimées de la base courante
+        avec la mise à jour de `ledger_partitions`. Une interruption entre ces deux étapes laisse au pire des
+        doublons dans l'archive, ignorés à la lecture et absorbés au passage suivant.
+        Les agrégats journaliers ne sont pas touchés. `vacuum` compacte ensuite la base courante.
+        """
+        # Limite alignée sur un jour : un jour d'agrégat n'est jamais coupé entre archive et base courante
+        cutoff = (int(time.time()) - older_than_days * DAY_SECONDS) // DAY_SECONDS * DAY_SECONDS
+        self.archive_path.mkdir(parents=True, exist_ok=True)
+        
+        moved = 0
+        while True:
+            with self._lock:
+                oldest = self.conn.execute('SELECT MIN(timestamp) FROM operations').fetchone()[0]
+                if oldest is None or oldest >= cutoff:
+                    break
+                month, start, end = _month_bounds(oldest)
+                moved += self._archive_range(month, start, min(end, cutoff))
+                self._partitions = self._load_partitions()
+        
+        if vacuum and moved:
+            with self._lock:
+                if self.conn.in_transaction:
+                    self.conn.commit()
+                self.conn.execute('VACUUM')
+        if moved:
+            logger.info(f"{moved} opérations antérieures au {datetime.fromtimestamp(cutoff, timezone.utc):%d/%m/%Y} archivées")
+        return moved
+    
+    def _archive_range(self, month: str, start: int, end: int) -> int:
+        path = f'economy_{month}.db'
+        if self.conn.in_transaction:
+            self.conn.commit()  # Lot différé en attente : ATTACH est impossible dans une transaction
+        self.conn.execute('ATTACH DATABASE ? AS archive', (str(self.archive_path / path),))
+        try:
+            # 1. Copie (idempotente) dans l'archive
+            with self.transaction() as cursor:
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS archive.operations (
+                        id TEXT PRIMARY KEY,
+                        user_id INTEGER,
+                        delta INTEGER,
+                        description TEXT,
+                        timestamp INTEGER NOT NULL
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS archive.idx_operations_user_timestamp_id
+                    ON operations (user_id, timestamp DESC, id DESC)
+                ''')
+                cursor.execute(f'''
+                    INSERT OR IGNORE INTO archive.operations ({OPERATION_COLUMNS})
+                    SELECT {OPERATION_COLUMNS} FROM main.operations WHERE timestamp >= ? AND timestamp < ?
+                ''', (start, end))
+            # 2. Suppression de la base courante et déclaration de la partition
+            with self.transaction() as cursor:
+                cursor.execute('DELETE FROM main.operations WHERE timestamp >= ? AND timestamp < ?', (start, end))
+                count = cursor.rowcount
+                cursor.execute('''
+                    INSERT INTO ledger_partitions (month, path, start_ts, end_ts, count) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (month) DO UPDATE SET end_ts = MAX(end_ts, excluded.end_ts), count = count + excluded.count
+                ''', (month, path, start, end, count))
+        finally:
+            self.conn.execute('DETACH DATABASE archive')
+        return count
+    
+    
+class AccountState:
+    """État partagé d'un compte (solde à jour), unique par utilisateur tant qu'il est en mémoire."""
+    __slots__ = ('user_id', 'balance', '__weakref__')
+    
+    def __init__(self, user_id: int, balance: int):
+        self.user_id = user_id
+        self.balance = balance
+        
+    def __repr__(self):
+        return f"AccountState(user_id={self.user_id}, balance={self.balance})"
     
     
 class BankAccount:
     """Représente un compte bancaire d'utilisateur."""
     def __init__(self, 
                  user: discord.User | discord.Member,
-                 db_manager: EconomyDBManager):
+                 db_manager: EconomyDBManager,
+                 state: 'AccountState' = None):
         self.user = user
         self.db_manager = db_manager
         
-        self._balance : int = self._load_balance()
+        # État partagé avec toutes les autres instances du même compte
+        self._state : AccountState = state or db_manager._get_state(user.id)
         
     def __repr__(self):
         return f"BankAccount(user={self.user}, balance={self.balance})"
     
-    def _load_balance(self) -> int:
-        with closing(self.db_manager.conn.cursor()) as cursor:
-            cursor.execute('SELECT balance FROM economy WHERE user_id = ?', (self.user.id,))
-            row = cursor.fetchone()
-            if row:
-                return row['balance']
-            else:
-                self._create_account()
-                return STARTING_BALANCE
-            
-    def _create_account(self):
-        with closing(self.db_manager.conn.cursor()) as cursor:
-            cursor.execute('INSERT INTO economy (user_id, balance) VALUES (?, ?)', 
-                           (self.user.id, STARTING_BALANCE))
-            self.db_manager.conn.commit()
-    
     # Solde --------------------------------
     
     @property
     def balance(self) -> int:
         """Retourne le solde du compte."""
-        return self._balance
+        return self._state.balance
     
-    def __update_balance(self, new_balance: int):
+    def __update_balance(self, new_balance: int, cursor: sqlite3.Cursor):
         new_balance = int(new_balance)  # Assure que le solde est un entier
-        
-        with closing(self.db_manager.conn.cursor()) as cursor:
-            cursor.execute('UPDATE economy SET balance = ? WHERE user_id = ?',
-                           (new_balance, self.user.id))
-            self.db_manager.conn.commit()
-        self._balance = new_balance
+        cursor.execute('UPDATE economy SET balance = ? WHERE user_id = ?',
+                       (new_balance, self.user.id))
             
     def __register_operation(self, new_balance: int, description: str) -> 'Operation':
         new_balance = int(new_balance)  # Assure que le solde est un entier
@@ -213,33 +1167,44 @@ class BankAccount:
             delta=delta,
             description=description
         )
-        operation.save(self.db_manager)
-        self.__update_balance(new_balance)
+        # Opération et nouveau solde sont écrits dans la même transaction
+        with self.db_manager.transaction() as cursor:
+            operation.save(self.db_manager, cursor=cursor)
+            self.__update_balance(new_balance, cursor)
+        self._state.balance = new_balance
+        self.db_manager.leaderboards.update(self.user.id, new_balance)
         return operation
         
     def assign(self, value: int, description: str = "Ajustement de solde") -> 'Operation':
         """Affecte un montant au solde du compte."""
         if value < 0:
             raise InvalidAmountError("Le montant doit être positif pour l'affectation.")
-        return self.__register_operation(value, description)
+        with self.db_manager._lock:
+            return self.__register_operation(value, description)
     
     def deposit(self, value: int, description: str = "Entrée de fonds") -> 'Operation':
         """Dépose un montant sur le compte."""
         if value <= 0:
             raise InvalidAmountError("Le montant doit être supérieur à zéro pour le dépôt.")
         
-        new_balance = self.balance + value
-        return self.__register_operation(new_balance, description)
+        with self.db_manager._lock:  # Lecture et écriture du solde partagé sans entrelacement
+            new_balance = self.balance + value
+            return self.__register_operation(new_balance, description)
     
     def withdraw(self, value: int, description: str = "Retrait de fonds") -> 'Operation':
         """Retire un montant du compte."""
         value = abs(value)  # Assure que le montant est positif
         
-        if self.balance < value:
-            raise InsufficientFundsError("Fonds insuffisants pour le retrait.")
-        
-        new_balance = self.balance - value
-        return self.__register_operation(new_balance, description)
+        with self.db_manager._lock:
+            if self.balance < value:
+                raise InsufficientFundsError("Fonds insuffisants pour le retrait.")
+            
+            new_balance = self.balance - value
+            return self.__register_operation(new_balance, description)
+    
+    def transfer_to(self, recipient: 'BankAccount', value: int, descriptions: tuple[str, str]) -> tuple['Operation', 'Operation']:
+        """Transfère un montant vers un autre compte (cf. `EconomyDBManager.transfer`)."""
+        return self.db_manager.transfer(self.user.id, recipient.user.id, value, descriptions)
     
     def reverse(self, operation: Union['Operation', str]) -> 'Operation':
         """Effectue une opération inverse d'une opération existante."""
@@ -250,87 +1215,83 @@ class BankAccount:
             raise TypeError("L'opération doit être une instance de Operation ou un ID d'opération.")
         if operation.user_id != self.user.id:
             raise AccountError("L'opération ne correspond pas à ce compte.")
-        new_balance = self.balance - operation.delta
-        if new_balance < 0:
-            raise InsufficientFundsError("Le solde ne peut pas devenir négatif après l'annulation.")
-        return self.__register_operation(new_balance, f"Annulation de l'opération {operation.id}")
-    
-    def rollback(self, target_operation: Union['Operation', str]) -> Iterable['Operation']:
-        """Annule toutes les opérations jusqu'à une opération cible (incluse)."""
-        if isinstance(target_operation, str):
-            operation_id = target_operation
-            target_operation = self.db_manager.get_operation_by_id(operation_id)
-        elif not isinstance(target_operation, Operation):
+        with self.db_manager._lock:
+            new_balance = self.balance - operation.delta
+            if new_balance < 0:
+                raise InsufficientFundsError("Le solde ne peut pas devenir négatif après l'annulation.")
+            return self.__register_operation(new_balance, f"Annulation de l'opération {operation.id}")
+    
+    def rollback(self, target_operation: Union['Operation', str], dry_run: bool = False) -> 'RollbackResult':
+        """Annule toutes les opérations jusqu'à une opération cible (incluse), cf. `EconomyDBManager.rollback`."""
+        if isinstance(target_operation, Operation):
+            if target_operation.user_id != self.user.id:
+                raise AccountError("L'opération ne correspond pas à ce compte.")
+            target_operation = target_operation.id
+        elif not isinstance(target_operation, str):
             raise TypeError("L'opération doit être une instance de Operation ou un ID d'opération.")
-        if target_operation.user_id != self.user.id:
-            raise AccountError("L'opération ne correspond pas à ce compte.")
-        
-        operations = self.db_manager.get_operations(
-            func=lambda op: op.user_id == self.user.id
-        )
-        
-        to_rollback = []
-        for op in operations:
-            to_rollback.append(op)
-            if op.id == target_operation.id:
-                break
-        else:
-            raise OperationError("L'opération cible n'a pas été trouvée dans l'historique.")
-        
-        rolled_back_ops = []
-        for op in to_rollback:
-            rolled_back_op = self.reverse(op)
-            if rolled_back_op:
-                rolled_back_ops.append(rolled_back_op)
-        
-        return rolled_back_ops
+        return self.db_manager.rollback(self.user.id, target_operation, dry_run=dry_run)
     
     # Transactions -----------------------------
     
     def get_recent_operations(self, limit: int = 5) -> Iterable['Operation']:
         """Retourne les opérations récentes du compte."""
-        ops = self.db_manager.get_operations(
-            func=lambda op: op.user_id == self.user.id
-        )
-        return list(ops)[:limit]
+        return self.db_manager.get_operations(user_id=self.user.id, limit=limit)
+    
+    def iter_operations(self, page_size: int = 5, limit: int = None) -> 'OperationCursor':
+        """Retourne un curseur paginé sur l'historique du compte (sans limite si `limit` est None)."""
+        return OperationCursor(self.db_manager, self.user.id, page_size=page_size, limit=limit)
     
     # Statistiques -----------------------------
     
     def get_variation_since(self, since: int | float) -> int:
         """Retourne la variation du solde depuis un timestamp donné."""
-        ops = self.db_manager.get_operations(
-            func=lambda op: op.user_id == self.user.id and op.timestamp >= since
-        )
-        return sum(op.delta for op in ops) or 0
+        return self.get_ledger_stats(since=since).total
+    
+    def get_ledger_stats(self, since: int | float = None, until: int | float = None) -> 'LedgerStats':
+        """Retourne les statistiques des opérations du compte sur une période (cf. `EconomyDBManager.get_ledger_stats`)."""
+        return self.db_manager.get_ledger_stat(self.user.id, since, until)
     
-    def get_rank_in_guild(self, guild: discord.Guild, ignore_bots: bool = True) -> int:
-        """Retourne le rang du compte dans la guilde."""
-        members = guild.members
+    def get_rank_in_guild(self, guild: discord.Guild, ignore_bots: bool = True) -> int | None:
+        """Retourne le rang du compte dans la guilde (None s'il n'en fait pas partie)."""
         if ignore_bots:
-            members = [m for m in members if not m.bot]
-        accounts = self.db_manager.get_accounts(members)
-        sorted_accounts = sorted(accounts, key=lambda acc: acc.balance, reverse=True)
-        for rank, account in enumerate(sorted_accounts, start=1):
-            if account.user.id == self.user.id:
-                return rank
+            leaderboard = self.db_manager.get_guild_leaderboard(guild.id, MemberIndex().get(guild), limit=0, focus=self.user.id)
+        else:
+            leaderboard = self.db_manager.get_leaderboard([m.id for m in guild.members], limit=0, focus=self.user.id)
+        return leaderboard.focus.rank if leaderboard.focus else None
     
     
-class Operation:
-    """Représente une opération économique sur un compte."""
-    def __init__(self, 
-                 user_id: int,
-                 delta: int,
-                 description: str,
-                 timestamp: int = None):
-        self.user_id = user_id
-        self.delta = delta
-        self.description = description
-        self.timestamp = timestamp or int(time.time())
-        
-        self.id = generate_id(user_id, delta, description, self.timestamp)
+class Operation(tuple):
+    """Représente une opération économique sur un compte.
+    
+    Enregistrement immuable adossé à un tuple (id, user_id, delta, description, timestamp), dans l'ordre de
+    `OPERATION_COLUMNS` : les lignes lues en base sont converties en opérations sans code Python par ligne.
+    """
+    __slots__ = ()
+    
+    def __new__(cls, 
+                user_id: int,
+                delta: int,
+                description: str,
+                timestamp: int = None,
+                id: str = None):
+        return tuple.__new__(cls, (id or generate_id(), user_id, delta, description, timestamp or int(time.time())))
+    
+    def __getnewargs__(self):
+        return (self.user_id, self.delta, self.description, self.timestamp, self.id)
+    
+    id = property(itemgetter(0), doc="Identifiant unique (croissant) de l'opération.")
+    user_id = property(itemgetter(1), doc="Utilisateur concerné.")
+    delta = property(itemgetter(2), doc="Variation du solde.")
+    description = property(itemgetter(3), doc="Description de l'opération.")
+    timestamp = property(itemgetter(4), doc="Horodatage (secondes).")
         
     def __repr__(self):
-        return f"Operation(user_id={self.user_id}, delta={self.delta}, description='{self.description}', timestamp={self.timestamp})"
+        return f"Operation(id={self.id}, user_id={self.user_id}, delta={self.delta}, description='{self.description}', timestamp={self.timestamp})"
+    
+    @property
+    def key(self) -> tuple[int, str]:
+        """Retourne la clé de tri (timestamp, id) utilisée pour la pagination."""
+        return (self.timestamp, self.id)
     
     def to_dict(self) -> dict:
         """Convertit l'opération en dictionnaire pour la sérialisation."""
@@ -344,17 +1305,669 @@ class Operation:
         
     @classmethod
     def from_row(cls, row: sqlite3.Row) -> 'Operation':
-        """Crée une instance d'Operation à partir d'une ligne de la base de données."""
-        return cls(
-            user_id=row['user_id'],
-            delta=row['delta'],
-            description=row['description'],
-            timestamp=row['timestamp']  # Directement un int depuis la DB
-        )
+        """Crée une instance d'Operation à partir d'une ligne de la base de données (identifiant stocké conservé)."""
+        return tuple.__new__(cls, (row['id'], row['user_id'], row['delta'], row['description'], row['timestamp']))
+    
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> list['Operation']:
+        """Convertit des lignes brutes (tuples dans l'ordre de `OPERATION_COLUMNS`) en opérations, pour les lectures en masse."""
+        return list(map(partial(tuple.__new__, cls), rows))
+
+    def save(self, db_manager: EconomyDBManager, cursor: sqlite3.Cursor = None):
+        """Enregistre l'opération dans la base de données (dans la transaction de `cursor` si fourni)."""
+        if cursor is None:
+            with db_manager.transaction() as cursor:
+                return self.save(db_manager, cursor)
+        cursor.execute('INSERT INTO operations (id, user_id, delta, description, timestamp) VALUES (?, ?, ?, ?, ?)',
+                       (self.id, self.user_id, self.delta, self.description, self.timestamp))
+        _update_rollups(cursor, (self,))
+        
+    @staticmethod
+    def save_many(operations: Iterable['Operation'], cursor: sqlite3.Cursor):
+        """Enregistre plusieurs opérations en une seule instruction, dans la transaction de `cursor`."""
+        operations = list(operations)
+        cursor.executemany('INSERT INTO operations (id, user_id, delta, description, timestamp) VALUES (?, ?, ?, ?, ?)',
+                           operations)  # Les champs sont déjà dans l'ordre des colonnes
+        _update_rollups(cursor, operations)
+
+
+def _update_rollups(cursor: sqlite3.Cursor, operations: Iterable[Operation]):
+    """Reporte des opérations dans les agrégats journaliers, dans la transaction de `cursor`."""
+    _merge_rollups(cursor, [(op.user_id, op.timestamp // DAY_SECONDS, operation_category(op.description), 1,
+                             op.delta, max(op.delta, 0), max(-op.delta, 0), op.delta, op.delta) for op in operations])
 
-    def save(self, db_manager: EconomyDBManager):
-        """Enregistre l'opération dans la base de données."""
-        with closing(db_manager.conn.cursor()) as cursor:
-            cursor.execute('INSERT INTO operations (id, user_id, delta, description, timestamp) VALUES (?, ?, ?, ?, ?)',
-                           (self.id, self.user_id, self.delta, self.description, self.timestamp))
-            db_manager.conn.commit()
+
+def _merge_rollups(cursor: sqlite3.Cursor, rows: Iterable[tuple]):
+    """Ajoute des lignes (user_id, day, category, count, total, inflow, outflow, min_delta, max_delta) aux agrégats existants."""
+    cursor.executemany('''
+        INSERT INTO ledger_daily (user_id, day, category, count, total, inflow, outflow, min_delta, max_delta)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, day, category) DO UPDATE SET
+            count = count + excluded.count,
+            total = total + excluded.total,
+            inflow = inflow + excluded.inflow,
+            outflow = outflow + excluded.outflow,
+            min_delta = MIN(min_delta, excluded.min_delta),
+            max_delta = MAX(max_delta, excluded.max_delta)
+    ''', rows)
+
+
+def _month_bounds(timestamp: int | float) -> tuple[str, int, int]:
+    """Retourne le mois (AAAA_MM, UTC) contenant `timestamp` et ses bornes [début, fin)."""
+    date = datetime.fromtimestamp(timestamp, timezone.utc)
+    start = datetime(date.year, date.month, 1, tzinfo=timezone.utc)
+    end = datetime(date.year + date.month // 12, date.month % 12 + 1, 1, tzinfo=timezone.utc)
+    return f'{date.year:04d}_{date.month:02d}', int(start.timestamp()), int(end.timestamp())
+
+
+class CommitPipeline:
+    """Fil d'écriture dédié, avec validations groupées (group commit).
+    
+    Les mutations soumises par les coroutines sont exécutées dans l'ordre par un fil unique, chacune dans
+    sa propre transaction, mais la validation sur disque est partagée : elle a lieu au plus tard `window`
+    secondes après la première mutation du lot, ou dès que `max_batch` mutations ont été exécutées.
+    Les appelants ne reprennent la main qu'une fois leur lot validé.
+    
+    Exemple :
+        op = await eco.pipeline.submit(account.deposit, 100, "Gain")
+    """
+    def __init__(self, db_manager: EconomyDBManager, window: float = 0.005, max_batch: int = 256):
+        self.db_manager = db_manager
+        self.window = window
+        self.max_batch = max_batch
+        
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        
+    def __repr__(self):
+        return f"CommitPipeline(window={self.window}, max_batch={self.max_batch}, pending={self._queue.qsize()})"
+    
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='economy-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+    
+    async def submit(self, func: Callable, *args, **kwargs):
+        """Exécute une mutation (ex. `account.deposit`) sur le fil d'écriture et attend la validation de son lot."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._ensure_started()
+        self._queue.put((func, args, kwargs, loop, future))
+        return await future
+    
+    def close(self, timeout: float = 5.0):
+        """Vide la file d'attente, valide le dernier lot et arrête le fil d'écriture."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+    
+    def _run(self):
+        stopping = False
+        while not stopping:
+            job = self._queue.get()
+            if job is None:
+                break
+            
+            batch = []
+            deadline = time.monotonic() + self.window
+            while True:
+                batch.append(self._execute(job))
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    job = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+            self._commit(batch)
+    
+    def _execute(self, job: tuple) -> tuple:
+        func, args, kwargs, loop, future = job
+        db = self.db_manager
+        with db._lock:
+            db._deferred = True
+            try:
+                return (loop, future, func(*args, **kwargs), None)
+            except Exception as e:
+                return (loop, future, None, e)
+            finally:
+                db._deferred = False
+    
+    def _commit(self, batch: list[tuple]):
+        db = self.db_manager
+        error = None
+        with db._lock:
+            try:
+                db.conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Échec de la validation d'un lot de {len(batch)} opérations : {e}")
+                db.conn.rollback()
+                db._refresh_states()  # Les soldes en mémoire incluaient les écritures annulées
+                error = OperationError(f"Échec de la validation du lot : {e}")
+        
+        for loop, future, result, exc in batch:
+            loop.call_soon_threadsafe(_resolve_future, future, result, exc or error)
+    
+    
+def _resolve_future(future: asyncio.Future, result, exc: BaseException | None):
+    if future.done():
+        return
+    if exc is not None:
+        future.set_exception(exc)
+    else:
+        future.set_result(result)
+    
+    
+class AsyncEconomy:
+    """Façade asynchrone de l'économie, à utiliser depuis les coroutines (cogs).
+    
+    Les lectures sont exécutées dans un petit pool de fils disposant chacun de sa connexion de lecture,
+    les écritures sur le fil d'écriture unique du `CommitPipeline` : la boucle d'événements n'attend
+    jamais SQLite.
+    """
+    _instance = None
+    
+    def __new__(cls, db_manager: EconomyDBManager = None, readers: int = 4):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+    
+    def __init__(self, db_manager: EconomyDBManager = None, readers: int = 4):
+        if self._initialized:
+            return
+        
+        self.db_manager = db_manager or EconomyDBManager()
+        MemberIndex().add_follower(self.db_manager.leaderboards)  # Vues de classement tenues à jour avec l'index des membres
+        self._executor = ThreadPoolExecutor(max_workers=readers,
+                                            thread_name_prefix='economy-reader',
+                                            initializer=self.db_manager._open_reader)
+        self._initialized = True
+        
+    def __repr__(self):
+        return f"AsyncEconomy(db_manager={self.db_manager!r})"
+    
+    async def read(self, func: Callable, *args, **kwargs):
+        """Exécute une fonction de lecture dans le pool de lecteurs."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+    
+    async def write(self, func: Callable, *args, **kwargs):
+        """Exécute une mutation sur le fil d'écriture (validation groupée)."""
+        return await self.db_manager.pipeline.submit(func, *args, **kwargs)
+    
+    def close(self):
+        """Arrête le pool de lecteurs et le fil d'écriture."""
+        self._executor.shutdown(wait=True)
+        self.db_manager.pipeline.close()
+    
+    # Comptes -----------------------------
+    
+    async def get_account(self, user: discord.User | discord.Member) -> 'BankAccount':
+        """Retourne le compte bancaire d'un utilisateur."""
+        # Compte déjà en mémoire : ni requête, ni passage par le pool (lecture du dict sans verrou)
+        state = self.db_manager._states.get(user.id)
+        if state is not None:
+            return BankAccount(user, self.db_manager, state)
+        return await self.read(self.db_manager.get_account, user)
+    
+    async def get_recent_operations(self, account: 'BankAccount', limit: int = 5) -> list['Operation']:
+        """Retourne les opérations récentes d'un compte."""
+        return await self.read(account.get_recent_operations, limit)
+    
+    async def get_variation_since(self, account: 'BankAccount', since: int | float) -> int:
+        """Retourne la variation du solde d'un compte depuis un timestamp donné."""
+        return await self.read(account.get_variation_since, since)
+    
+    async def get_ledger_stats(self, user_ids: Iterable[int], since: int | float = None, until: int | float = None) -> dict[int, 'LedgerStats']:
+        """Retourne les statistiques des opérations de plusieurs utilisateurs sur une période."""
+        return await self.read(self.db_manager.get_ledger_stats, list(user_ids), since, until)
+    
+    async def get_ledger_breakdown(self, user_id: int, since: int | float = None, until: int | float = None) -> dict[str, 'LedgerStats']:
+        """Retourne les statistiques d'un utilisateur sur une période, par catégorie d'opération."""
+        return await self.read(self.db_manager.get_ledger_breakdown, user_id, since, until)
+    
+    async def rebuild_ledger_rollups(self) -> int:
+        """Recalcule les agrégats journaliers sur le fil d'écriture."""
+        return await self.write(self.db_manager.rebuild_ledger_rollups)
+    
+    async def archive_operations(self, older_than_days: int = ARCHIVE_AFTER_DAYS, vacuum: bool = False) -> int:
+        """Déplace les anciennes opérations dans les archives mensuelles.
+        
+        Exécuté sur un fil dédié et non sur le fil d'écriture : l'archivage relâche le verrou entre deux mois,
+        les écritures du pipeline continuent donc pendant l'opération.
+        """
+        return await asyncio.to_thread(self.db_manager.archive_operations, older_than_days, vacuum)
+    
+    async def get_analytics(self, days: int = 30) -> 'EconomyAnalytics':
+        """Calcule les indicateurs de la masse monétaire dans le pool de lecteurs."""
+        return await self.read(self.db_manager.get_analytics, days)
+    
+    async def reconcile_balances(self, repair: bool = False) -> 'ReconciliationReport':
+        """Rapproche les soldes du journal des opérations sur un fil dédié (lecture sur un instantané, sans bloquer les écritures)."""
+        return await asyncio.to_thread(self.db_manager.reconcile_balances, repair)
+    
+    async def get_rank_in_guild(self, account: 'BankAccount', guild: discord.Guild, ignore_bots: bool = True) -> int | None:
+        """Retourne le rang d'un compte dans la guilde."""
+        if ignore_bots:
+            leaderboard = await self.get_guild_leaderboard(guild, limit=0, focus=account.user.id)
+        else:
+            # Le cache des membres de discord.py n'est parcouru que depuis la boucle d'événements
+            member_ids = [m.id for m in guild.members]
+            leaderboard = await self.get_leaderboard(member_ids, limit=0, focus=account.user.id)
+        return leaderboard.focus.rank if leaderboard.focus else None
+    
+    async def get_guild_leaderboard(self, guild: discord.Guild, limit: int = 20, focus: int = None) -> 'Leaderboard':
+        """Retourne le classement des membres (hors bots) d'une guilde depuis l'index en mémoire.
+        
+        Une fois la vue de la guilde créée, la lecture se fait directement sur la boucle d'événements (O(log n)).
+        """
+        result = self.leaderboards.leaderboard(guild.id, limit, focus)
+        if result is not None:
+            return Leaderboard.from_index(*result)
+        
+        # Premier appel : chargement de l'index et création de la vue dans le pool de lecteurs, depuis une copie
+        members = MemberIndex()
+        member_ids = members.get(guild).tolist()  # Copie : lue hors de la boucle d'événements
+        version = members.version(guild.id)
+        leaderboard = await self.read(self.db_manager.get_guild_leaderboard, guild.id, member_ids, limit, focus)
+        if members.version(guild.id) != version and guild.id in members:
+            # Arrivées ou départs pendant la création : la copie est périmée, la vue est recréée depuis l'index
+            self.leaderboards.sync_guild(guild.id, members.get(guild))
+            leaderboard = self.db_manager.get_guild_leaderboard(guild.id, limit=limit, focus=focus)
+        return leaderboard
+    
+    @property
+    def leaderboards(self) -> LeaderboardIndex:
+        """Classements en mémoire, dont les vues de guildes suivent `MemberIndex`."""
+        return self.db_manager.leaderboards
+    
+    async def get_leaderboard(self, user_ids: Iterable[int], limit: int = 20, focus: int = None) -> 'Leaderboard':
+        """Retourne le classement par solde d'un ensemble d'utilisateurs."""
+        return await self.read(self.db_manager.get_leaderboard, list(user_ids), limit, focus)
+    
+    # Opérations -----------------------------
+    
+    async def get_operation_by_id(self, operation_id: str) -> 'Operation':
+        """Retourne une opération par son ID."""
+        return await self.read(self.db_manager.get_operation_by_id, operation_id)
+    
+    async def get_operations(self, func: Callable[['Operation'], bool] = None, **criteria) -> list['Operation']:
+        """Retourne les opérations correspondant aux critères (cf. `EconomyDBManager.get_operations`)."""
+        return await self.read(self.db_manager.get_operations, func, **criteria)
+    
+    async def get_page(self, cursor: 'OperationCursor', index: int) -> list['Operation']:
+        """Charge une page d'historique dans le pool de lecteurs (sans compter l'historique)."""
+        return await self.read(cursor.get_page, index)
+    
+    async def get_page_count(self, cursor: 'OperationCursor') -> int:
+        """Retourne le nombre exact de pages d'historique (compte tout l'historique : réservé au saut à la dernière page)."""
+        return await self.read(lambda: cursor.page_count)
+    
+    # Mutations -----------------------------
+    
+    async def deposit(self, account: 'BankAccount', value: int, description: str = "Entrée de fonds") -> 'Operation':
+        """Dépose un montant sur un compte."""
+        return await self.write(account.deposit, value, description)
+    
+    async def withdraw(self, account: 'BankAccount', value: int, description: str = "Retrait de fonds") -> 'Operation':
+        """Retire un montant d'un compte."""
+        return await self.write(account.withdraw, value, description)
+    
+    async def assign(self, account: 'BankAccount', value: int, description: str = "Ajustement de solde") -> 'Operation':
+        """Affecte un montant au solde d'un compte."""
+        return await self.write(account.assign, value, description)
+    
+    async def transfer(self, sender: 'BankAccount', recipient: 'BankAccount', value: int, descriptions: tuple[str, str]) -> tuple['Operation', 'Operation']:
+        """Transfère un montant d'un compte à un autre de manière atomique."""
+        return await self.write(sender.transfer_to, recipient, value, descriptions)
+    
+    async def reverse(self, account: 'BankAccount', operation: Union['Operation', str]) -> 'Operation':
+        """Annule une opération existante d'un compte."""
+        return await self.write(account.reverse, operation)
+    
+    async def deposit_many(self, payouts: Iterable[tuple[int, int, str]]) -> 'PayoutReport':
+        """Crédite plusieurs comptes en une seule transaction (cf. `EconomyDBManager.deposit_many`)."""
+        return await self.write(self.db_manager.deposit_many, list(payouts))
+    
+    async def withdraw_many(self, withdrawals: Iterable[tuple[int, int, str]]) -> 'PayoutReport':
+        """Débite plusieurs comptes en une seule transaction (cf. `EconomyDBManager.withdraw_many`)."""
+        return await self.write(self.db_manager.withdraw_many, list(withdrawals))
+    
+    async def rollback(self, account: 'BankAccount', target_operation: Union['Operation', str], dry_run: bool = False) -> 'RollbackResult':
+        """Annule toutes les opérations d'un compte jusqu'à une opération cible (incluse), ou en donne l'aperçu."""
+        if dry_run:
+            return await self.read(account.rollback, target_operation, dry_run=True)
+        return await self.write(account.rollback, target_operation)
+    
+    
+class LeaderboardEntry:
+    """Représente une ligne de classement."""
+    def __init__(self, user_id: int, balance: int, rank: int):
+        self.user_id = user_id
+        self.balance = balance
+        self.rank = rank
+        
+    def __repr__(self):
+        return f"LeaderboardEntry(user_id={self.user_id}, balance={self.balance}, rank={self.rank})"
+    
+    
+class Leaderboard:
+    """Résultat d'un classement : premières places, ligne ciblée et nombre total de comptes classés."""
+    def __init__(self, entries: list[LeaderboardEntry], focus: LeaderboardEntry | None, total: int):
+        self.entries = entries
+        self.focus = focus
+        self.total = total
+        
+    def __repr__(self):
+        return f"Leaderboard(entries={len(self.entries)}, focus={self.focus}, total={self.total})"
+    
+    @classmethod
+    def from_index(cls, entries: list[tuple[int, int, int]], focus: tuple[int, int, int] | None, total: int) -> 'Leaderboard':
+        """Crée le résultat à partir des tuples (user_id, solde, rang) de `LeaderboardIndex.leaderboard`."""
+        return cls([LeaderboardEntry(*entry) for entry in entries], LeaderboardEntry(*focus) if focus else None, total)
+    
+    
+class RollbackResult:
+    """Résultat (ou aperçu, si `dry_run`) d'une annulation en bloc.
+    
+    `reverted` contient les opérations annulées (des plus récentes aux plus anciennes), `compensations`
+    les opérations inverses écrites (vide en aperçu).
+    """
+    def __init__(self, 
+                 user_id: int, 
+                 reverted: list[Operation], 
+                 compensations: list[Operation], 
+                 old_balance: int, 
+                 dry_run: bool = False):
+        self.user_id = user_id
+        self.reverted = reverted
+        self.compensations = compensations
+        self.old_balance = old_balance
+        self.dry_run = dry_run
+        
+    def __repr__(self):
+        return f"RollbackResult(user_id={self.user_id}, reverted={len(self.reverted)}, net_delta={self.net_delta}, dry_run={self.dry_run})"
+    
+    def __len__(self):
+        return len(self.reverted)
+    
+    @property
+    def net_delta(self) -> int:
+        """Variation nette du solde causée par l'annulation."""
+        return -sum(op.delta for op in self.reverted)
+    
+    @property
+    def new_balance(self) -> int:
+        """Solde du compte après l'annulation."""
+        return self.old_balance + self.net_delta
+    
+    
+class EconomyAnalytics:
+    """Indicateurs de la masse monétaire (cf. `EconomyDBManager.get_analytics`)."""
+    PERCENTILES = (10, 25, 50, 75, 90, 99)
+    
+    def __init__(self, balances: np.ndarray, days: int, flows: dict[str, tuple[int, int, int]], volume: int, net: int):
+        self.accounts = int(balances.size)
+        self.supply = int(balances.sum())
+        self.mean = float(balances.mean()) if balances.size else 0.0
+        self.percentiles = dict(zip(self.PERCENTILES, np.percentile(balances, self.PERCENTILES).tolist())) if balances.size else {}
+        self.gini = self._gini(balances)
+        self.days = days
+        self.flows = flows  # Catégorie -> (nombre d'opérations, entrées, sorties)
+        self.volume = volume  # Total des sorties de la période (dépenses, mises, transferts émis…)
+        self.net = net  # Création (ou destruction) nette de monnaie sur la période
+        
+    def __repr__(self):
+        return f"EconomyAnalytics(accounts={self.accounts}, supply={self.supply}, gini={self.gini:.3f}, velocity={self.velocity:.3f})"
+    
+    @staticmethod
+    def _gini(balances: np.ndarray) -> float:
+        total = balances.sum()
+        if not balances.size or total <= 0:
+            return 0.0
+        values = np.sort(balances).astype(np.float64)
+        ranks = np.arange(1, values.size + 1)
+        return float(2 * (ranks * values).sum() / (values.size * total) - (values.size + 1) / values.size)
+    
+    @property
+    def velocity(self) -> float:
+        """Vélocité de la monnaie sur la période : volume des sorties rapporté à la masse monétaire moyenne."""
+        # Moyenne des masses de début (masse actuelle - création nette) et de fin de période (masse actuelle)
+        average_supply = self.supply - self.net / 2
+        return self.volume / average_supply if average_supply > 0 else 0.0
+    
+    
+class PayoutLine:
+    """Ligne d'un paiement groupé : opération écrite, ou erreur de validation."""
+    def __init__(self, user_id: int, amount: int, description: str):
+        self.user_id = user_id
+        self.amount = amount
+        self.description = description
+        self.operation: Operation | None = None
+        self.error: EconomyError | None = None
+        
+    def __repr__(self):
+        return f"PayoutLine(user_id={self.user_id}, amount={self.amount}, ok={self.ok})"
+    
+    @property
+    def ok(self) -> bool:
+        return self.operation is not None
+    
+    
+class PayoutReport:
+    """Rapport d'un paiement groupé, dans l'ordre des lignes fournies."""
+    def __init__(self, lines: list[PayoutLine]):
+        self.lines = lines
+        
+    def __repr__(self):
+        return f"PayoutReport(applied={len(self.operations)}, failed={len(self.failed)}, total={self.total})"
+    
+    def __len__(self):
+        return len(self.lines)
+    
+    def __iter__(self):
+        return iter(self.lines)
+    
+    @property
+    def operations(self) -> list[Operation]:
+        """Opérations écrites."""
+        return [line.operation for line in self.lines if line.operation]
+    
+    @property
+    def failed(self) -> list[PayoutLine]:
+        """Lignes refusées, avec leur erreur."""
+        return [line for line in self.lines if line.error]
+    
+    @property
+    def total(self) -> int:
+        """Somme des montants effectivement appliqués."""
+        return sum(abs(op.delta) for op in self.operations)
+    
+    
+class BalanceCheck:
+    """Rapprochement d'un compte : solde enregistré et solde attendu d'après le journal."""
+    def __init__(self, user_id: int, balance: int, expected: int, count: int, position: list | None):
+        self.user_id = user_id
+        self.balance = balance
+        self.expected = expected
+        self.count = count  # Opérations vérifiées depuis le dernier point de contrôle
+        self.position = position  # (timestamp, id) de la dernière opération vérifiée
+        
+    def __repr__(self):
+        return f"BalanceCheck(user_id={self.user_id}, balance={self.balance}, expected={self.expected})"
+    
+    @property
+    def drift(self) -> int:
+        """Écart entre le solde enregistré et le solde attendu."""
+        return self.balance - self.expected
+    
+    
+class ReconciliationReport:
+    """Résultat d'un rapprochement des soldes avec le journal des opérations."""
+    def __init__(self, checked: int, operations: int, drifts: list[BalanceCheck], repaired: list[BalanceCheck]):
+        self.checked = checked
+        self.operations = operations
+        self.drifts = drifts
+        self.repaired = repaired
+        
+    def __repr__(self):
+        return f"ReconciliationReport(checked={self.checked}, operations={self.operations}, drifts={len(self.drifts)}, repaired={len(self.repaired)})"
+    
+    
+class LedgerPartition:
+    """Partition d'archive : opérations de [start_ts, end_ts) déplacées dans une base mensuelle."""
+    def __init__(self, month: str, path: str, start_ts: int, end_ts: int, count: int):
+        self.month = month
+        self.path = path
+        self.start_ts = start_ts
+        self.end_ts = end_ts
+        self.count = count
+        
+    def __repr__(self):
+        return f"LedgerPartition(month={self.month}, start_ts={self.start_ts}, end_ts={self.end_ts}, count={self.count})"
+    
+    
+class LedgerStats:
+    """Statistiques des opérations d'un compte sur une période.
+    
+    `total` est la variation nette du solde ; `inflow` et `outflow` sont les sommes (positives) des entrées et des sorties.
+    """
+    def __init__(self, 
+                 user_id: int, 
+                 count: int = 0, 
+                 total: int = 0, 
+                 inflow: int = 0, 
+                 outflow: int = 0, 
+                 min_delta: int | None = None, 
+                 max_delta: int | None = None,
+                 category: str | None = None):
+        self.user_id = user_id
+        self.count = count
+        self.total = total
+        self.inflow = inflow
+        self.outflow = outflow
+        self.min_delta = min_delta
+        self.max_delta = max_delta
+        self.category = category
+        
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> 'LedgerStats':
+        """Crée les statistiques à partir d'une ligne d'agrégat."""
+        return cls(row['user_id'], row['count'], row['total'], int(row['inflow']), int(row['outflow']),
+                   row['min_delta'], row['max_delta'], row['category'] or None)
+    
+    def merge(self, other: 'LedgerStats') -> 'LedgerStats':
+        """Retourne les statistiques cumulées de deux périodes disjointes."""
+        return LedgerStats(self.user_id, self.count + other.count, self.total + other.total,
+                           self.inflow + other.inflow, self.outflow + other.outflow,
+                           min(v for v in (self.min_delta, other.min_delta) if v is not None) if self.count or other.count else None,
+                           max(v for v in (self.max_delta, other.max_delta) if v is not None) if self.count or other.count else None,
+                           self.category)
+        
+    def __repr__(self):
+        return f"LedgerStats(user_id={self.user_id}, count={self.count}, total={self.total}, inflow={self.inflow}, outflow={self.outflow})"
+    
+    
+class OperationCursor:
+    """Curseur paginé sur l'historique d'un compte.
+    
+    Les pages sont chargées à la demande par jeu de clés sur (timestamp, id), du plus récent au plus
+    ancien, et conservées en cache : afficher une page ne coûte qu'une petite requête indexée. Chaque page
+    est lue avec une opération de plus, qui indique s'il existe une page suivante (`has_next`) ; le nombre
+    total (`count`, `page_count`) n'est calculé que s'il est demandé (ex. saut à la dernière page).
+    """
+    def __init__(self,
+                 db_manager: EconomyDBManager,
+                 user_id: int,
+                 page_size: int = 5,
+                 limit: int = None):
+        if page_size <= 0:
+            raise ValueError("La taille de page doit être positive.")
+        self.db_manager = db_manager
+        self.user_id = user_id
+        self.page_size = page_size
+        self.limit = limit
+        
+        self._pages: dict[int, list[Operation]] = {}
+        self._more: dict[int, bool] = {}  # Page -> existence d'opérations plus anciennes
+        self._count: int | None = None
+        
+    def __repr__(self):
+        return f"OperationCursor(user_id={self.user_id}, page_size={self.page_size}, limit={self.limit})"
+    
+    def __iter__(self):
+        index = 0
+        while True:
+            page = self.get_page(index)
+            if not page:
+                return
+            yield page
+            index += 1
+    
+    @property
+    def count(self) -> int:
+        """Retourne le nombre d'opérations parcourables (borné par la limite)."""
+        if self._count is None:
+            self._count = self.db_manager.count_operations(self.user_id, limit=self.limit)
+        return self._count
+    
+    @property
+    def page_count(self) -> int:
+        """Retourne le nombre de pages (au moins une). Compte tout l'historique s'il n'est pas encore connu."""
+        return max(1, -(-self.count // self.page_size))
+    
+    @property
+    def known_page_count(self) -> int | None:
+        """Retourne le nombre de pages s'il est déjà connu (dernière page atteinte ou `count` calculé), sinon None."""
+        return max(1, -(-self._count // self.page_size)) if self._count is not None else None
+    
+    def has_next(self, index: int) -> bool:
+        """Indique s'il existe une page après la page `index` (déjà chargée), sans compter l'historique."""
+        if self._count is not None:
+            return (index + 1) * self.page_size < self._count
+        return self._more.get(index, False)
+    
+    def is_cached(self, index: int) -> bool:
+        """Indique si une page a déjà été chargée."""
+        return index in self._pages
+    
+    def get_page(self, index: int) -> list[Operation]:
+        """Retourne la page `index` (0 = opérations les plus récentes)."""
+        if index < 0:
+            raise IndexError("L'index de page doit être positif.")
+        if index in self._pages:
+            return self._pages[index]
+        
+        size = self.page_size
+        if self.limit is not None:
+            size = max(0, min(size, self.limit - index * self.page_size))
+        if size == 0:
+            return []
+        
+        # Une opération de plus que nécessaire : indique s'il existe une page suivante, sans comptage
+        bounded = self.limit is not None and index * self.page_size + size >= self.limit
+        previous, following = self._pages.get(index - 1), self._pages.get(index + 1)
+        if previous:
+            # Page suivante : opérations plus anciennes que la dernière de la page précédente
+            ops = self.db_manager.get_operations(user_id=self.user_id, before=previous[-1].key, limit=size + 1)
+        elif following:
+            # Page précédente : opérations plus récentes que la première de la page suivante
+            ops = self.db_manager.get_operations(user_id=self.user_id, after=following[0].key, limit=size, order='ASC')
+            ops.reverse()
+        else:
+            # Saut direct (ex. dernière page) : seul cas où l'on recourt à un décalage
+            ops = self.db_manager.get_operations(user_id=self.user_id, limit=size + 1, offset=index * self.page_size)
+        
+        more = bool(following) or (len(ops) > size and not bounded)
+        ops = ops[:size]
+        self._pages[index] = ops
+        self._more[index] = more
+        if not more and self._count is None and (ops or index == 0):
+            self._count = index * self.page_size + len(ops)  # Dernière page atteinte : le total est connu
+        return ops
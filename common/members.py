@@ -0,0 +1,201 @@
+import logging
+import random
+from array import array
+from bisect import bisect_left
+from contextlib import closing
+from pathlib import Path
+from typing import Iterable, Protocol
+
+import discord
+
+from common import connections
+
+logger = logging.getLogger('Members')
+
+DB_PATH = Path('common/global/')
+
+# Classes ================================================
+
+class MemberFollower(Protocol):
+    """Structure tenue à jour par `MemberIndex` (cf. `LeaderboardIndex`)."""
+    def sync_guild(self, guild_id: int, member_ids: Iterable[int]): ...
+    def drop_guild(self, guild_id: int): ...
+    def add_member(self, guild_id: int, user_id: int): ...
+    def remove_member(self, guild_id: int, user_id: int): ...
+
+
+class MemberIndex:
+    """Index des membres humains (hors bots) de chaque guilde.
+
+    Chaque guilde est représentée par un tableau trié d'IDs (`array('Q')`, 8 octets par membre) : pas de
+    parcours de `guild.members` à chaque commande. L'index est amorcé au démarrage (`seed_guild`) puis tenu
+    à jour par les évènements d'arrivée et de départ (cf. cog Core). Il peut être recopié dans SQLite
+    (`mirror`), ce qui le rend disponible dès le lancement, avant la réception des membres par Discord.
+
+    Les structures dérivées des membres (ex. vues de classement) s'abonnent avec `add_follower` : chaque
+    modification de l'index leur est transmise, elles ne dépendent donc pas d'évènements Discord séparés.
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self, mirror: bool = True, db_path: Path = DB_PATH):
+        if self._initialized:
+            return
+
+        self._guilds: dict[int, array] = {}
+        self._versions: dict[int, int] = {}  # Guilde -> numéro de sa dernière modification (croissant, jamais réutilisé)
+        self._clock = 0
+        self._followers: list[MemberFollower] = []
+        self.conn = None
+        if mirror:
+            db_path.mkdir(parents=True, exist_ok=True)
+            self.conn = connections.connect(db_path / 'members.db', 'members')
+            self._initialize()
+            self._load_mirror()
+        self._initialized = True
+
+    def __del__(self):
+        if self.conn:
+            self.conn.close()
+
+    def _initialize(self):
+        with closing(self.conn.cursor()) as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS guild_members (
+                    guild_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    PRIMARY KEY (guild_id, user_id)
+                ) WITHOUT ROWID
+            ''')
+            self.conn.commit()
+
+    def _load_mirror(self):
+        with closing(self.conn.cursor()) as cursor:
+            cursor.execute('SELECT guild_id, user_id FROM guild_members ORDER BY guild_id, user_id')
+            for guild_id, user_id in cursor:
+                self._guilds.setdefault(guild_id, array('Q')).append(user_id)
+        if self._guilds:
+            logger.info(f"Index des membres chargé depuis la copie locale ({len(self._guilds)} guildes)")
+
+    def __len__(self):
+        return len(self._guilds)
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self._guilds
+
+    # Abonnés -----------------------------
+
+    def add_follower(self, follower: 'MemberFollower'):
+        """Abonne une structure aux modifications de l'index (sans effet si elle l'est déjà)."""
+        if not any(f is follower for f in self._followers):
+            self._followers.append(follower)
+
+    def remove_follower(self, follower: 'MemberFollower'):
+        """Désabonne une structure des modifications de l'index."""
+        self._followers = [f for f in self._followers if f is not follower]
+
+    # Mise à jour -----------------------------
+
+    def seed_guild(self, guild: discord.Guild):
+        """(Re)construit l'index d'une guilde à partir de la liste de ses membres (un seul parcours)."""
+        members = array('Q', sorted(m.id for m in guild.members if not m.bot))
+        if self._guilds.get(guild.id) == members:
+            return
+        self._guilds[guild.id] = members
+        self._touch(guild.id)
+        if self.conn:
+            with closing(self.conn.cursor()) as cursor:
+                cursor.execute('DELETE FROM guild_members WHERE guild_id = ?', (guild.id,))
+                cursor.executemany('INSERT INTO guild_members (guild_id, user_id) VALUES (?, ?)',
+                                   ((guild.id, uid) for uid in members))
+                self.conn.commit()
+        for follower in self._followers:
+            follower.sync_guild(guild.id, members)
+
+    def drop_guild(self, guild_id: int):
+        """Oublie une guilde (ex. départ du bot)."""
+        self._guilds.pop(guild_id, None)
+        self._touch(guild_id)
+        if self.conn:
+            self.conn.execute('DELETE FROM guild_members WHERE guild_id = ?', (guild_id,))
+            self.conn.commit()
+        for follower in self._followers:
+            follower.drop_guild(guild_id)
+
+    def add_member(self, member: discord.Member):
+        """Ajoute un membre à l'index de sa guilde (les bots sont ignorés)."""
+        members = self._guilds.get(member.guild.id)
+        if members is None or member.bot:
+            return
+        i = bisect_left(members, member.id)
+        if i < len(members) and members[i] == member.id:
+            return
+        members.insert(i, member.id)
+        self._touch(member.guild.id)
+        if self.conn:
+            self.conn.execute('INSERT OR IGNORE INTO guild_members (guild_id, user_id) VALUES (?, ?)', (member.guild.id, member.id))
+            self.conn.commit()
+        for follower in self._followers:
+            follower.add_member(member.guild.id, member.id)
+
+    def remove_member(self, guild_id: int, user_id: int):
+        """Retire un membre de l'index de sa guilde."""
+        members = self._guilds.get(guild_id)
+        if members is None:
+            return
+        i = bisect_left(members, user_id)
+        if i < len(members) and members[i] == user_id:
+            del members[i]
+            self._touch(guild_id)
+            if self.conn:
+                self.conn.execute('DELETE FROM guild_members WHERE guild_id = ? AND user_id = ?', (guild_id, user_id))
+                self.conn.commit()
+            for follower in self._followers:
+                follower.remove_member(guild_id, user_id)
+
+    def _touch(self, guild_id: int):
+        self._clock += 1
+        self._versions[guild_id] = self._clock
+
+    # Lectures -----------------------------
+
+    def version(self, guild_id: int) -> int:
+        """Retourne le numéro de la dernière modification de l'index d'une guilde (pour détecter un instantané périmé)."""
+        return self._versions.get(guild_id, 0)
+
+    def get(self, guild: discord.Guild) -> array:
+        """Retourne le tableau trié des IDs des membres humains d'une guilde (amorcé au besoin).
+
+        Le tableau est partagé : ne pas le modifier, et le copier s'il doit être lu hors de la boucle d'événements.
+        """
+        if guild.id not in self._guilds:
+            self.seed_guild(guild)
+        return self._guilds[guild.id]
+
+    def contains(self, guild_id: int, user_id: int) -> bool:
+        """Indique si un utilisateur est un membre humain connu d'une guilde."""
+        members = self._guilds.get(guild_id)
+        if not members:
+            return False
+        i = bisect_left(members, user_id)
+        return i < len(members) and members[i] == user_id
+
+    def random_member(self, guild: discord.Guild, exclude: Iterable[int] = (), attempts: int = 8) -> discord.Member | None:
+        """Tire au sort un membre humain de la guilde, hors `exclude` (None si aucun n'est disponible)."""
+        members = self.get(guild)
+        exclude = set(exclude)
+        for _ in range(attempts):
+            user_id = members[random.randrange(len(members))] if members else None
+            if user_id is None or user_id in exclude:
+                continue
+            member = guild.get_member(user_id)
+            if member is not None:
+                return member
+        # Tirages malchanceux (petite guilde, exclusions) : parcours complet, rare
+        candidates = [uid for uid in members if uid not in exclude and guild.get_member(uid) is not None]
+        return guild.get_member(random.choice(candidates)) if candidates else None
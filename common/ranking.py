@@ -0,0 +1,305 @@
+"""Index de classement en mémoire : rang et premières places par solde, sans requête SQL.
+
+Chaque classement (global, ou vue d'une guilde) est un `RankIndex` : liste triée découpée en blocs
+(à la manière de `sortedcontainers.SortedList`) dont les tailles sont sommées par un arbre de Fenwick.
+Insertion, suppression et rang coûtent O(log n + taille d'un bloc), les N premières places O(log n + N).
+
+Mémoire (CPython 3.12, mesurée par benchmarks/bench_leaderboard.py) : ~95 à 105 octets par compte
+classé (clé entière, pointeur dans un bloc, entrée de dictionnaire), plus ~32 octets pour l'entier de
+l'ID lorsqu'il n'est pas partagé : ~100 à 130 Mo par million de comptes pour l'index global, et autant
+par million de membres suivis dans les vues de guildes (chaque vue ne contient que ses membres), plus
+~50 octets par membre suivi pour l'index inverse membre -> guildes (un ensemble seulement pour les membres
+de plusieurs guildes suivies).
+"""
+import threading
+from bisect import bisect_left, insort
+from itertools import chain, islice
+from typing import Iterable, Iterator
+
+BLOCK_SIZE = 512  # Taille nominale d'un bloc (un bloc est scindé au-delà du double)
+
+_BALANCE_OFFSET = 1 << 63
+_USER_MASK = (1 << 64) - 1
+
+
+def _encode(balance: int, user_id: int) -> int:
+    """Clé entière triée par solde décroissant puis par ID croissant (ordre du classement)."""
+    return ((_BALANCE_OFFSET - balance) << 64) | user_id
+
+
+def _decode(key: int) -> tuple[int, int]:
+    return key & _USER_MASK, _BALANCE_OFFSET - (key >> 64)
+
+
+class RankIndex:
+    """Classement trié de (user_id, solde), avec rang et premières places en temps logarithmique.
+
+    Le rang suit la convention de `RANK()` : les ex æquo partagent le même rang.
+    Non protégé contre les accès concurrents (cf. `LeaderboardIndex`).
+    """
+    __slots__ = ('_keys', '_blocks', '_maxes', '_tree')
+
+    def __init__(self, balances: Iterable[tuple[int, int]] = ()):
+        self._keys: dict[int, int] = {uid: _encode(balance, uid) for uid, balance in balances}
+        keys = sorted(self._keys.values())
+        self._blocks = [keys[i:i + BLOCK_SIZE] for i in range(0, len(keys), BLOCK_SIZE)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._rebuild_tree()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._keys
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        """Parcourt les (user_id, solde) dans l'ordre du classement."""
+        return map(_decode, chain.from_iterable(self._blocks))
+
+    def balance(self, user_id: int, default: int = None) -> int | None:
+        """Retourne le solde d'un utilisateur du classement (ou `default`)."""
+        key = self._keys.get(user_id)
+        return _decode(key)[1] if key is not None else default
+
+    def set(self, user_id: int, balance: int):
+        """Ajoute un utilisateur au classement ou met à jour son solde."""
+        key = _encode(balance, user_id)
+        old = self._keys.get(user_id)
+        if old == key:
+            return
+        if old is not None:
+            self._remove(old)
+        self._insert(key)
+        self._keys[user_id] = key
+
+    def discard(self, user_id: int):
+        """Retire un utilisateur du classement, s'il y figure."""
+        key = self._keys.pop(user_id, None)
+        if key is not None:
+            self._remove(key)
+
+    def rank(self, user_id: int) -> int | None:
+        """Retourne le rang d'un utilisateur (1 + nombre de soldes strictement supérieurs)."""
+        key = self._keys.get(user_id)
+        if key is None:
+            return None
+        return self._count_below(key & ~_USER_MASK) + 1
+
+    def top(self, limit: int) -> list[tuple[int, int, int]]:
+        """Retourne les `limit` premières places : (user_id, solde, rang)."""
+        entries, previous, rank = [], None, 0
+        for position, (user_id, balance) in enumerate(islice(self, limit), 1):
+            if balance != previous:
+                rank, previous = position, balance
+            entries.append((user_id, balance, rank))
+        return entries
+
+    # Structure interne -----------------------------
+
+    def _rebuild_tree(self):
+        tree = [0] + [len(block) for block in self._blocks]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, index: int, delta: int):
+        tree = self._tree
+        index += 1
+        while index < len(tree):
+            tree[index] += delta
+            index += index & -index
+
+    def _prefix(self, index: int) -> int:
+        """Nombre d'éléments dans les blocs [0, index)."""
+        tree, total = self._tree, 0
+        while index:
+            total += tree[index]
+            index -= index & -index
+        return total
+
+    def _count_below(self, key: int) -> int:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._blocks):
+            return len(self._keys)
+        return self._prefix(i) + bisect_left(self._blocks[i], key)
+
+    def _insert(self, key: int):
+        if not self._blocks:
+            self._blocks, self._maxes = [[key]], [key]
+            self._rebuild_tree()
+            return
+        i = min(bisect_left(self._maxes, key), len(self._blocks) - 1)
+        block = self._blocks[i]
+        insort(block, key)
+        self._maxes[i] = block[-1]
+        if len(block) > 2 * BLOCK_SIZE:
+            self._blocks[i:i + 1] = [block[:BLOCK_SIZE], block[BLOCK_SIZE:]]
+            self._maxes[i:i + 1] = [block[BLOCK_SIZE - 1], block[-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def _remove(self, key: int):
+        i = bisect_left(self._maxes, key)
+        block = self._blocks[i]
+        del block[bisect_left(block, key)]
+        if block:
+            self._maxes[i] = block[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._blocks[i], self._maxes[i]
+            self._rebuild_tree()
+
+
+class LeaderboardIndex:
+    """Classements en mémoire : un index global de tous les comptes et une vue par guilde suivie.
+
+    Chargé une fois depuis la base (`load`), puis tenu à jour à chaque variation de solde (`update`).
+    Les vues de guildes suivent `MemberIndex` (abonné avec `add_follower`) : amorçage, arrivées et départs
+    passent par le même chemin que l'index des membres et ne peuvent pas diverger. Les membres sans compte
+    sont classés avec `default_balance`. Toutes les méthodes sont protégées par un verrou.
+
+    Un index inverse (membre -> guildes suivies) évite de parcourir toutes les vues à chaque variation de
+    solde : `update` ne touche que les vues des guildes du membre, quel que soit le nombre de guildes suivies.
+    """
+    def __init__(self, default_balance: int):
+        self.default_balance = default_balance
+        self._all: RankIndex | None = None  # None tant que l'index n'est pas chargé
+        self._guilds: dict[int, RankIndex] = {}
+        self._member_guilds: dict[int, int | set[int]] = {}  # Membre -> guilde(s) suivie(s) dont il fait partie
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._all) if self._all is not None else 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._all is not None
+
+    def load(self, balances: Iterable[tuple[int, int]]):
+        """(Re)charge les soldes de tous les comptes et reconstruit les vues de guildes existantes."""
+        index = RankIndex(balances)
+        with self._lock:
+            self._all = index
+            for guild_id, view in self._guilds.items():
+                self._guilds[guild_id] = RankIndex((uid, index.balance(uid, self.default_balance)) for uid, _ in view)
+
+    def update(self, user_id: int, balance: int):
+        """Reporte un nouveau solde dans l'index global et dans les vues des guildes du membre."""
+        with self._lock:
+            if self._all is None:
+                return
+            self._all.set(user_id, balance)
+            guilds = self._member_guilds.get(user_id)
+            if guilds is None:
+                return
+            for guild_id in (guilds,) if isinstance(guilds, int) else guilds:
+                self._guilds[guild_id].set(user_id, balance)
+
+    # Guildes -----------------------------
+
+    def tracks(self, guild_id: int) -> bool:
+        """Indique si une vue existe pour la guilde."""
+        return guild_id in self._guilds
+
+    def track_guild(self, guild_id: int, member_ids: Iterable[int]):
+        """Crée (ou recrée) la vue d'une guilde à partir de la liste de ses membres."""
+        with self._lock:
+            if self._all is None:
+                raise RuntimeError("L'index des classements n'est pas chargé.")
+            self._install(guild_id, member_ids)
+
+    def sync_guild(self, guild_id: int, member_ids: Iterable[int]):
+        """Recrée la vue d'une guilde après un nouvel amorçage de ses membres, si elle est suivie."""
+        with self._lock:
+            if guild_id in self._guilds:
+                self._install(guild_id, member_ids)
+
+    def drop_guild(self, guild_id: int):
+        """Supprime la vue d'une guilde (ex. départ du bot)."""
+        with self._lock:
+            view = self._guilds.pop(guild_id, None)
+            if view is not None:
+                for user_id, _ in view:
+                    self._unlink(user_id, guild_id)
+
+    def add_member(self, guild_id: int, user_id: int):
+        """Ajoute un membre à la vue de sa guilde, si elle est suivie."""
+        with self._lock:
+            view = self._guilds.get(guild_id)
+            if view is not None:
+                view.set(user_id, self._all.balance(user_id, self.default_balance))
+                self._link(user_id, guild_id)
+
+    def remove_member(self, guild_id: int, user_id: int):
+        """Retire un membre de la vue de sa guilde, si elle est suivie."""
+        with self._lock:
+            view = self._guilds.get(guild_id)
+            if view is not None and user_id in view:
+                view.discard(user_id)
+                self._unlink(user_id, guild_id)
+
+    def _install(self, guild_id: int, member_ids: Iterable[int]):
+        """Remplace la vue d'une guilde et met à jour l'index inverse (sous le verrou)."""
+        members = set(member_ids)
+        previous = self._guilds.get(guild_id)
+        if previous is not None:
+            for user_id, _ in previous:
+                if user_id not in members:
+                    self._unlink(user_id, guild_id)
+        balance = self._all.balance
+        self._guilds[guild_id] = RankIndex((uid, balance(uid, self.default_balance)) for uid in members)
+        for user_id in members:
+            self._link(user_id, guild_id)
+
+    # Un membre d'une seule guilde suivie (cas courant) est associé à l'ID de la guilde, sans ensemble
+    def _link(self, user_id: int, guild_id: int):
+        guilds = self._member_guilds.get(user_id)
+        if guilds is None:
+            self._member_guilds[user_id] = guild_id
+        elif isinstance(guilds, int):
+            if guilds != guild_id:
+                self._member_guilds[user_id] = {guilds, guild_id}
+        else:
+            guilds.add(guild_id)
+
+    def _unlink(self, user_id: int, guild_id: int):
+        guilds = self._member_guilds.get(user_id)
+        if guilds is None:
+            return
+        if isinstance(guilds, int):
+            if guilds == guild_id:
+                del self._member_guilds[user_id]
+            return
+        guilds.discard(guild_id)
+        if len(guilds) == 1:
+            self._member_guilds[user_id] = next(iter(guilds))
+
+    # Lectures -----------------------------
+
+    def leaderboard(self, guild_id: int | None, limit: int = 20, focus: int = None,
+                    member_ids: Iterable[int] = None) -> tuple[list[tuple[int, int, int]], tuple[int, int, int] | None, int] | None:
+        """Retourne (premières places, ligne de `focus`, nombre de classés) pour une guilde (None : classement global).
+
+        Les lignes sont des tuples (user_id, solde, rang). Si la guilde n'est pas suivie, sa vue est créée à partir
+        de `member_ids` sous le même verrou ; sans `member_ids`, retourne None (ex. vue supprimée entre-temps).
+        """
+        with self._lock:
+            if guild_id is None:
+                view = self._all
+            elif guild_id in self._guilds:
+                view = self._guilds[guild_id]
+            elif member_ids is not None:
+                if self._all is None:
+                    raise RuntimeError("L'index des classements n'est pas chargé.")
+                self._install(guild_id, member_ids)
+                view = self._guilds[guild_id]
+            else:
+                return None
+            entries = view.top(limit) if limit else []
+            focus_entry = None
+            if focus is not None and focus in view:
+                focus_entry = (focus, view.balance(focus), view.rank(focus))
+            return entries, focus_entry, len(view)